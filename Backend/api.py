@@ -0,0 +1,711 @@
+"""
+The restaurant API as an app factory. `create_app(config)` loads the data,
+indexes and embedding model described by an AppConfig (see config.py) and
+returns the FastAPI app; main_local.py and main.py are entry points around it.
+"""
+import json
+from typing import Dict, List, Literal, Optional, Union
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, File, Form, Header, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from numpy.linalg import norm
+from pydantic import BaseModel
+
+from autocomplete import AUTOCOMPLETE_KINDS, MAX_COMPLETIONS, AutocompleteIndex
+from compress import CompressionMiddleware
+from config import AppConfig
+from embedding_schema import EmbeddingCache, EmbeddingIndex
+from encoders import CachedEncoder, load_encoder
+from export import (
+    EXPORT_MEDIA_TYPES, EXPORT_STREAMS, RESPONSE_FORMATS, arrow_available, arrow_body, available_formats, msgpack_body,
+    negotiate_format,
+)
+from fuzzy import MAX_EDITS, FuzzyNameIndex
+from geo import build_geo_index
+from images import UploadLimitMiddleware, preprocess_image
+from metrics import (
+    PROMETHEUS_CONTENT_TYPE, REGISTRY, MetricsMiddleware, observe_encode_batch, stage, startup_phase, timed_import,
+    timed_iter,
+)
+from profiling import ProfiledRoute, ProfilingMiddleware, profiled, router as profiling_router
+from ranking import NearbyRanker
+from semantic import batch_similarity_top_k, top_k_positions
+from singleflight import SingleFlight
+from snapshot import load_snapshot
+from sqlite_store import RTreeIndex, open_store
+from store import EXCEL_ENGINE, FACETS, GROUP_BY_FIELDS, RestaurantStore, layout_order, parse_fields
+
+# === RESPONSE MODEL ===
+class RestaurantResponse(BaseModel):
+    id: int
+    restaurant_id: int
+    restaurant_name: str
+    country: str
+    country_code: int
+    city: str
+    address: str
+    locality: str
+    locality_verbose: str
+    longitude: float
+    latitude: float
+    cuisines: str
+    average_cost_for_two: float
+    currency: str
+    has_table_booking: str
+    has_online_delivery: str
+    is_delivering_now: str
+    switch_to_order_menu: str
+    price_range: int
+    aggregate_rating: float
+    rating_color: str
+    rating_text: str
+    votes: int
+
+class RestaurantResponseWithSimilarity(RestaurantResponse):
+    similarity: float
+
+class RestaurantResponseWithDistance(RestaurantResponse):
+    distance_km: float
+
+class RestaurantResponseWithScore(RestaurantResponse):
+    distance_km: float
+    score: float
+    bayesian_rating: float
+
+class AutocompleteSuggestion(BaseModel):
+    kind: Literal[tuple(AUTOCOMPLETE_KINDS)]
+    label: str
+    restaurant_id: Optional[int] = None  # the most voted restaurant with this name, for kind "name"
+    count: int
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class AggregateGroup(BaseModel):
+    key: Optional[Union[int, str]] = None
+    count: int
+    metrics: Dict[str, Union[float, List[int]]] = {}
+
+class AggregateResponse(BaseModel):
+    group_by: Optional[str] = None
+    rows: int
+    groups: List[AggregateGroup]
+    bin_edges: Dict[str, List[float]] = {}
+
+class NearbyPoint(BaseModel):
+    lat: float
+    lng: float
+    radius: float = 3.0
+    limit: int = 20
+
+class BatchNearbyRequest(BaseModel):
+    points: List[NearbyPoint]
+    stream: bool = False
+
+class BatchNearbyResult(BaseModel):
+    lat: float
+    lng: float
+    radius: float
+    results: List[RestaurantResponseWithDistance]
+
+class SemanticSearchRequest(BaseModel):
+    query: str
+    limit: int = 5
+    weights: Optional[Dict[str, float]] = None  # per-field weights when several fields are embedded
+
+class BatchSemanticQuery(BaseModel):
+    query: str
+    limit: int = 5
+    weights: Optional[Dict[str, float]] = None
+    city: Optional[str] = None
+    cuisine: Optional[str] = None
+    country: Optional[str] = None
+    min_cost: Optional[float] = None
+    max_cost: Optional[float] = None
+
+class BatchSemanticSearchRequest(BaseModel):
+    queries: List[BatchSemanticQuery]
+    stream: bool = False
+
+class BatchSemanticSearchResult(BaseModel):
+    query: str
+    results: List[RestaurantResponseWithSimilarity]
+
+# === PROJECTION ===
+def fields_query():
+    return Query(None, description="Only these restaurant fields, comma-separated or repeated (default all). "
+                                   "Only they are gathered, and the response skips model validation")
+
+def projection(fields):
+    """The store fields a fields= parameter names, or None for full records; unknown fields are a 400"""
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def respond(records, fields):
+    """Full records go through the route's response model; projected ones straight to JSON"""
+    return records if fields is None else JSONResponse(records)
+
+# === CONTENT NEGOTIATION ===
+def accept_header():
+    return Header(None, description="application/json (default), application/msgpack for the same records as "
+                                    "MessagePack, or application/vnd.apache.arrow.stream for an Arrow IPC stream "
+                                    "with one column per field")
+
+def encode_rows(store, positions, fields, fmt, extra=None):
+    """
+    The rows at positions in a negotiated format, with extra {name: array} columns:
+    JSON-ready records, the same records as MessagePack, or an Arrow IPC stream
+    built from gather_arrays() without materializing a row
+    """
+    extra = extra or {}
+    if fmt == "arrow":
+        columns = store.gather_arrays(positions, fields)
+        columns.update(extra)
+        return arrow_body(columns)
+    records = store.records(positions, fields)
+    for name, values in extra.items():
+        for record, value in zip(records, values.tolist()):
+            record[name] = value
+    return msgpack_body(records) if fmt == "msgpack" else records
+
+def respond_as(body, fields, fmt, response):
+    """respond() for an encode_rows() body; the answer depends on Accept, so caches must key on it"""
+    response.headers["Vary"] = "Accept"
+    if fmt != "json":
+        return Response(body, media_type=RESPONSE_FORMATS[fmt][0], headers={"Vary": "Accept"})
+    return body if fields is None else JSONResponse(body, headers={"Vary": "Accept"})
+
+# === STATE ===
+class ServiceState:
+    """Everything the endpoints read: the restaurant store, spatial index and embeddings"""
+
+    def __init__(self, config):
+        self.config = config
+        self.snapshot = None
+        self.store = self.geo_index = self.ranker = self.autocomplete = self.fuzzy = None
+        self.embedding_model = self.query_encoder = self.embedding_index = None
+        self.unique_cuisines = self.cuisine_embeddings = None
+
+    def load(self):
+        config = self.config
+        # The tabular profile never imports the embedding model's stack
+        if config.semantic:
+            with startup_phase("model_load"):
+                self.embedding_model = load_encoder(
+                    config.embedding_backend, config.embedding_model, config.onnx_dir, config.embedding_threads
+                )
+            if config.query_cache_size > 0:
+                self.query_encoder = CachedEncoder(self.embedding_model, config.query_cache_size)
+            else:
+                self.query_encoder = self.embedding_model
+
+        if config.storage == "sqlite":
+            # Rows stay on disk; the whole-catalog autocomplete, fuzzy and ranking indexes are not built
+            with startup_phase("sqlite_open"):
+                self.store = open_store(config)
+                self.geo_index = RTreeIndex(self.store)
+            return self
+
+        if config.snapshot_dir:
+            with startup_phase("snapshot_load"):
+                self.snapshot = load_snapshot(config, None if self.embedding_model is None else self.embedding_model.key)
+
+        # The merged frame only lives through startup; every endpoint reads the columnar store
+        df = None
+        if self.snapshot is None:
+            try:
+                with startup_phase("csv_load"):
+                    df_main = pd.read_csv(config.csv_path, encoding='latin-1')
+                with startup_phase("excel_merge"):
+                    df_country = pd.read_excel(config.country_excel_path, engine=EXCEL_ENGINE)
+                    df = pd.merge(df_main, df_country, on='Country Code', how='left')
+                    df['id'] = df.index
+                    # A shard keeps only its countries' rows, with ids from the full file
+                    if config.shard_countries:
+                        df = df[df['Country Code'].isin(config.shard_countries)].reset_index(drop=True)
+            except Exception as e:
+                raise RuntimeError(f"Failed to load/merge data: {e}")
+            # CSV order by default; curve layouts sort by country, city and location so filters read
+            # contiguous slices, and list, search and export results come back in that order
+            with startup_phase("layout"):
+                df = df.iloc[layout_order(df, config.row_layout)].reset_index(drop=True)
+
+        # Columnar store and spatial index used by every endpoint
+        with startup_phase("index_build"):
+            if self.snapshot is None:
+                self.store = RestaurantStore.from_dataframe(df)
+                self.geo_index = build_geo_index(
+                    config.geo_index, self.store.column('latitude'), self.store.column('longitude'), config.geo_cell_deg
+                )
+            else:
+                self.store, self.geo_index = self.snapshot["store"], self.snapshot["geo_index"]
+            self.ranker = NearbyRanker(self.store, self.geo_index, config.ranking_prior_votes, config.ranking_half_life_km)
+        with startup_phase("autocomplete_build"):
+            if self.snapshot is None:
+                self.autocomplete = AutocompleteIndex(self.store)
+            else:
+                self.autocomplete = self.snapshot["autocomplete"]
+        with startup_phase("fuzzy_build"):
+            self.fuzzy = FuzzyNameIndex(self.store) if self.snapshot is None else self.snapshot["fuzzy"]
+
+        if self.embedding_model is not None:
+            # Restaurant embeddings: each field in the schema is encoded once per distinct value
+            cache = None
+            if config.embedding_cache_dir:
+                cache = EmbeddingCache(config.embedding_cache_dir, self.embedding_model.key)
+            with startup_phase("embedding"):
+                if self.snapshot is None:
+                    self.embedding_index = EmbeddingIndex.build(
+                        df, config.embedding_schema, self._encode_startup, cache
+                    )
+                else:
+                    self.embedding_index = EmbeddingIndex.restore(
+                        config.embedding_schema, len(self.store), self.snapshot["fields"], self._encode_startup, cache
+                    )
+
+            # Distinct cuisine strings, matched against food recognized in images
+            with startup_phase("cuisine_embedding"):
+                cuisine_vectors = self.embedding_index.field(df, "cuisines")
+                self.unique_cuisines = cuisine_vectors.values
+                self.cuisine_embeddings = cuisine_vectors.unique_vectors()
+        return self
+
+    def _encode_startup(self, texts):
+        observe_encode_batch("startup", len(texts))
+        return self.embedding_model.encode(texts)
+
+    def require_semantic(self):
+        if self.embedding_model is None:
+            raise HTTPException(status_code=503, detail="Semantic search is disabled in the tabular API profile")
+
+    def require_index(self, index, feature):
+        if index is None:
+            raise HTTPException(status_code=503, detail=f"{feature} needs the in-memory store (STORAGE=memory)")
+        return index
+
+    def encode_texts(self, texts, caller):
+        observe_encode_batch(caller, len(texts))
+        return self.query_encoder.encode(texts)
+
+    def get_logmeal_prediction(self, image_bytes: bytes):
+        url = "https://api.logmeal.es/v2/recognition/dish"
+        headers = {"Authorization": f"Bearer {self.config.logmeal_api_key}"}
+        files = {"image": ("image.jpg", image_bytes, "image/jpeg")}
+        response = timed_import("requests").post(url, headers=headers, files=files)
+        if response.status_code != 200:
+            raise Exception(f"LogMeal API error: {response.text}")
+        data = response.json()
+        # Extract dish and food family (cuisine/group)
+        if data.get("recognition_results"):
+            dish = data["recognition_results"][0]["name"]
+            food_family = data["recognition_results"][0].get("food_family", "")
+            return dish, food_family
+        raise Exception("No dish recognized")
+
+    def semantic_match_cuisines(self, search_term: str, top_k: int = 3):
+        query_emb = self.encode_texts([search_term], "cuisine_match")[0]
+        embeddings = self.cuisine_embeddings
+        sims = np.dot(embeddings, query_emb) / (norm(embeddings, axis=1) * norm(query_emb) + 1e-10)
+        top_indices = sims.argsort()[-top_k:][::-1]
+        return [self.unique_cuisines[i] for i in top_indices]
+
+# === FASTAPI SETUP ===
+def create_app(config: AppConfig = None) -> FastAPI:
+    config = config or AppConfig.from_env()
+    state = ServiceState(config)
+
+    app = FastAPI(title="Zomato-like Restaurant API")
+    app.router.route_class = ProfiledRoute
+    app.state.service = state
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Inside MetricsMiddleware, so request latency and the "compress" stage include compression
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=config.compression_encodings,
+        min_bytes=config.compression_min_bytes,
+        cache_bytes=int(config.compression_cache_mb * 2**20),
+    )
+    app.add_middleware(UploadLimitMiddleware, limits={"/image-search-nearby": int(config.image_max_upload_mb * 2**20)})
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(ProfilingMiddleware)
+
+    if config.load_on_startup:
+        app.on_event("startup")(state.load)
+    else:
+        state.load()
+    # Identical concurrent requests share one computation (see singleflight.py)
+    semantic_flight = SingleFlight("semantic_search")
+    nearby_flight = SingleFlight("nearby")
+    # Bodies /restaurants and /semantic-search can answer in, by Accept header
+    formats = available_formats()
+
+    # === SEMANTIC ENDPOINTS ===
+    @app.post("/semantic-search", response_model=List[RestaurantResponseWithSimilarity])
+    async def semantic_search(
+        request: SemanticSearchRequest,
+        response: Response,
+        fields: Optional[List[str]] = fields_query(),
+        accept: Optional[str] = accept_header()
+    ):
+        state.require_semantic()
+        fields = projection(fields)
+        fmt = negotiate_format(accept, formats)
+        try:
+            weights = state.embedding_index.resolve_weights(request.weights)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        def search():
+            with stage("encode"):
+                query_embedding = state.encode_texts([request.query], "semantic_search")[0]
+            with stage("similarity"):
+                similarities = state.embedding_index.scores(query_embedding, request.weights)
+                positions = top_k_positions(similarities, request.limit)
+            with stage("gather"):
+                return encode_rows(state.store, positions, fields, fmt, {"similarity": similarities[positions]})
+
+        # Whitespace does not change the embedding, and weights are compared once normalized
+        key = (" ".join(request.query.split()), request.limit, tuple(sorted(weights.items())), tuple(fields or ()), fmt)
+        try:
+            return respond_as(await semantic_flight.do(key, search), fields, fmt, response)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+    @app.post("/semantic-search/batch", response_model=List[BatchSemanticSearchResult])
+    def batch_semantic_search(request: BatchSemanticSearchRequest):
+        """
+        Run many semantic searches in one call: every query is encoded in a single
+        batch and scored against the embedding matrix with one matrix product per block.
+        With stream=true, results are sent as NDJSON lines as each block completes.
+        """
+        state.require_semantic()
+        queries = request.queries
+        if not queries:
+            return []
+        try:
+            for q in queries:
+                state.embedding_index.resolve_weights(q.weights)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            with stage("encode"):
+                query_embeddings = state.encode_texts([q.query for q in queries], "batch_semantic_search")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+        store = state.store
+        with stage("filter"):
+            masks = [
+                store.filter_mask(q.city, q.cuisine, q.country, q.min_cost, q.max_cost)
+                if any(v is not None for v in (q.city, q.cuisine, q.country, q.min_cost, q.max_cost)) else None
+                for q in queries
+            ]
+        scored = batch_similarity_top_k(
+            query_embeddings, state.embedding_index, [q.limit for q in queries], masks,
+            weights=[q.weights for q in queries]
+        )
+
+        def results():
+            for block in timed_iter(scored, "similarity"):
+                with stage("gather"):
+                    block_records = store.grouped_records([positions for _, positions, _ in block])
+                for (i, _, similarities), records in zip(block, block_records):
+                    for record, similarity in zip(records, similarities.tolist()):
+                        record["similarity"] = similarity
+                    yield {"query": queries[i].query, "results": records}
+
+        if request.stream:
+            return StreamingResponse(
+                (json.dumps(result, ensure_ascii=False) + "\n" for result in results()),
+                media_type="application/x-ndjson"
+            )
+        return list(results())
+
+    @app.post("/image-search-nearby", response_model=List[RestaurantResponse])
+    async def image_search_nearby(
+        file: UploadFile = File(...),
+        lat: float = Form(...),
+        lng: float = Form(...),
+        radius: float = Form(3.0),
+        limit: int = Form(10),
+        fields: Optional[List[str]] = fields_query()
+    ):
+        state.require_semantic()
+        fields = projection(fields)
+        with stage("preprocess"):
+            try:
+                image_bytes, _ = await run_in_threadpool(
+                    profiled(preprocess_image), file.file, config.image_max_side, config.image_jpeg_quality
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        try:
+            with stage("recognize"):
+                dish, cuisine = await run_in_threadpool(profiled(state.get_logmeal_prediction), image_bytes)
+            search_term = cuisine if cuisine else dish
+            with stage("encode"):
+                matched_cuisines = state.semantic_match_cuisines(search_term, top_k=3)
+            with stage("filter"):
+                mask = state.store.contains_any("cuisines", matched_cuisines)
+            with stage("distance"):
+                positions, _ = state.geo_index.query(lat, lng, radius, limit, mask=mask)
+            with stage("gather"):
+                data = state.store.records(positions, fields)
+            if not data:
+                raise HTTPException(status_code=404, detail=f"No nearby restaurants found for cuisines: {matched_cuisines}")
+            return respond(data, fields)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Image search failed: {str(e)}")
+
+    # === ENDPOINTS ===
+    @app.get("/countries", response_model=List[str])
+    def get_countries():
+        # Read only the 'Country' column from the Excel file
+        df = pd.read_excel(config.country_excel_path, usecols=['Country'], engine=EXCEL_ENGINE)
+        # Drop duplicates and NaN values, then convert to a list
+        return df['Country'].dropna().unique().tolist()
+
+    @app.get("/facets", response_model=Dict[str, List[FacetCount]])
+    def facets(
+        facet: Optional[List[Literal[tuple(FACETS)]]] = Query(None, description="Facets to count (default all)"),
+        city: Optional[str] = None,
+        cuisine: Optional[str] = None,
+        country: Optional[str] = None,
+        min_cost: Optional[float] = None,
+        max_cost: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        limit: Optional[int] = Query(None, ge=1, description="Most common values kept per facet")
+    ):
+        """Distinct countries, cities and cuisines with restaurant counts, under the /restaurants filters"""
+        with stage("filter"):
+            positions = None
+            if any(v is not None for v in (city, cuisine, country, min_cost, max_cost, min_rating)):
+                positions = state.store.filter_positions(city, cuisine, country, min_cost, max_cost, min_rating=min_rating)
+        with stage("count"):
+            return {
+                name: [{"value": value, "count": count} for value, count in state.store.facet_counts(name, positions)[:limit]]
+                for name in (facet or FACETS)
+            }
+
+    @app.get("/restaurants", response_model=List[RestaurantResponse])
+    def list_restaurants(
+        response: Response,
+        page: int = Query(1, ge=1),
+        limit: int = Query(20, ge=1, le=1000),
+        city: Optional[str] = None,
+        cuisine: Optional[str] = None,
+        country: Optional[str] = None,
+        min_cost: Optional[float] = None,
+        max_cost: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        fields: Optional[List[str]] = fields_query(),
+        accept: Optional[str] = accept_header()
+    ):
+        fields = projection(fields)
+        fmt = negotiate_format(accept, formats)
+        start = (page - 1) * limit
+        with stage("filter"):
+            positions = state.store.filter_positions(city, cuisine, country, min_cost, max_cost, min_rating=min_rating,
+                                                     limit=start + limit)
+        with stage("gather"):
+            return respond_as(encode_rows(state.store, positions[start:start+limit], fields, fmt), fields, fmt, response)
+
+    @app.get("/restaurants/aggregate", response_model=AggregateResponse)
+    def aggregate_restaurants(
+        group_by: Optional[Literal[GROUP_BY_FIELDS]] = Query(None, description="Field to group by (default one group)"),
+        metric: List[str] = Query(["count"], description="count, or sum/mean/min/max/histogram:<numeric field>"),
+        bins: int = Query(10, ge=1, le=100, description="Bins of each histogram metric"),
+        limit: int = Query(100, ge=1, le=10000, description="Groups kept, largest first"),
+        city: Optional[str] = None,
+        cuisine: Optional[str] = None,
+        country: Optional[str] = None,
+        min_cost: Optional[float] = None,
+        max_cost: Optional[float] = None,
+        min_rating: Optional[float] = None
+    ):
+        """Counts, means, extremes and histograms per group over the rows the /restaurants filters select"""
+        with stage("filter"):
+            positions = state.store.filter_positions(city, cuisine, country, min_cost, max_cost, min_rating=min_rating)
+        with stage("aggregate"):
+            try:
+                groups, edges = state.store.aggregate(positions, group_by, metric, bins, limit)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        return {
+            "group_by": group_by,
+            "rows": len(positions),
+            "groups": [{"key": key, "count": count, "metrics": metrics} for key, count, metrics in groups],
+            "bin_edges": edges,
+        }
+
+    @app.get("/restaurants/export")
+    def export_restaurants(
+        fmt: Literal["ndjson", "csv", "arrow"] = Query("ndjson", alias="format"),
+        chunk_size: int = Query(500, ge=1, le=5000),
+        city: Optional[str] = None,
+        cuisine: Optional[str] = None,
+        country: Optional[str] = None,
+        min_cost: Optional[float] = None,
+        max_cost: Optional[float] = None,
+        min_rating: Optional[float] = None
+    ):
+        """Stream every restaurant matching the list_restaurants filters, chunk_size rows at a time"""
+        if fmt == "arrow" and not arrow_available():
+            raise HTTPException(status_code=400, detail="Arrow export requires pyarrow on the server")
+        with stage("filter"):
+            positions = state.store.filter_positions(city, cuisine, country, min_cost, max_cost, min_rating=min_rating)
+        headers = {"Content-Disposition": f'attachment; filename="restaurants.{fmt}"'}
+        return StreamingResponse(
+            timed_iter(EXPORT_STREAMS[fmt](state.store, positions, chunk_size), "serialize"),
+            media_type=EXPORT_MEDIA_TYPES[fmt],
+            headers=headers
+        )
+
+    @app.get("/restaurants/nearby", response_model=List[RestaurantResponse])
+    async def nearby_restaurants(
+        lat: float = Query(...),
+        lng: float = Query(...),
+        radius: float = Query(3.0, description="Radius in kilometers"),
+        limit: int = Query(20),
+        fields: Optional[List[str]] = fields_query()
+    ):
+        fields = projection(fields)
+
+        def nearby():
+            with stage("distance"):
+                positions, _ = state.geo_index.query(lat, lng, radius, limit)
+            with stage("gather"):
+                return state.store.records(positions, fields)
+
+        return respond(await nearby_flight.do((lat, lng, radius, limit, tuple(fields or ())), nearby), fields)
+
+    @app.get("/restaurants/nearby/ranked", response_model=List[RestaurantResponseWithScore])
+    def ranked_nearby_restaurants(
+        lat: float = Query(...),
+        lng: float = Query(...),
+        radius: float = Query(3.0, description="Radius in kilometers"),
+        limit: int = Query(20),
+        half_life_km: Optional[float] = Query(None, gt=0, description="Distance at which the score halves")
+    ):
+        """Best rated near a point: Bayesian-averaged rating decayed by distance (see ranking.py)"""
+        ranker = state.require_index(state.ranker, "Ranked nearby search")
+        with stage("rank"):
+            positions, scores, distances = ranker.top_k(lat, lng, radius, limit, half_life_km)
+        with stage("gather"):
+            data = state.store.records(positions)
+        for record, position, score, distance in zip(data, positions.tolist(), scores.tolist(), distances.tolist()):
+            record["distance_km"] = distance
+            record["score"] = score
+            record["bayesian_rating"] = float(ranker.static[position])
+        return data
+
+    @app.post("/restaurants/nearby/batch", response_model=List[BatchNearbyResult])
+    def batch_nearby_restaurants(request: BatchNearbyRequest):
+        """
+        Answer many nearby queries in one call against the grid index, gathering
+        the matched rows for each block of points in one pass.
+        With stream=true, each point's results are sent as an NDJSON line as soon as it is answered.
+        """
+        points = request.points
+        store, geo_index = state.store, state.geo_index
+
+        def results():
+            for start in range(0, len(points), 256):
+                block = points[start:start + 256]
+                with stage("distance"):
+                    answers = [geo_index.query(p.lat, p.lng, p.radius, p.limit) for p in block]
+                with stage("gather"):
+                    block_records = store.grouped_records([positions for positions, _ in answers])
+                for point, (_, distances), records in zip(block, answers, block_records):
+                    for record, distance in zip(records, distances.tolist()):
+                        record["distance_km"] = distance
+                    yield {"lat": point.lat, "lng": point.lng, "radius": point.radius, "results": records}
+
+        if request.stream:
+            return StreamingResponse(
+                (json.dumps(result, ensure_ascii=False) + "\n" for result in results()),
+                media_type="application/x-ndjson"
+            )
+        return list(results())
+
+    @app.get("/restaurants/search", response_model=List[RestaurantResponse])
+    def search_restaurants(
+        q_name: Optional[str] = Query(None, description="Search by restaurant name"),
+        q_city: Optional[str] = Query(None, description="Search by city"),
+        q_cuisine: Optional[str] = Query(None, description="Search by cuisine"),
+        q_country: Optional[str] = Query(None, description="Search by country"),
+        limit: int = 20,
+        fuzzy: bool = Query(False, description="Match q_name words to name and locality words despite typos, "
+                                               "best match first (see fuzzy.py)"),
+        max_edits: Optional[int] = Query(None, ge=0, le=MAX_EDITS, description="Cap on typos per word in fuzzy mode"),
+        fields: Optional[List[str]] = fields_query()
+    ):
+        fields = projection(fields)
+        with stage("filter"):
+            if fuzzy and q_name:
+                mask = None
+                if q_city or q_cuisine or q_country:
+                    mask = np.zeros(len(state.store), dtype=bool)
+                    mask[state.store.filter_positions(city=q_city, cuisine=q_cuisine, country=q_country)] = True
+                positions = state.require_index(state.fuzzy, "Fuzzy search").search(q_name, max_edits, mask)
+            else:
+                positions = state.store.filter_positions(city=q_city, cuisine=q_cuisine, country=q_country, name=q_name,
+                                                         limit=limit)
+        with stage("gather"):
+            return respond(state.store.records(positions[:limit], fields), fields)
+
+    @app.get("/autocomplete", response_model=List[AutocompleteSuggestion])
+    def autocomplete(
+        q: str = Query(..., min_length=1, description="Typed prefix of a name, city, locality or cuisine word"),
+        limit: int = Query(10, ge=1, le=MAX_COMPLETIONS),
+        kind: Optional[List[Literal[tuple(AUTOCOMPLETE_KINDS)]]] = Query(None, description="Only these kinds")
+    ):
+        """Search-box suggestions ranked by votes, without gathering restaurant records (see autocomplete.py)"""
+        with stage("complete"):
+            return state.require_index(state.autocomplete, "Autocomplete").complete(q, limit, kind)
+
+    @app.get("/restaurants/{restaurant_id}", response_model=RestaurantResponse)
+    def get_restaurant(restaurant_id: int):
+        position = state.store.position_of(restaurant_id)
+        if position is None:
+            raise HTTPException(status_code=404, detail="Restaurant not found")
+        return state.store.records([position])[0]
+
+    @app.get("/shard")
+    def shard_info():
+        """Countries, bounding box and row layout of this instance (all countries unless SHARD_COUNTRIES is set)"""
+        store = state.store
+        return {
+            "countries": {str(code): country for code, country in store.countries().items()},
+            "rows": len(store),
+            "bbox": store.bbox(),
+            "row_layout": config.row_layout,
+        }
+
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    app.include_router(profiling_router)
+
+    @app.get("/")
+    def root():
+        return {
+            "message": "API ready. Try /restaurants, /restaurants/{restaurant_id}, /restaurants/nearby, /restaurants/search, /restaurants/export, /autocomplete, /facets"
+        }
+
+    return app
@@ -0,0 +1,158 @@
+"""
+Python client for the restaurant API, used by streamlit_app.py.
+
+One pooled requests.Session per client, with connect/read timeouts and retries
+on connection errors and 502/503/504. GET responses (and semantic searches) are
+cached for `cache_ttl` seconds, keyed on path and params, so a Streamlit rerun
+repeats no request it has already made. `gather` runs independent calls on a
+thread pool:
+
+    client = RestaurantClient("http://127.0.0.1:8000")
+    countries, facets = client.gather(client.countries, client.facets)
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+class ApiError(Exception):
+    """A failed request: status_code is None when the server could not be reached"""
+
+    def __init__(self, status_code, detail):
+        super().__init__(f"{status_code}: {detail}" if status_code else str(detail))
+        self.status_code = status_code
+        self.detail = detail
+
+class TTLCache:
+    """Thread-safe LRU of responses that expire `ttl` seconds after they were stored"""
+
+    __slots__ = ("ttl", "size", "entries", "lock")
+    MISSING = object()
+
+    def __init__(self, ttl, size):
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return self.MISSING
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+def cache_key(path, params):
+    """Hashable (path, params) with None values dropped and lists as tuples"""
+    def freeze(value):
+        if isinstance(value, dict):
+            return tuple(sorted((k, freeze(v)) for k, v in value.items() if v is not None))
+        if isinstance(value, (list, tuple)):
+            return tuple(freeze(v) for v in value)
+        return value
+    return path, freeze(params or {})
+
+class RestaurantClient:
+    def __init__(self, base_url, timeout=(3.05, 30.0), retries=3, cache_ttl=300.0, cache_size=256, max_workers=8):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET"}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.cache = TTLCache(cache_ttl, cache_size)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api-client")
+
+    def request(self, method, path, **kwargs):
+        """The decoded JSON body, or ApiError"""
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise ApiError(None, e)
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("detail")
+            except ValueError:
+                detail = response.text
+            raise ApiError(response.status_code, detail)
+        return response.json()
+
+    def cached(self, key, fetch):
+        """fetch(), or its cached result from the last cache_ttl seconds"""
+        value = self.cache.get(key)
+        if value is TTLCache.MISSING:
+            value = fetch()
+            self.cache.put(key, value)
+        return value
+
+    def get(self, path, params=None, cache=True):
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        if not cache:
+            return self.request("GET", path, params=params)
+        return self.cached(cache_key(path, params), lambda: self.request("GET", path, params=params))
+
+    def gather(self, *calls):
+        """Results of the zero-argument callables, run concurrently, in order; the first error is raised"""
+        futures = [self.executor.submit(call) for call in calls]
+        return [future.result() for future in futures]
+
+    # === ENDPOINTS ===
+    def countries(self):
+        return self.get("/countries")
+
+    def facets(self, facet=None, limit=None, **filters):
+        """{facet: [{"value", "count"}]} for countries, cities and cuisines under /restaurants filters"""
+        return self.get("/facets", {"facet": facet, "limit": limit, **filters})
+
+    def aggregate(self, group_by=None, metric=("count",), **params):
+        """Per-group metrics under /restaurants filters, e.g. aggregate("city", ["count", "mean:votes"])"""
+        return self.get("/restaurants/aggregate", {"group_by": group_by, "metric": list(metric), **params})
+
+    # restaurants, search, nearby, semantic_search and image_search take fields="restaurant_id,latitude,..."
+    # to fetch only those fields
+    def restaurants(self, **params):
+        return self.get("/restaurants", params)
+
+    def search(self, **params):
+        return self.get("/restaurants/search", params)
+
+    def nearby(self, **params):
+        return self.get("/restaurants/nearby", params)
+
+    def restaurant(self, restaurant_id):
+        return self.get(f"/restaurants/{restaurant_id}")
+
+    def autocomplete(self, q, limit=10, kind=None):
+        return self.get("/autocomplete", {"q": q, "limit": limit, "kind": kind})
+
+    def semantic_search(self, query, limit=10, fields=None):
+        payload, params = {"query": query, "limit": limit}, {"fields": fields} if fields else None
+        return self.cached(cache_key("/semantic-search", {**payload, "fields": fields}),
+                           lambda: self.request("POST", "/semantic-search", json=payload, params=params))
+
+    def image_search(self, image_file, lat, lng, radius=3.0, limit=10, fields=None):
+        data = {"lat": lat, "lng": lng, "radius": radius, "limit": limit}
+        params = {"fields": fields} if fields else None
+        return self.request("POST", "/image-search-nearby", files={"file": image_file}, data=data, params=params)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
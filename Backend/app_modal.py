@@ -1,11 +1,38 @@
+import os
+
 import modal
 
 app = modal.App("tastyfind-app")
 
+# Keep-warm and concurrency settings, read when deploying
+MIN_CONTAINERS = int(os.getenv("MODAL_MIN_CONTAINERS", "1"))
+TABULAR_MIN_CONTAINERS = int(os.getenv("MODAL_TABULAR_MIN_CONTAINERS", "0"))
+MAX_INPUTS = int(os.getenv("MODAL_MAX_INPUTS", "32"))
+SCALEDOWN_WINDOW = int(os.getenv("MODAL_SCALEDOWN_WINDOW", "300"))
+
+# Built at image build time, never copied from the local checkout
+IGNORE = ["snapshot", "models", "embedding_cache", "**/__pycache__", "zomato_*.csv"]
+
+# Model weights and the snapshot (store, spatial index, restaurant embeddings) are
+# baked into the image, so a cold container neither downloads nor re-embeds anything
 image = (
     modal.Image.debian_slim()
     .pip_install_from_requirements("requirements.txt")
-    .add_local_dir(".", remote_path="/app")
+    .env({"HF_HOME": "/models/huggingface", "SNAPSHOT_DIR": "/snapshot", "DATA_DIR": "/app"})
+    .add_local_dir(".", remote_path="/app", copy=True, ignore=IGNORE)
+    .run_commands("cd /app && python snapshot.py --out /snapshot")
+    # Set after the bake, which downloads the weights: containers must not re-check them on the Hub
+    .env({"HF_HUB_OFFLINE": "1", "TRANSFORMERS_OFFLINE": "1"})
+)
+
+# Tabular-only API: no ML stack installed or imported, for fast cold starts
+tabular_image = (
+    modal.Image.debian_slim()
+    .pip_install_from_requirements("requirements-tabular.txt")
+    .env({"API_PROFILE": "tabular", "SNAPSHOT_DIR": "/snapshot", "DATA_DIR": "/app"})
+    .add_local_dir(".", remote_path="/app", copy=True, ignore=IGNORE)
+    .run_commands("cd /app && python snapshot.py --out /snapshot")
+    .env({"HF_HUB_OFFLINE": "1", "TRANSFORMERS_OFFLINE": "1"})
 )
 
 # Load secrets from .env
@@ -15,7 +42,10 @@ secret = modal.Secret.from_dotenv()
     image=image,
     secrets=[secret],
     timeout=600,
+    min_containers=MIN_CONTAINERS,
+    scaledown_window=SCALEDOWN_WINDOW,
 )
+@modal.concurrent(max_inputs=MAX_INPUTS)
 @modal.asgi_app()
 def fastapi_app():
     import sys
@@ -23,4 +53,17 @@ def fastapi_app():
     import main_local
     return main_local.app  # main.app must be your FastAPI() instance
 
-
+@app.function(
+    image=tabular_image,
+    secrets=[secret],
+    timeout=600,
+    min_containers=TABULAR_MIN_CONTAINERS,
+    scaledown_window=SCALEDOWN_WINDOW,
+)
+@modal.concurrent(max_inputs=MAX_INPUTS)
+@modal.asgi_app()
+def fastapi_tabular_app():
+    import sys
+    sys.path.append("/app")
+    import main_local
+    return main_local.app
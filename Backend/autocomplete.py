@@ -0,0 +1,170 @@
+"""
+Typeahead over restaurant names, cities, localities and cuisines.
+
+Every distinct value becomes one entry, ranked by the total Votes of its
+restaurants (then by the best Aggregate rating among them) and numbered in that
+order, so "best" is simply "lowest entry number". Each entry is indexed under
+every word start of its lowercased label ("domino's pizza" and "pizza"), and the
+keys are kept sorted in one NUL-separated UTF-8 buffer, like StringColumn. A
+prefix is two binary searches over that buffer; prefixes matching more than
+PRECOMPUTE_MIN_KEYS keys have their top MAX_COMPLETIONS entries computed at
+load, so short, popular prefixes never scan their whole range.
+"""
+import re
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+# kind -> store field
+AUTOCOMPLETE_KINDS = {"name": "restaurant_name", "city": "city", "locality": "locality", "cuisine": "cuisines"}
+MAX_COMPLETIONS = 20
+PRECOMPUTE_MIN_KEYS = 256
+WHITESPACE = re.compile(r"\s+")
+
+def fold(text):
+    """Lowercase with whitespace runs collapsed to one space, as labels and typed prefixes are matched"""
+    return WHITESPACE.sub(" ", text.lower())
+
+def word_suffixes(label):
+    """The label from each word start on, e.g. domino's pizza -> [domino's pizza, pizza]"""
+    suffixes, start = [label], label.find(" ") + 1
+    while start:
+        suffixes.append(label[start:])
+        start = label.find(" ", start) + 1
+    return suffixes
+
+class PrefixIndex:
+    """Sorted word-start keys of one kind's entries, with precomputed completions for broad prefixes"""
+
+    __slots__ = ("data", "offsets", "entries", "top")
+
+    def __init__(self, labels, entries):
+        keys, key_entries = [], []
+        for entry, label in zip(entries, labels):
+            for suffix in word_suffixes(label):
+                keys.append(suffix.encode("utf-8"))
+                key_entries.append(entry)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        keys = [keys[i] for i in order]
+        self.data = b"\0".join(keys)
+        self.offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum([len(key) + 1 for key in keys], out=self.offsets[1:])
+        self.entries = np.asarray(key_entries, dtype=np.int32)[np.asarray(order, dtype=np.int64)]
+        self.top = {}
+        self._precompute()
+
+    def _key(self, length):
+        """Key i truncated to `length` bytes, for bisect"""
+        data, offsets = self.data, self.offsets
+        return lambda i: data[offsets[i]:min(offsets[i] + length, offsets[i + 1] - 1)]
+
+    def _best(self, lo, hi, limit=MAX_COMPLETIONS):
+        """The `limit` lowest distinct entry numbers in keys lo..hi"""
+        entries = self.entries[lo:hi]
+        # An entry has one key per word, so a few times `limit` smallest keys usually hold `limit` entries
+        take = 4 * limit
+        while take < len(entries):
+            best = np.unique(np.partition(entries, take)[:take])
+            if len(best) >= limit:
+                return best[:limit]
+            take *= 4
+        return np.unique(entries)[:limit]
+
+    def _precompute(self):
+        """Top entries for every prefix whose key range exceeds PRECOMPUTE_MIN_KEYS, found depth-first"""
+        stack = [(b"", 0, len(self.entries))]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            self.top[prefix] = self._best(lo, hi)
+            key = self._key(len(prefix) + 1)
+            # Keys equal to the prefix sort first and have no children
+            start = bisect_right(range(len(self.entries)), prefix, lo, hi, key=key)
+            while start < hi:
+                child = key(start)
+                end = bisect_right(range(len(self.entries)), child, start, hi, key=key)
+                if end - start > PRECOMPUTE_MIN_KEYS:
+                    stack.append((child, start, end))
+                start = end
+
+    def complete(self, prefix: bytes, limit: int):
+        """Best entry numbers among keys starting with prefix"""
+        top = self.top.get(prefix)
+        if top is not None:
+            return top[:limit]
+        key = self._key(len(prefix))
+        lo = bisect_left(range(len(self.entries)), prefix, key=key)
+        hi = bisect_right(range(len(self.entries)), prefix, lo, key=key)
+        return self._best(lo, hi, limit)
+
+    @property
+    def nbytes(self):
+        return len(self.data) + self.offsets.nbytes + self.entries.nbytes + sum(t.nbytes for t in self.top.values())
+
+class AutocompleteIndex:
+    __slots__ = ("labels", "kinds", "restaurant_ids", "counts", "indexes")
+
+    def __init__(self, store):
+        votes = store.column("votes").astype(np.float64)
+        ratings = store.column("aggregate_rating")
+        restaurant_id = store.column("restaurant_id")
+        # Rows from most to least voted: the first row seen for a value is its best restaurant
+        by_votes = np.lexsort((-ratings, -votes))
+        labels, kinds, restaurant_ids, counts, total_votes, best_ratings = [], [], [], [], [], []
+        for kind, field in AUTOCOMPLETE_KINDS.items():
+            column = store.column(field)
+            categories = column.categories
+            n_values = len(categories)
+            value_votes = np.bincount(column.codes, weights=votes, minlength=n_values)
+            value_counts = np.bincount(column.codes, minlength=n_values)
+            best = np.empty(n_values, dtype=np.int64)
+            best[column.codes[by_votes[::-1]]] = by_votes[::-1]
+            if kind == "cuisine":
+                # "North Indian, Chinese" counts toward both cuisines
+                cuisines = {}
+                for value, value_vote, count, row in zip(categories, value_votes, value_counts, best):
+                    for cuisine in filter(None, (c.strip() for c in value.split(","))):
+                        vote_sum, total, best_row = cuisines.get(cuisine, (0.0, 0, row))
+                        if votes[row] > votes[best_row]:
+                            best_row = row
+                        cuisines[cuisine] = (vote_sum + value_vote, total + count, best_row)
+                values = [(cuisine, *stats) for cuisine, stats in cuisines.items()]
+            else:
+                values = [v for v in zip(categories, value_votes, value_counts, best) if v[0].strip()]
+            for label, vote_sum, count, row in values:
+                labels.append(" ".join(label.split()))
+                kinds.append(kind)
+                restaurant_ids.append(int(restaurant_id[row]) if kind == "name" else None)
+                counts.append(int(count))
+                total_votes.append(vote_sum)
+                best_ratings.append(ratings[row])
+
+        order = np.lexsort((-np.array(best_ratings), -np.array(total_votes))).tolist()
+        self.labels = [labels[i] for i in order]
+        self.kinds = [kinds[i] for i in order]
+        self.restaurant_ids = [restaurant_ids[i] for i in order]
+        self.counts = [counts[i] for i in order]
+        # Labels already have single spaces
+        folded = [label.lower() for label in self.labels]
+        self.indexes = {
+            kind: PrefixIndex([folded[e] for e in entries], entries)
+            for kind in AUTOCOMPLETE_KINDS
+            for entries in [[e for e, k in enumerate(self.kinds) if k == kind]]
+        }
+
+    def complete(self, prefix: str, limit: int = 10, kinds=None):
+        """Up to `limit` suggestions for a typed prefix, best first"""
+        prefix = fold(prefix.lstrip()).encode("utf-8")
+        limit = min(limit, MAX_COMPLETIONS)
+        if not prefix or limit <= 0:
+            return []
+        found = [self.indexes[kind].complete(prefix, limit) for kind in (kinds or AUTOCOMPLETE_KINDS)]
+        entries = np.sort(np.concatenate(found))[:limit].tolist()
+        return [
+            {"kind": self.kinds[e], "label": self.labels[e], "restaurant_id": self.restaurant_ids[e],
+             "count": self.counts[e]}
+            for e in entries
+        ]
+
+    @property
+    def nbytes(self):
+        return sum(index.nbytes for index in self.indexes.values())
@@ -0,0 +1,49 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from store import EXCEL_ENGINE
+
+def load_merged(csv_path="zomato.csv", excel_path="Country-Code.xlsx"):
+    """The merged restaurant frame, loaded the same way as the API"""
+    df_main = pd.read_csv(csv_path, encoding='latin-1')
+    df_country = pd.read_excel(excel_path, engine=EXCEL_ENGINE)
+    df = pd.merge(df_main, df_country, on='Country Code', how='left')
+    df['id'] = df.index
+    return df
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "n": int(len(ms)),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+def measure(fn, repeat=50, warmup=3):
+    """Call fn() warmup + repeat times and summarize the timed calls"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def print_table(results, extra_columns=()):
+    columns = ["p50_ms", "p95_ms", "p99_ms", "mean_ms", *extra_columns]
+    width = max(len(name) for name in results) + 2
+    print(f"{'benchmark':<{width}}" + "".join(f"{c:>12}" for c in columns))
+    for name, row in results.items():
+        cells = "".join(f"{row[c]:>12.3f}" if isinstance(row[c], float) else f"{row[c]:>12}" for c in columns)
+        print(f"{name:<{width}}{cells}")
+
+def write_json(results, path, **meta):
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
@@ -0,0 +1,88 @@
+"""
+Response compression tradeoff: for representative response bodies, the CPU time
+and compressed size of every available encoding (see compress.py) at a range of
+levels, and what that means end to end at a few link speeds
+(compress time + compressed bytes / bandwidth). A cache hit's cost (hashing the
+body and a lookup) is reported next to them.
+
+    python -m benchmarks.compression
+    python -m benchmarks.compression --csv zomato_100k.csv --bandwidth 5 50 --json compression.json
+"""
+import argparse
+import hashlib
+import json
+
+from benchmarks.common import load_merged, measure, write_json
+from compress import CODECS, available_encodings
+from export import ndjson_stream
+from store import RestaurantStore
+
+LEVELS = {"gzip": (1, 4, 6, 9), "br": (1, 4, 5, 7, 11), "zstd": (1, 3, 6, 10, 19)}
+
+def bodies(store):
+    """Bodies shaped like the API's: JSON lists of records and an NDJSON export"""
+    everything = store.filter_positions()
+    city = store.filter_positions(city="new delhi")
+    return {
+        "list.limit20": json.dumps(store.records(everything[:20]), ensure_ascii=False).encode("utf-8"),
+        "list.limit1000": json.dumps(store.records(everything[:1000]), ensure_ascii=False).encode("utf-8"),
+        "facets": json.dumps({
+            name: [{"value": v, "count": n} for v, n in store.facet_counts(name)[:500]]
+            for name in ("country", "city", "cuisine")
+        }, ensure_ascii=False).encode("utf-8"),
+        "export.city": b"".join(ndjson_stream(store, city[:20000], 500)),
+    }
+
+def run(store, bandwidths_mbps, repeat=10):
+    results = {}
+    for body_name, body in bodies(store).items():
+        # Slow levels on big bodies are timed fewer times
+        body_repeat = max(2, min(repeat, int(repeat * 200_000 / max(len(body), 1))))
+        # What a cached body costs instead of compressing it; its size is that of the cached encoding
+        results[f"{body_name}.cache_hit"] = measure(lambda: hashlib.blake2b(body, digest_size=16).digest(), repeat)
+        for encoding in available_encodings():
+            compress = CODECS[encoding][0]
+            for level in LEVELS[encoding]:
+                size = len(compress(body, level))
+                row = measure(lambda: compress(body, level), body_repeat, warmup=1)
+                row.update(bytes=size, ratio=len(body) / size)
+                results[f"{body_name}.{encoding}{level}"] = row
+        results[f"{body_name}.identity"] = {
+            "n": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "bytes": len(body), "ratio": 1.0,
+        }
+    for row in results.values():
+        if "bytes" not in row:
+            continue
+        for mbps in bandwidths_mbps:
+            row[f"total_ms@{mbps:g}Mbps"] = row["p50_ms"] + row["bytes"] * 8 / (mbps * 1000.0)
+    return results
+
+def print_results(results, bandwidths_mbps):
+    columns = ["p50_ms", "bytes", "ratio", *(f"total_ms@{mbps:g}Mbps" for mbps in bandwidths_mbps)]
+    width = max(len(name) for name in results) + 2
+    print(f"{'benchmark':<{width}}" + "".join(f"{c:>18}" for c in columns))
+    for name, row in results.items():
+        cells = "".join(
+            f"{'-':>18}" if c not in row else f"{row[c]:>18.3f}" if isinstance(row[c], float) else f"{row[c]:>18}"
+            for c in columns
+        )
+        print(f"{name:<{width}}{cells}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="zomato.csv")
+    parser.add_argument("--excel", default="Country-Code.xlsx")
+    parser.add_argument("--bandwidth", type=float, nargs="+", default=[10.0, 100.0, 1000.0], help="Link speeds in Mbit/s")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    store = RestaurantStore.from_dataframe(load_merged(args.csv, args.excel))
+    print(f"{len(store):,} restaurants, encodings: {', '.join(available_encodings())}")
+    results = run(store, args.bandwidth, args.repeat)
+    print_results(results, args.bandwidth)
+    if args.json:
+        write_json(results, args.json, csv=args.csv, rows=len(store), bandwidth_mbps=args.bandwidth)
+
+if __name__ == "__main__":
+    main()
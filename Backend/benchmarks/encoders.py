@@ -0,0 +1,89 @@
+"""
+Embedding backend comparison: load time, resident memory, single-query latency,
+bulk encode throughput, and cosine agreement with the first backend listed.
+Each backend runs in a fresh process so memory numbers are not shared.
+
+    python -m benchmarks.encoders --onnx-dir models/all-MiniLM-L6-v2-onnx
+    python -m benchmarks.encoders --backends sentence-transformers onnx-int8 --texts 5000 --json encoders.json
+"""
+import argparse
+import multiprocessing
+import time
+
+import numpy as np
+
+from benchmarks.common import load_merged, measure, print_table, write_json
+from encoders import BACKENDS, DEFAULT_MODEL, VERIFY_TEXTS, cosine_agreement, load_encoder
+
+def rss_mb():
+    """Current resident set size of this process in MB (Linux)"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return float("nan")
+
+def sample_texts(csv_path, excel_path, n, seed):
+    df = load_merged(csv_path, excel_path)
+    columns = ['Restaurant Name', 'Cuisines', 'Locality', 'City', 'Country']
+    texts = df[columns].fillna("").astype(str).agg(" ".join, axis=1).tolist()
+    rng = np.random.default_rng(seed)
+    return [texts[i] for i in rng.choice(len(texts), size=min(n, len(texts)), replace=False)]
+
+def bench_backend(backend, model_name, onnx_dir, threads, texts, repeat):
+    before = rss_mb()
+    start = time.perf_counter()
+    encoder = load_encoder(backend, model_name, onnx_dir, threads)
+    load_seconds = time.perf_counter() - start
+    loaded = rss_mb()
+
+    query = measure(lambda: encoder.encode(["cheap north indian food with delivery"]), repeat)
+    start = time.perf_counter()
+    embeddings = encoder.encode(texts)
+    bulk_seconds = time.perf_counter() - start
+    return {
+        **query,
+        "load_s": load_seconds,
+        "rss_mb": loaded - before,
+        "peak_rss_mb": rss_mb() - before,
+        "texts_per_s": len(texts) / bulk_seconds,
+        "embeddings": embeddings,
+        "verify": encoder.encode(VERIFY_TEXTS),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--onnx-dir", help="Directory written by `python encoders.py --out ...`")
+    parser.add_argument("--threads", type=int, help="onnxruntime intra-op threads")
+    parser.add_argument("--csv", default="zomato.csv")
+    parser.add_argument("--excel", default="Country-Code.xlsx")
+    parser.add_argument("--texts", type=int, default=2000, help="Restaurant texts for the bulk throughput run")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    texts = sample_texts(args.csv, args.excel, args.texts, args.seed)
+    context = multiprocessing.get_context("spawn")
+    results, reference = {}, None
+    for backend in args.backends:
+        with context.Pool(1) as pool:
+            row = pool.apply(bench_backend, (backend, args.model, args.onnx_dir, args.threads, texts, args.repeat))
+        embeddings, verify = row.pop("embeddings"), row.pop("verify")
+        if reference is None:
+            reference = (backend, np.vstack([embeddings, verify]))
+        cosines = cosine_agreement(reference[1], np.vstack([embeddings, verify]))
+        row["min_cosine"] = float(cosines.min())
+        row["mean_cosine"] = float(cosines.mean())
+        results[backend] = row
+
+    print(f"{len(texts):,} bulk texts; cosine agreement against {reference[0]}")
+    print_table(results, extra_columns=("load_s", "rss_mb", "peak_rss_mb", "texts_per_s", "min_cosine"))
+    if args.json:
+        write_json(results, args.json, model=args.model, onnx_dir=args.onnx_dir, texts=len(texts),
+                   threads=args.threads, seed=args.seed)
+
+if __name__ == "__main__":
+    main()
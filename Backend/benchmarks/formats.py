@@ -0,0 +1,104 @@
+"""
+Response formats a client can negotiate with Accept (see export.RESPONSE_FORMATS):
+for /restaurants-shaped pages and a /semantic-search-shaped answer, the server's
+time to gather and encode the body, its size, and the client's time to parse it
+and to load it into a pandas DataFrame. JSON is timed as records + json.dumps,
+without the response-model validation full JSON pages also pay.
+
+    python -m benchmarks.formats
+    python -m benchmarks.formats --csv zomato_100k.csv --json formats.json
+
+Formats whose package (msgpack, pyarrow) is not installed are skipped.
+"""
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import load_merged, measure, write_json
+from export import arrow_body, available_formats, msgpack_body
+from store import RestaurantStore
+
+PROJECTION = ["restaurant_id", "restaurant_name", "latitude", "longitude", "aggregate_rating"]
+
+def encoder(store, fmt, positions, fields=None, extra=None):
+    """fn() building the body the way the API's encode_rows does"""
+    extra = extra or {}
+    if fmt == "arrow":
+        return lambda: arrow_body({**store.gather_arrays(positions, fields), **extra})
+
+    def encode():
+        records = store.records(positions, fields)
+        for name, values in extra.items():
+            for record, value in zip(records, values.tolist()):
+                record[name] = value
+        if fmt == "msgpack":
+            return msgpack_body(records)
+        return json.dumps(records, ensure_ascii=False).encode("utf-8")
+    return encode
+
+def decoders(fmt):
+    """(parse(body), to_dataframe(body)) for a client of this format"""
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        return (lambda body: pa.ipc.open_stream(body).read_all(),
+                lambda body: pa.ipc.open_stream(body).read_all().to_pandas())
+    if fmt == "msgpack":
+        import msgpack
+
+        return msgpack.unpackb, lambda body: pd.DataFrame(msgpack.unpackb(body))
+    return json.loads, lambda body: pd.DataFrame(json.loads(body))
+
+def run(store, repeat=50, seed=0):
+    everything = store.filter_positions()
+    rng = np.random.default_rng(seed)
+    semantic = rng.choice(len(store), size=10, replace=False)
+    cases = {
+        "list.limit20": (everything[:20], None, None),
+        "list.limit1000": (everything[:1000], None, None),
+        "list.limit1000.fields5": (everything[:1000], PROJECTION, None),
+        "semantic.limit10": (semantic, None, {"similarity": rng.random(10, dtype=np.float32)}),
+    }
+    results = {}
+    for case, (positions, fields, extra) in cases.items():
+        for fmt in available_formats():
+            encode = encoder(store, fmt, positions, fields, extra)
+            body = encode()
+            parse, to_dataframe = decoders(fmt)
+            row = measure(encode, repeat)
+            row.update(
+                bytes=len(body),
+                parse_ms=measure(lambda: parse(body), repeat)["p50_ms"],
+                dataframe_ms=measure(lambda: to_dataframe(body), repeat)["p50_ms"],
+            )
+            results[f"{case}.{fmt}"] = row
+    return results
+
+def print_results(results):
+    columns = ["p50_ms", "bytes", "parse_ms", "dataframe_ms"]
+    width = max(len(name) for name in results) + 2
+    print(f"{'benchmark':<{width}}" + "".join(f"{c:>14}" for c in columns))
+    for name, row in results.items():
+        cells = "".join(f"{row[c]:>14.3f}" if isinstance(row[c], float) else f"{row[c]:>14}" for c in columns)
+        print(f"{name:<{width}}{cells}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="zomato.csv")
+    parser.add_argument("--excel", default="Country-Code.xlsx")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    store = RestaurantStore.from_dataframe(load_merged(args.csv, args.excel))
+    print(f"{len(store):,} restaurants, formats: {', '.join(available_formats())}")
+    results = run(store, args.repeat, args.seed)
+    print_results(results)
+    if args.json:
+        write_json(results, args.json, csv=args.csv, rows=len(store), seed=args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Upload preprocessing for /image-search-nearby on phone-sized photos: what the
+recognizer is sent and what it costs to produce, for
+
+    raw         the upload forwarded as is (the previous behaviour)
+    thumbnail   full decode, EXIF rotation, Pillow thumbnail and JPEG re-encode
+    pipeline    images.preprocess_image: draft decode at a reduced DCT scale,
+                box reduction, then rotation and re-encode
+
+Photos are synthetic (smooth colour fields plus sensor-like noise, with an EXIF
+orientation), seeded, and sized like common phone cameras. `decoded_mpix` is
+the largest pixel buffer held while processing.
+
+    python -m benchmarks.images
+    python -m benchmarks.images --max-side 768 --quality 80 --json images.json
+"""
+import argparse
+import io
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from benchmarks.common import measure, write_json
+from images import DRAFT_SCALES, preprocess_image, reduction
+
+# name -> (width, height, format)
+PHOTOS = {
+    "phone_12mp.jpg": (4032, 3024, "JPEG"),
+    "phone_8mp.jpg": (3264, 2448, "JPEG"),
+    "phone_50mp.jpg": (8160, 6120, "JPEG"),
+    "screenshot.png": (1170, 2532, "PNG"),
+}
+
+def synthetic_photo(width, height, fmt, seed=0):
+    """Encoded bytes of a photo-like image: low-frequency colour plus noise, rotated by EXIF"""
+    rng = np.random.default_rng(seed)
+    coarse = rng.uniform(0, 255, (height // 64 + 2, width // 64 + 2, 3)).astype(np.uint8)
+    image = Image.fromarray(coarse).resize((width, height), Image.Resampling.BICUBIC)
+    pixels = np.asarray(image, dtype=np.int16) + rng.normal(0, 6, (height, width, 3)).astype(np.int16)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees, as phones store portrait shots
+        image.save(out, fmt, quality=92, exif=exif)
+    else:
+        image.save(out, fmt)
+    return out.getvalue()
+
+def thumbnail(data, max_side, quality):
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    image.thumbnail((max_side, max_side))
+    out = io.BytesIO()
+    image.convert("RGB").save(out, "JPEG", quality=quality)
+    return out.getvalue()
+
+def pipeline_pixels(width, height, fmt, max_side):
+    """Megapixels preprocess_image decodes a width x height image at"""
+    if fmt != "JPEG":
+        return width * height / 1e6
+    scale = next(s for s in DRAFT_SCALES if s <= reduction(max(width, height), max_side))
+    return -(-width // scale) * -(-height // scale) / 1e6
+
+def run(max_side=1024, quality=85, repeat=10, bandwidth_mbps=20.0):
+    results = {}
+    for name, (width, height, fmt) in PHOTOS.items():
+        data = synthetic_photo(width, height, fmt)
+        sent = {
+            "raw": (data, None, width * height / 1e6),
+            "thumbnail": (thumbnail(data, max_side, quality), lambda: thumbnail(data, max_side, quality),
+                          width * height / 1e6),
+            "pipeline": (preprocess_image(io.BytesIO(data), max_side, quality)[0],
+                         lambda: preprocess_image(io.BytesIO(data), max_side, quality),
+                         pipeline_pixels(width, height, fmt, max_side)),
+        }
+        for method, (body, fn, mpix) in sent.items():
+            row = measure(fn, max(3, repeat * 4_000_000 // (width * height)), warmup=1) if fn else {"p50_ms": 0.0}
+            row.update(upload_bytes=len(data), sent_bytes=len(body), decoded_mpix=mpix)
+            row["total_ms"] = row["p50_ms"] + len(body) * 8 / (bandwidth_mbps * 1000.0)
+            results[f"{name}.{method}"] = row
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-side", type=int, default=1024)
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--bandwidth", type=float, default=20.0, help="Uplink to the recognizer in Mbit/s")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.max_side, args.quality, args.repeat, args.bandwidth)
+    columns = ["p50_ms", "upload_bytes", "sent_bytes", "decoded_mpix", "total_ms"]
+    width = max(len(name) for name in results) + 2
+    print(f"total_ms = processing + sending the result at {args.bandwidth:g} Mbit/s")
+    print(f"{'benchmark':<{width}}" + "".join(f"{c:>14}" for c in columns))
+    for name, row in results.items():
+        cells = "".join(f"{row[c]:>14.3f}" if isinstance(row[c], float) else f"{row[c]:>14}" for c in columns)
+        print(f"{name:<{width}}{cells}")
+    if args.json:
+        write_json(results, args.json, max_side=args.max_side, quality=args.quality, bandwidth_mbps=args.bandwidth)
+
+if __name__ == "__main__":
+    main()
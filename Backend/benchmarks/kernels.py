@@ -0,0 +1,134 @@
+"""
+Micro-benchmarks for the kernels behind every endpoint: filters, distance,
+similarity and serialization. Embeddings are random unit vectors so no model is
+needed; everything is seeded and reproducible.
+
+    python -m benchmarks.kernels
+    python -m benchmarks.kernels --csv zomato_100k.csv --baselines --json bench.json
+"""
+import argparse
+import json
+
+import numpy as np
+
+from benchmarks.common import load_merged, measure, print_table, write_json
+from autocomplete import AutocompleteIndex
+from export import ndjson_stream
+from fuzzy import FuzzyNameIndex
+from geo import GridIndex, haversine_km
+from ranking import NearbyRanker
+from semantic import batch_similarity_top_k, top_k_positions
+from store import RestaurantStore
+
+def random_embeddings(n, dim, seed):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((n, dim), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+def run(df, store, dim=384, repeat=30, baselines=False, seed=0):
+    rng = np.random.default_rng(seed)
+    results = {}
+    lats, lngs = store.column("latitude"), store.column("longitude")
+    located = np.flatnonzero((lats != 0) | (lngs != 0))
+    centers = [(float(lats[i]), float(lngs[i])) for i in rng.choice(located, size=16)]
+    index = GridIndex(lats, lngs)
+
+    # === FILTER ===
+    results["filter.city"] = measure(lambda: store.filter_mask(city="new delhi"), repeat)
+    results["filter.cuisine_cost"] = measure(lambda: store.filter_mask(cuisine="italian", min_cost=500, max_cost=2000), repeat)
+    results["filter.name_literal"] = measure(lambda: store.contains("restaurant_name", "pizza"), repeat)
+    results["filter.name_regex"] = measure(lambda: store.contains("restaurant_name", "pizza|burger"), repeat)
+    fuzzy = FuzzyNameIndex(store)
+    results["filter.name_fuzzy"] = measure(
+        lambda: [fuzzy.search(q) for q in ("izakya kikufuji", "dominoes piza", "hauz khas socail")], repeat)
+    if baselines:
+        results["filter.city.pandas"] = measure(lambda: df['City'].str.contains("new delhi", case=False, na=False), repeat)
+        results["filter.name_literal.pandas"] = measure(
+            lambda: df['Restaurant Name'].str.contains("pizza", case=False, na=False), repeat)
+        results["filter.name_regex.pandas"] = measure(
+            lambda: df['Restaurant Name'].str.contains("pizza|burger", case=False, na=False), repeat)
+
+    # === AGGREGATION ===
+    everything = np.arange(len(store))
+    dashboard = ["count", "mean:aggregate_rating", "max:votes", "histogram:average_cost_for_two"]
+    for group_by in ("city", "rating_text", "restaurant_name"):
+        results[f"aggregate.{group_by}"] = measure(lambda: store.aggregate(everything, group_by, dashboard, limit=100), repeat)
+    if baselines:
+        results["aggregate.city.pandas"] = measure(lambda: df.groupby("City").agg(
+            rating=("Aggregate rating", "mean"), votes=("Votes", "max")), repeat)
+
+    # === AUTOCOMPLETE ===
+    autocomplete = AutocompleteIndex(store)
+    for length in (1, 3, 5):
+        prefixes = [name[:length] for name in ("pizza", "cafe", "new delhi", "biryani", "london", "sushi")]
+        results[f"autocomplete.prefix{length}"] = measure(lambda: [autocomplete.complete(p) for p in prefixes], repeat)
+
+    # === DISTANCE ===
+    for radius in (1, 5, 25):
+        results[f"distance.grid.r{radius}km"] = measure(
+            lambda: [index.query(lat, lng, radius, 20) for lat, lng in centers], repeat)
+    results["distance.full_scan"] = measure(
+        lambda: [np.argsort(haversine_km(lat, lng, lats, lngs))[:20] for lat, lng in centers], repeat)
+    if baselines:
+        from geopy.distance import great_circle
+        sample = df.head(min(len(df), 10_000))
+        lat, lng = centers[0]
+        results["distance.geopy_apply_10k"] = measure(
+            lambda: sample.apply(lambda row: great_circle((lat, lng), (row['Latitude'], row['Longitude'])).km, axis=1),
+            max(repeat // 10, 3), warmup=1)
+
+    # === RANKING ===
+    # Best-first search over grid rings vs scoring every restaurant in the radius
+    ranker = NearbyRanker(store, index)
+    for radius in (1, 5, 25, 100):
+        results[f"ranking.nearby.r{radius}km"] = measure(
+            lambda: [ranker.top_k(lat, lng, radius, 20) for lat, lng in centers], repeat)
+        results[f"ranking.nearby.r{radius}km.exhaustive"] = measure(
+            lambda: [ranker.top_k_exhaustive(lat, lng, radius, 20) for lat, lng in centers], repeat)
+
+    # === SIMILARITY ===
+    embeddings = random_embeddings(len(store), dim, seed)
+    queries = random_embeddings(64, dim, seed + 1)
+    results["similarity.single"] = measure(lambda: top_k_positions(embeddings @ queries[0], 10), repeat)
+    results["similarity.batch64"] = measure(
+        lambda: list(batch_similarity_top_k(queries, embeddings, [10] * len(queries))), repeat)
+    if baselines:
+        stacked = list(embeddings)
+        results["similarity.single.stack_sort"] = measure(
+            lambda: np.argsort(-np.dot(np.stack(stacked), queries[0]))[:10], max(repeat // 10, 3), warmup=1)
+
+    # === SERIALIZATION ===
+    page = rng.choice(len(store), size=20, replace=False)
+    bulk = rng.choice(len(store), size=min(1000, len(store)), replace=False)
+    results["serialize.records20_json"] = measure(lambda: json.dumps(store.records(page)), repeat)
+    results["serialize.records1000_json"] = measure(lambda: json.dumps(store.records(bulk)), repeat)
+    export_positions = np.arange(min(10_000, len(store)))
+    results["serialize.ndjson10k"] = measure(lambda: sum(map(len, ndjson_stream(store, export_positions))), max(repeat // 5, 3))
+    if baselines:
+        sample = df.iloc[page]
+        results["serialize.iterrows20"] = measure(
+            lambda: [{column: row[column] for column in df.columns} for _, row in sample.iterrows()], repeat)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="zomato.csv")
+    parser.add_argument("--excel", default="Country-Code.xlsx")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--baselines", action="store_true", help="Also time the original pandas/geopy implementations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    df = load_merged(args.csv, args.excel)
+    store = RestaurantStore.from_dataframe(df)
+    print(f"{len(store):,} restaurants, embedding dim {args.dim}")
+    results = run(df, store, args.dim, args.repeat, args.baselines, args.seed)
+    print_table(results)
+    if args.json:
+        write_json(results, args.json, csv=args.csv, rows=len(store), dim=args.dim, seed=args.seed)
+
+if __name__ == "__main__":
+    main()
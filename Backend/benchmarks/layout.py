@@ -0,0 +1,76 @@
+"""
+Row layout comparison: the same filter, listing, export and nearby workloads
+against a store kept in CSV order and stores sorted by country, city and a
+space-filling curve (see store.layout_order). The effect grows with the table,
+so run it on a scaled dataset.
+
+    python -m benchmarks.layout --csv zomato_1m.csv
+    python -m benchmarks.layout --csv zomato_1m.csv --layouts csv hilbert --json layout.json
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import load_merged, measure, print_table, write_json
+from geo import GridIndex
+from store import ROW_LAYOUTS, RestaurantStore, layout_order
+
+CITIES = ["gurgaon", "noida", "faridabad", "london", "manila"]
+
+def run(df, layout, repeat=20, seed=0):
+    ordered = df.iloc[layout_order(df, layout)].reset_index(drop=True)
+    store = RestaurantStore.from_dataframe(ordered)
+    lats, lngs = store.column("latitude"), store.column("longitude")
+    index = GridIndex(lats, lngs)
+    rng = np.random.default_rng(seed)
+    located = np.flatnonzero((lats != 0) | (lngs != 0))
+    # The same restaurants as centers for every layout
+    ids = np.sort(store.column("id")[located])[rng.integers(0, len(located), size=16)]
+    by_id = {int(i): p for p, i in enumerate(store.column("id"))}
+    centers = [(float(lats[by_id[int(i)]]), float(lngs[by_id[int(i)]])) for i in ids]
+
+    results = {}
+    results["filter.city.mask"] = measure(
+        lambda: [np.flatnonzero(store.filter_mask(city=c)) for c in CITIES], repeat)
+    results["filter.city.positions"] = measure(lambda: [store.filter_positions(city=c) for c in CITIES], repeat)
+    results["filter.city_cuisine_cost"] = measure(
+        lambda: [store.filter_positions(city=c, cuisine="north indian|cafe", min_cost=300, max_cost=1500)
+                 for c in CITIES], repeat)
+    results["list.city_page20"] = measure(
+        lambda: [store.records(store.filter_positions(city=c)[:20]) for c in CITIES], repeat)
+    results["export.city_gather"] = measure(
+        lambda: [sum(1 for _ in store.iter_chunks(store.filter_positions(city=c), 5000)) for c in CITIES[1:]],
+        max(repeat // 4, 3))
+    for radius in (1, 5, 25):
+        results[f"nearby.r{radius}km"] = measure(
+            lambda: [store.records(index.query(lat, lng, radius, 20)[0]) for lat, lng in centers], repeat)
+        results[f"nearby.r{radius}km.candidates"] = measure(
+            lambda: [lats[index.candidates(lat, lng, radius)].sum() for lat, lng in centers], repeat)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="zomato.csv")
+    parser.add_argument("--excel", default="Country-Code.xlsx")
+    parser.add_argument("--layouts", nargs="+", choices=ROW_LAYOUTS, default=list(ROW_LAYOUTS))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    df = load_merged(args.csv, args.excel)
+    print(f"{len(df):,} restaurants")
+    results = {}
+    for layout in args.layouts:
+        for name, row in run(df, layout, args.repeat, args.seed).items():
+            results[f"{name}[{layout}]"] = row
+    # p50 relative to the first layout listed
+    base = args.layouts[0]
+    for name, row in results.items():
+        row["speedup"] = results[f"{name.rsplit('[', 1)[0]}[{base}]"]["p50_ms"] / row["p50_ms"]
+    print_table(dict(sorted(results.items())), extra_columns=("speedup",))
+    if args.json:
+        write_json(results, args.json, csv=args.csv, rows=len(df), layouts=args.layouts, seed=args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+In-process load generator: drives the FastAPI app through ASGI (no network or
+server process) with a weighted mix of realistic queries, and reports latency
+percentiles and throughput per endpoint.
+
+    python -m benchmarks.loadgen --app main_local:app --requests 2000 --concurrency 16
+    python -m benchmarks.loadgen --mix semantic --json load.json
+"""
+import argparse
+import asyncio
+import importlib
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+import httpx
+import numpy as np
+
+from benchmarks.common import print_table, summarize, write_json
+from metrics import SINGLEFLIGHT_REQUESTS
+
+CITIES = ["New Delhi", "Gurgaon", "Noida", "London", "Singapore", "Dubai", "Manila", "Sao Paulo"]
+CUISINES = ["North Indian", "Chinese", "Italian", "Cafe", "Pizza", "Japanese", "Desserts", "Fast Food"]
+NAMES = ["pizza", "cafe", "burger", "biryani", "bar", "kitchen", "dhaba", "sushi"]
+QUERIES = [
+    "cheap north indian food with delivery", "romantic italian dinner", "rooftop bar with live music",
+    "family friendly chinese restaurant", "late night burgers", "best desserts and coffee",
+    "authentic japanese sushi", "vegetarian thali",
+]
+RESTAURANT_IDS = [6317637, 6304287, 18222559, 308322, 18189371]
+FALLBACK_POINTS = [(28.6139, 77.2090), (28.4595, 77.0266), (51.5074, -0.1278), (1.3521, 103.8198), (25.2048, 55.2708)]
+
+# (weight, label, request factory)
+MIXES = {
+    "default": [
+        (30, "GET /restaurants", lambda r, p: ("GET", "/restaurants", {"params": {"city": r.choice(CITIES), "limit": 20}})),
+        (25, "GET /restaurants/search", lambda r, p: ("GET", "/restaurants/search", {"params": {"q_name": r.choice(NAMES)}})),
+        (25, "GET /restaurants/nearby", lambda r, p: ("GET", "/restaurants/nearby", {"params": {**p(r), "radius": 3}})),
+        (10, "POST /semantic-search", lambda r, p: ("POST", "/semantic-search", {"json": {"query": r.choice(QUERIES), "limit": 10}})),
+        (10, "GET /restaurants/{id}", lambda r, p: ("GET", f"/restaurants/{r.choice(RESTAURANT_IDS)}", {})),
+    ],
+    "tabular": [
+        (40, "GET /restaurants", lambda r, p: ("GET", "/restaurants", {"params": {"cuisine": r.choice(CUISINES), "limit": 50}})),
+        (30, "GET /restaurants/search", lambda r, p: ("GET", "/restaurants/search", {"params": {"q_city": r.choice(CITIES)}})),
+        (30, "GET /restaurants/nearby", lambda r, p: ("GET", "/restaurants/nearby", {"params": {**p(r), "radius": 5}})),
+    ],
+    # One request per keystroke of a name: substring search vs the prefix index
+    "typeahead": [
+        (50, "GET /restaurants/search", lambda r, p: ("GET", "/restaurants/search", {
+            "params": {"q_name": r.choice(NAMES)[:r.integers(1, 6)], "limit": 10}})),
+        (50, "GET /autocomplete", lambda r, p: ("GET", "/autocomplete", {
+            "params": {"q": r.choice(NAMES)[:r.integers(1, 6)], "limit": 10}})),
+    ],
+    # A promotion: bursts of the same few requests, which single-flight coalescing answers together
+    "promo": [
+        (60, "GET /restaurants/nearby", lambda r, p: ("GET", "/restaurants/nearby", {"params": {
+            **dict(zip(("lat", "lng"), FALLBACK_POINTS[r.integers(2)])), "radius": 5, "limit": 20}})),
+        (40, "POST /semantic-search", lambda r, p: ("POST", "/semantic-search", {"json": {"query": r.choice(QUERIES[:2]), "limit": 10}})),
+    ],
+    "semantic": [
+        (80, "POST /semantic-search", lambda r, p: ("POST", "/semantic-search", {"json": {"query": r.choice(QUERIES), "limit": 10}})),
+        (20, "POST /semantic-search/batch", lambda r, p: ("POST", "/semantic-search/batch", {
+            "json": {"queries": [{"query": q, "limit": 10} for q in r.choice(QUERIES, size=16)]}})),
+    ],
+}
+
+def load_app(spec):
+    module_name, _, attr = spec.partition(":")
+    module = importlib.import_module(module_name)
+    return module, getattr(module, attr or "app")
+
+def point_sampler(module):
+    """Random (lat, lng) near real restaurants, taken from the app's store once it has loaded"""
+    store = getattr(module, "store", None)
+    if store is None:
+        points = np.array(FALLBACK_POINTS)
+    else:
+        lats, lngs = store.column("latitude"), store.column("longitude")
+        located = (lats != 0) | (lngs != 0)
+        points = np.column_stack([lats[located], lngs[located]])
+
+    def sample(rng):
+        lat, lng = points[rng.integers(len(points))]
+        return {"lat": round(float(lat) + rng.normal(0, 0.01), 6), "lng": round(float(lng) + rng.normal(0, 0.01), 6)}
+    return sample
+
+@asynccontextmanager
+async def lifespan(app):
+    """Run the app's ASGI startup/shutdown events, which ASGITransport does not do"""
+    to_app, from_app = asyncio.Queue(), asyncio.Queue()
+    task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}}, to_app.get, from_app.put))
+    await to_app.put({"type": "lifespan.startup"})
+    message = await from_app.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise RuntimeError(f"App startup failed: {message.get('message', message)}")
+    try:
+        yield
+    finally:
+        await to_app.put({"type": "lifespan.shutdown"})
+        await from_app.get()
+        await task
+
+async def run_load(app, module, mix, total, concurrency, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = np.array([w for w, _, _ in mix], dtype=float)
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    async with lifespan(app):
+        sample_point = point_sampler(module)
+        plan = [mix[i] for i in rng.choice(len(mix), size=total, p=weights / weights.sum())]
+        requests = [(label, *factory(rng, sample_point)) for _, label, factory in plan]
+        queue = asyncio.Queue()
+        for request in requests:
+            queue.put_nowait(request)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadgen", timeout=None) as client:
+            async def worker():
+                while not queue.empty():
+                    label, method, url, kwargs = queue.get_nowait()
+                    start = time.perf_counter()
+                    response = await client.request(method, url, **kwargs)
+                    await response.aread()
+                    latencies[label].append(time.perf_counter() - start)
+                    statuses[label][response.status_code] += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+    results = {}
+    for label, samples in sorted(latencies.items()):
+        row = summarize(samples)
+        row["rps"] = len(samples) / elapsed
+        row["errors"] = sum(n for status, n in statuses[label].items() if status >= 500)
+        results[label] = row
+    overall = summarize([s for samples in latencies.values() for s in samples])
+    overall["rps"] = total / elapsed
+    overall["errors"] = sum(row["errors"] for row in results.values())
+    results["ALL"] = overall
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main_local:app", help="module:attribute of the FastAPI app")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    module, app = load_app(args.app)
+    results = asyncio.run(run_load(app, module, MIXES[args.mix], args.requests, args.concurrency, args.seed))
+    print_table(results, extra_columns=("rps", "errors"))
+    for flight in ("nearby", "semantic_search"):
+        leaders, coalesced = SINGLEFLIGHT_REQUESTS.value(flight, "leader"), SINGLEFLIGHT_REQUESTS.value(flight, "coalesced")
+        if leaders:
+            print(f"single-flight {flight}: {coalesced} of {leaders + coalesced} requests coalesced")
+    if args.json:
+        write_json(results, args.json, app=args.app, mix=args.mix, requests=args.requests,
+                   concurrency=args.concurrency, seed=args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Grow zomato.csv to a synthetic dataset of any size for benchmarks.
+
+Rows are sampled with replacement from the original file, given new unique
+Restaurant IDs and names, jittered by up to ~1 km, and given perturbed votes and
+ratings. The same --seed always produces the same file.
+
+    python -m benchmarks.scale_dataset --rows 100000 --out zomato_100k.csv
+    python -m benchmarks.scale_dataset --rows 1000000 --out zomato_1m.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+def scale_dataset(df: pd.DataFrame, rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    scaled = df.iloc[rng.integers(0, len(df), size=rows)].reset_index(drop=True)
+    copy = np.arange(rows) // len(df)
+    scaled['Restaurant ID'] = np.arange(1, rows + 1) + 10**8
+    scaled['Restaurant Name'] = np.where(
+        copy == 0, scaled['Restaurant Name'], scaled['Restaurant Name'].astype(str) + " #" + copy.astype(str)
+    )
+    valid = (scaled['Latitude'] != 0) | (scaled['Longitude'] != 0)
+    jitter = 0.01
+    scaled.loc[valid, 'Latitude'] = (scaled.loc[valid, 'Latitude'] + rng.uniform(-jitter, jitter, valid.sum())).clip(-90, 90).round(6)
+    scaled.loc[valid, 'Longitude'] = (scaled.loc[valid, 'Longitude'] + rng.uniform(-jitter, jitter, valid.sum())).clip(-180, 180).round(6)
+    scaled['Votes'] = (scaled['Votes'] * rng.uniform(0.5, 1.5, rows)).round().astype(int)
+    rated = scaled['Aggregate rating'] > 0
+    scaled.loc[rated, 'Aggregate rating'] = (scaled.loc[rated, 'Aggregate rating'] + rng.normal(0, 0.2, rated.sum())).clip(1.0, 4.9).round(1)
+    return scaled
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--csv", default="zomato.csv", help="Source dataset")
+    parser.add_argument("--out", default=None, help="Output path (default zomato_<rows>.csv)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv, encoding='latin-1')
+    out = args.out or f"zomato_{args.rows}.csv"
+    # CRLF like the source file, so embedded carriage returns get quoted
+    scale_dataset(df, args.rows, args.seed).to_csv(out, index=False, encoding='latin-1', errors='replace', lineterminator='\r\n')
+    print(f"Wrote {args.rows:,} rows to {out}")
+
+if __name__ == "__main__":
+    main()
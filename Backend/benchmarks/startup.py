@@ -0,0 +1,114 @@
+"""
+Cold-start report: runs the app's import and startup in a fresh interpreter
+(with `python -X importtime`) and breaks the time down by imported package and
+by startup phase, for each API profile.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --app main:app --profiles tabular --json startup.json
+"""
+# Only the standard library at module level: the child process must not import
+# anything the app would otherwise be charged for.
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+def run_startup(app):
+    """Drive the ASGI lifespan startup (startup events run here for main.py)"""
+    async def lifespan():
+        to_app, from_app = asyncio.Queue(), asyncio.Queue()
+        task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}}, to_app.get, from_app.put))
+        await to_app.put({"type": "lifespan.startup"})
+        message = await from_app.get()
+        if message["type"] != "lifespan.startup.complete":
+            task.cancel()
+            raise RuntimeError(f"App startup failed: {message.get('message', message)}")
+        await to_app.put({"type": "lifespan.shutdown"})
+        await from_app.get()
+        await task
+    asyncio.run(lifespan())
+
+def child(app_spec):
+    preloaded = sorted({name.split(".")[0] for name in sys.modules})
+    started = time.perf_counter()
+    module_name, _, attr = app_spec.partition(":")
+    module = importlib.import_module(module_name)
+    imported = time.perf_counter()
+    run_startup(getattr(module, attr or "app"))
+    ready = time.perf_counter()
+
+    from metrics import startup_report
+    print(json.dumps({
+        "import_s": imported - started,
+        "startup_s": ready - imported,
+        **startup_report(),
+        "preloaded": preloaded,
+        "ml_stack_loaded": any(name in sys.modules for name in ("torch", "sentence_transformers", "onnxruntime")),
+    }))
+
+def parse_importtime(stderr, exclude=(), top=12):
+    """Cumulative import seconds per top-level package, from `-X importtime` output"""
+    totals = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only imports made directly by the app (two spaces of indent per nesting level)
+        if name.startswith("  "):
+            continue
+        package = name.strip().split(".")[0]
+        if package not in exclude:
+            totals[package] += int(cumulative) / 1e6
+    return dict(sorted(totals.items(), key=lambda kv: -kv[1])[:top])
+
+def profile_startup(app_spec, profile, env=None):
+    env = {**os.environ, **(env or {}), "API_PROFILE": profile}
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "benchmarks.startup", "--child", app_spec],
+        capture_output=True, text=True, env=env,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"{app_spec} ({profile}) failed to start:\n{proc.stderr[-2000:]}")
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    report["process_s"] = wall
+    report["packages"] = parse_importtime(proc.stderr, exclude={"benchmarks", *report.pop("preloaded")})
+    return report
+
+def print_report(profile, report):
+    print(f"\n== {profile}: {report['process_s']:.2f}s to ready "
+          f"(import {report['import_s']:.2f}s, startup {report['startup_s']:.2f}s, "
+          f"ML stack {'loaded' if report['ml_stack_loaded'] else 'not loaded'})")
+    for title, rows in (("imports by package", report["packages"]), ("startup phases", report["phases"]),
+                        ("deferred imports", report["imports"])):
+        if rows:
+            print(f"  {title}:")
+            for name, seconds in rows.items():
+                print(f"    {name:<28}{seconds * 1000:>10.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main_local:app", help="module:attribute of the FastAPI app")
+    parser.add_argument("--profiles", nargs="+", choices=("tabular", "full"), default=["tabular", "full"])
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    results = {profile: profile_startup(args.app, profile) for profile in args.profiles}
+    for profile, report in results.items():
+        print_report(profile, report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"meta": {"app": args.app}, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
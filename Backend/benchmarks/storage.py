@@ -0,0 +1,111 @@
+"""
+Storage engine comparison: the same lookups, filters, listings, facets,
+aggregates and nearby queries against the in-memory RestaurantStore and the
+SQLite catalog (STORAGE=sqlite, see sqlite_store.py), both in the same row
+layout, plus what each takes to get ready and how much memory it holds.
+
+    python -m benchmarks.storage
+    python -m benchmarks.storage --csv zomato_1m.csv --db zomato_1m.sqlite --json storage.json
+
+The database is built when --db does not exist (or with --rebuild).
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.common import load_merged, measure, print_table, write_json
+from geo import GridIndex
+from sqlite_store import RTreeIndex, SqliteStore, build_database
+from store import ROW_LAYOUTS, RestaurantStore, layout_order
+
+CITIES = ["gurgaon", "noida", "faridabad", "london", "manila"]
+THREADS = 8
+
+def run(store, index, centers, ids, repeat=20):
+    results = {}
+    results["get.by_id"] = measure(lambda: [store.records([store.position_of(i)]) for i in ids], repeat)
+    results["filter.city"] = measure(lambda: [store.filter_positions(city=c) for c in CITIES], repeat)
+    results["filter.city_cuisine_cost"] = measure(
+        lambda: [store.filter_positions(city=c, cuisine="north indian|cafe", min_cost=300, max_cost=1500)
+                 for c in CITIES], repeat)
+    results["filter.name"] = measure(lambda: [store.filter_positions(name=n) for n in ("pizza", "biryani", "cafe")], repeat)
+    results["filter.cost_rating"] = measure(lambda: store.filter_positions(min_cost=2000, min_rating=4.5), repeat)
+    results["list.city_page20"] = measure(
+        lambda: [store.records(store.filter_positions(city=c, limit=20)) for c in CITIES], repeat)
+    results["facets.city"] = measure(
+        lambda: [store.facet_counts("cuisine", store.filter_positions(city=c)) for c in CITIES], repeat)
+    results["aggregate.city_rating"] = measure(
+        lambda: store.aggregate(store.filter_positions(country="india"), "city",
+                                ("count", "mean:aggregate_rating", "histogram:aggregate_rating"), 10, 100),
+        max(repeat // 4, 3))
+    results["export.city_gather"] = measure(
+        lambda: [sum(1 for _ in store.iter_chunks(store.filter_positions(city=c), 5000)) for c in CITIES[1:]],
+        max(repeat // 4, 3))
+    for radius in (1, 5, 25):
+        results[f"nearby.r{radius}km"] = measure(
+            lambda: [store.records(index.query(lat, lng, radius, 20)[0]) for lat, lng in centers], repeat)
+    # Concurrent requests, as the threadpool serves them (the SQLite engine through its connection pool)
+    with ThreadPoolExecutor(THREADS) as executor:
+        results[f"nearby.r5km.threads{THREADS}"] = measure(
+            lambda: list(executor.map(lambda c: store.records(index.query(c[0], c[1], 5, 20)[0]), centers * THREADS)),
+            repeat)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="zomato.csv")
+    parser.add_argument("--excel", default="Country-Code.xlsx")
+    parser.add_argument("--db", help="SQLite catalog (default: the CSV's name with .sqlite)")
+    parser.add_argument("--rebuild", action="store_true", help="Build the database even if it exists")
+    parser.add_argument("--layout", choices=ROW_LAYOUTS, default="hilbert")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+    db = args.db or os.path.splitext(args.csv)[0] + ".sqlite"
+
+    ready = {}
+    start = time.perf_counter()
+    df = load_merged(args.csv, args.excel)
+    df = df.iloc[layout_order(df, args.layout)].reset_index(drop=True)
+    memory_store = RestaurantStore.from_dataframe(df)
+    grid = GridIndex(memory_store.column("latitude"), memory_store.column("longitude"))
+    ready["memory"] = time.perf_counter() - start
+    del df
+    if args.rebuild or not os.path.exists(db):
+        start = time.perf_counter()
+        build_database(db, args.csv, args.excel, args.layout)
+        print(f"Built {db} in {time.perf_counter() - start:.1f} s")
+    start = time.perf_counter()
+    sqlite_store = SqliteStore(db)
+    rtree = RTreeIndex(sqlite_store)
+    ready["sqlite"] = time.perf_counter() - start
+    print(f"{len(memory_store):,} restaurants")
+    print(f"memory: {memory_store.nbytes / 1e6:,.1f} MB of columns, loaded from the CSV in {ready['memory']:.2f} s")
+    print(f"sqlite: {os.path.getsize(db) / 1e6:,.1f} MB file, opened in {ready['sqlite'] * 1000:.1f} ms")
+
+    # The same restaurants as centers and lookups for both engines
+    rng = np.random.default_rng(args.seed)
+    lats, lngs = memory_store.column("latitude"), memory_store.column("longitude")
+    located = np.flatnonzero((lats != 0) | (lngs != 0))
+    picks = located[rng.integers(0, len(located), size=16)]
+    centers = [(float(lats[p]), float(lngs[p])) for p in picks]
+    ids = memory_store.column("restaurant_id")[picks].tolist()
+
+    results = {}
+    for engine, store, index in (("memory", memory_store, grid), ("sqlite", sqlite_store, rtree)):
+        for name, row in run(store, index, centers, ids, args.repeat).items():
+            results[f"{name}[{engine}]"] = row
+    # p50 relative to the in-memory store
+    for name, row in results.items():
+        row["speedup"] = results[f"{name.rsplit('[', 1)[0]}[memory]"]["p50_ms"] / row["p50_ms"]
+    print_table(dict(sorted(results.items())), extra_columns=("speedup",))
+    if args.json:
+        write_json(results, args.json, csv=args.csv, rows=len(memory_store), layout=args.layout, seed=args.seed,
+                   ready_seconds=ready, db_bytes=os.path.getsize(db), memory_store_bytes=memory_store.nbytes)
+
+if __name__ == "__main__":
+    main()
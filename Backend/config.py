@@ -0,0 +1,156 @@
+"""
+Settings for `create_app`, read once from the environment. Every field can also
+be passed directly, e.g. `AppConfig(data_dir="/app", profile="tabular")`.
+
+Environment:
+    DATA_DIR                 directory holding zomato.csv and Country-Code.xlsx (default .)
+    CSV_PATH                 restaurant CSV (default DATA_DIR/zomato.csv)
+    COUNTRY_EXCEL_PATH       country code -> name sheet (default DATA_DIR/Country-Code.xlsx)
+    API_PROFILE              "full", or "tabular" to serve only the non-ML endpoints
+    EMBEDDING_BACKEND        sentence-transformers, onnx or onnx-int8 (see encoders.py)
+    EMBEDDING_MODEL          model name (default sentence-transformers/all-MiniLM-L6-v2)
+    EMBEDDING_ONNX_DIR       ONNX export directory (default DATA_DIR/models/all-MiniLM-L6-v2-onnx)
+    EMBEDDING_THREADS        onnxruntime intra-op threads
+    EMBEDDING_CACHE_DIR      if set, restaurant field vectors are cached there
+    QUERY_CACHE_SIZE         query embeddings kept in memory, 0 to disable (default 1024)
+    STORAGE                  "memory" (default), or "sqlite" to serve the tabular profile from a SQLite file
+                             instead of holding the catalog in RAM (see sqlite_store.py)
+    SQLITE_PATH              catalog database, built from the CSV when missing (default DATA_DIR/restaurants.sqlite)
+    SQLITE_POOL_SIZE         read-only connections per worker (default 8)
+    ROW_LAYOUT               row order: csv (default), or hilbert / zorder to sort by country, city and a
+                             space-filling curve for faster filters; /restaurants pages, /restaurants/search
+                             and exports follow it, so only csv returns them in id order (see store.py)
+    GEO_INDEX                spatial index backend (default grid, see geo.py)
+    GEO_CELL_DEG             grid cell size in degrees (default 0.1)
+    RANKING_PRIOR_VOTES      votes' worth of weight on the mean rating in /restaurants/nearby/ranked
+                             (default 50, see ranking.py)
+    RANKING_HALF_LIFE_KM     distance at which a ranked-nearby score halves (default 2)
+    COMPRESSION_ENCODINGS    response codings in order of preference, "none" to disable (default zstd,br,gzip;
+                             br and zstd need brotli and zstandard, see compress.py)
+    COMPRESSION_MIN_BYTES    smaller response bodies are sent uncompressed (default 1024)
+    COMPRESSION_CACHE_MB     compressed bodies kept for repeated responses, 0 to disable (default 32)
+    SHARD_COUNTRIES          comma-separated Country Codes; if set, only those restaurants are loaded
+                             (see shard_router.py)
+    SNAPSHOT_DIR             prebuilt startup state (see snapshot.py)
+    LOGMEAL_API_KEY          food recognition for /image-search-nearby
+    IMAGE_MAX_UPLOAD_MB      larger /image-search-nearby uploads are refused with 413 (default 20)
+    IMAGE_MAX_SIDE           uploads are downscaled to at most this many pixels on the longer side
+                             before recognition (default 1024, see images.py)
+    IMAGE_JPEG_QUALITY       JPEG quality of the image sent for recognition (default 85)
+
+The embedded fields are configured separately (see embedding_schema.py).
+"""
+import os
+
+from compress import ENCODINGS
+from embedding_schema import EmbeddingSchema
+
+PROFILES = ("full", "tabular")
+STORAGES = ("memory", "sqlite")
+
+def parse_codes(spec):
+    """'1, 14,216' -> (1, 14, 216)"""
+    return tuple(int(code) for code in spec.split(",") if code.strip())
+
+def parse_encodings(spec):
+    """'zstd, gzip' -> ('zstd', 'gzip'); 'none' -> ()"""
+    names = tuple(name.strip().lower() for name in spec.split(",") if name.strip())
+    return () if names == ("none",) else names
+
+# field: (environment variable, parser)
+ENV_VARS = {
+    "data_dir": ("DATA_DIR", str),
+    "csv_path": ("CSV_PATH", str),
+    "country_excel_path": ("COUNTRY_EXCEL_PATH", str),
+    "profile": ("API_PROFILE", str),
+    "embedding_backend": ("EMBEDDING_BACKEND", str),
+    "embedding_model": ("EMBEDDING_MODEL", str),
+    "onnx_dir": ("EMBEDDING_ONNX_DIR", str),
+    "embedding_threads": ("EMBEDDING_THREADS", int),
+    "embedding_cache_dir": ("EMBEDDING_CACHE_DIR", str),
+    "query_cache_size": ("QUERY_CACHE_SIZE", int),
+    "storage": ("STORAGE", str),
+    "sqlite_path": ("SQLITE_PATH", str),
+    "sqlite_pool_size": ("SQLITE_POOL_SIZE", int),
+    "row_layout": ("ROW_LAYOUT", str),
+    "geo_index": ("GEO_INDEX", str),
+    "geo_cell_deg": ("GEO_CELL_DEG", float),
+    "ranking_prior_votes": ("RANKING_PRIOR_VOTES", float),
+    "ranking_half_life_km": ("RANKING_HALF_LIFE_KM", float),
+    "compression_encodings": ("COMPRESSION_ENCODINGS", parse_encodings),
+    "compression_min_bytes": ("COMPRESSION_MIN_BYTES", int),
+    "compression_cache_mb": ("COMPRESSION_CACHE_MB", float),
+    "shard_countries": ("SHARD_COUNTRIES", parse_codes),
+    "snapshot_dir": ("SNAPSHOT_DIR", str),
+    "logmeal_api_key": ("LOGMEAL_API_KEY", str),
+    "image_max_upload_mb": ("IMAGE_MAX_UPLOAD_MB", float),
+    "image_max_side": ("IMAGE_MAX_SIDE", int),
+    "image_jpeg_quality": ("IMAGE_JPEG_QUALITY", int),
+}
+
+class AppConfig:
+    __slots__ = (*ENV_VARS, "embedding_schema", "load_on_startup")
+
+    def __init__(self, data_dir=".", csv_path=None, country_excel_path=None, profile="full",
+                 embedding_backend="sentence-transformers", embedding_model="sentence-transformers/all-MiniLM-L6-v2",
+                 onnx_dir=None, embedding_threads=None, embedding_cache_dir=None, query_cache_size=1024,
+                 storage="memory", sqlite_path=None, sqlite_pool_size=8,
+                 row_layout="csv", geo_index="grid", geo_cell_deg=0.1, ranking_prior_votes=50.0, ranking_half_life_km=2.0,
+                 compression_encodings=ENCODINGS, compression_min_bytes=1024, compression_cache_mb=32.0,
+                 shard_countries=(), snapshot_dir=None, logmeal_api_key=None,
+                 image_max_upload_mb=20.0, image_max_side=1024, image_jpeg_quality=85,
+                 embedding_schema=None, load_on_startup=False):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown API profile {profile!r}; expected one of {', '.join(PROFILES)}")
+        if storage not in STORAGES:
+            raise ValueError(f"Unknown storage {storage!r}; expected one of {', '.join(STORAGES)}")
+        if storage == "sqlite" and profile != "tabular":
+            raise ValueError("STORAGE=sqlite serves the tabular API profile only; semantic search needs the in-memory store")
+        unknown = [e for e in compression_encodings if e not in ENCODINGS]
+        if unknown:
+            raise ValueError(f"Unknown compression encoding {unknown[0]!r}; expected one of {', '.join(ENCODINGS)}")
+        self.data_dir = data_dir
+        self.csv_path = csv_path or os.path.join(data_dir, "zomato.csv")
+        self.country_excel_path = country_excel_path or os.path.join(data_dir, "Country-Code.xlsx")
+        self.profile = profile
+        self.embedding_backend = embedding_backend
+        self.embedding_model = embedding_model
+        self.onnx_dir = onnx_dir or os.path.join(data_dir, "models", "all-MiniLM-L6-v2-onnx")
+        self.embedding_threads = embedding_threads
+        self.embedding_cache_dir = embedding_cache_dir
+        self.query_cache_size = query_cache_size
+        self.storage = storage
+        self.sqlite_path = sqlite_path or os.path.join(data_dir, "restaurants.sqlite")
+        self.sqlite_pool_size = sqlite_pool_size
+        self.row_layout = row_layout
+        self.geo_index = geo_index
+        self.geo_cell_deg = geo_cell_deg
+        self.ranking_prior_votes = ranking_prior_votes
+        self.ranking_half_life_km = ranking_half_life_km
+        self.compression_encodings = tuple(compression_encodings)
+        self.compression_min_bytes = compression_min_bytes
+        self.compression_cache_mb = compression_cache_mb
+        self.shard_countries = tuple(shard_countries)
+        self.snapshot_dir = snapshot_dir
+        self.logmeal_api_key = logmeal_api_key
+        self.image_max_upload_mb = image_max_upload_mb
+        self.image_max_side = image_max_side
+        self.image_jpeg_quality = image_jpeg_quality
+        self.embedding_schema = embedding_schema or EmbeddingSchema()
+        # Build state in the ASGI startup event instead of inside create_app
+        self.load_on_startup = load_on_startup
+
+    @classmethod
+    def from_env(cls, **defaults):
+        """Settings from the environment, falling back to `defaults` and then the built-in defaults"""
+        values = dict(defaults)
+        for field, (name, parse) in ENV_VARS.items():
+            raw = os.getenv(name)
+            if raw:
+                values[field] = parse(raw)
+        values.setdefault("embedding_schema", EmbeddingSchema.from_env())
+        return cls(**values)
+
+    @property
+    def semantic(self):
+        return self.profile != "tabular"
@@ -0,0 +1,190 @@
+"""
+Which restaurant fields are embedded, and how they are scored.
+
+Each embedded field is encoded once per distinct value and stored as
+(per-row codes, unique vectors): restaurants sharing a cuisine string or a
+locality share one vector. A query's similarity to a restaurant is the weighted
+mean of its similarity to each field vector. The default schema is a single
+"text" field, the concatenation of a few descriptive columns. Setting e.g.
+`EMBEDDING_FIELDS=name=0.4,cuisines=0.4,locality=0.2` switches to separate name,
+cuisine and locality vectors whose weights can be overridden per query.
+
+Environment:
+    EMBEDDING_TEXT_COLUMNS   columns joined into the "text" field
+    EMBEDDING_FIELDS         field=weight pairs to embed (default text=1)
+    EMBEDDING_CACHE_DIR      if set, field vectors are cached there as .npy files
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from metrics import record_cache
+
+DEFAULT_TEXT_COLUMNS = ('Restaurant Name', 'Cuisines', 'Locality Verbose', 'Country', 'Rating text')
+FIELD_COLUMNS = {
+    "name": 'Restaurant Name',
+    "cuisines": 'Cuisines',
+    "locality": 'Locality Verbose',
+    "city": 'City',
+    "country": 'Country',
+}
+DEFAULT_FIELD_WEIGHTS = {"text": 1.0}
+
+def parse_weights(spec):
+    """'name=0.4,cuisines=0.6' -> {'name': 0.4, 'cuisines': 0.6}"""
+    weights = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        field, _, weight = part.partition("=")
+        weights[field.strip()] = float(weight) if weight else 1.0
+    return weights
+
+class EmbeddingSchema:
+    __slots__ = ("text_columns", "field_weights")
+
+    def __init__(self, text_columns=DEFAULT_TEXT_COLUMNS, field_weights=None):
+        self.text_columns = tuple(text_columns)
+        self.field_weights = dict(field_weights or DEFAULT_FIELD_WEIGHTS)
+        for field in self.field_weights:
+            if field != "text" and field not in FIELD_COLUMNS:
+                raise ValueError(f"Unknown embedding field {field!r}; expected text or one of {', '.join(FIELD_COLUMNS)}")
+
+    @classmethod
+    def from_env(cls):
+        columns = os.getenv("EMBEDDING_TEXT_COLUMNS")
+        fields = os.getenv("EMBEDDING_FIELDS")
+        return cls(
+            [c.strip() for c in columns.split(",") if c.strip()] if columns else DEFAULT_TEXT_COLUMNS,
+            parse_weights(fields) if fields else None,
+        )
+
+    def field_values(self, df, field):
+        """Per-row strings for a field, NaN where the row has nothing to embed"""
+        if field == "text":
+            parts = df[list(self.text_columns)].fillna("").astype(str)
+            text = parts.iloc[:, 0].str.strip()
+            for column in parts.columns[1:]:
+                text = text + " " + parts[column].str.strip()
+            text = text.str.replace(r"\s+", " ", regex=True).str.strip()
+        else:
+            text = df[FIELD_COLUMNS[field]].fillna("").astype(str).str.strip()
+        return text.mask(text == "")
+
+# === FIELD VECTORS ===
+class FieldVectors:
+    """One vector per distinct field value; `codes` maps rows to values (-1 when missing)"""
+    __slots__ = ("values", "codes", "vectors")
+
+    def __init__(self, values, codes, vectors):
+        self.values = values
+        self.codes = np.asarray(codes, dtype=np.int32)
+        # A trailing zero row makes code -1 score 0 without a separate mask
+        self.vectors = np.vstack([np.asarray(vectors, dtype=np.float32), np.zeros((1, vectors.shape[1]), np.float32)])
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.vectors.nbytes
+
+    def unique_vectors(self):
+        return self.vectors[:-1]
+
+class EmbeddingCache:
+    """Field vectors on disk, keyed by encoder and the exact values encoded"""
+
+    def __init__(self, directory, namespace):
+        self.directory = directory
+        self.namespace = namespace
+
+    def path(self, field, values):
+        digest = hashlib.sha1(self.namespace.encode())
+        digest.update("\x00".join(values).encode())
+        return os.path.join(self.directory, f"{field}-{digest.hexdigest()[:20]}.npy")
+
+    def get_or_encode(self, field, values, encode):
+        path = self.path(field, values)
+        if os.path.exists(path):
+            record_cache("embedding_field", True)
+            return np.load(path)
+        record_cache("embedding_field", False)
+        vectors = encode(values)
+        os.makedirs(self.directory, exist_ok=True)
+        np.save(path, vectors)
+        return vectors
+
+class EmbeddingIndex:
+    """Restaurant embeddings under an EmbeddingSchema, scored as a weighted sum over fields"""
+
+    def __init__(self, schema, size, encode, cache=None):
+        self.schema = schema
+        self.size = size
+        self.fields = {}
+        self._encode = encode
+        self._cache = cache
+
+    @classmethod
+    def build(cls, df, schema, encode, cache=None):
+        index = cls(schema, len(df), encode, cache)
+        for field in schema.field_weights:
+            index.field(df, field)
+        return index
+
+    @classmethod
+    def restore(cls, schema, size, fields, encode, cache=None):
+        """An index over previously built field vectors (see snapshot.py)"""
+        index = cls(schema, size, encode, cache)
+        index.fields = dict(fields)
+        return index
+
+    def field(self, df, field):
+        """Vectors for `field`, encoding (or loading from cache) its distinct values on first use"""
+        if field not in self.fields:
+            codes, uniques = pd.factorize(self.schema.field_values(df, field))
+            values = [str(v) for v in uniques]
+            if self._cache is None:
+                vectors = self._encode(values)
+            else:
+                vectors = self._cache.get_or_encode(field, values, self._encode)
+            self.fields[field] = FieldVectors(values, codes, vectors.reshape(len(values), -1))
+        return self.fields[field]
+
+    @property
+    def nbytes(self):
+        return sum(f.nbytes for f in self.fields.values())
+
+    def resolve_weights(self, weights=None):
+        """Normalized weights over the schema's fields, with optional per-query overrides"""
+        resolved = dict(self.schema.field_weights)
+        if weights:
+            unknown = set(weights) - set(resolved)
+            if unknown:
+                raise ValueError(f"Unknown field weights {sorted(unknown)}; embedded fields are {sorted(resolved)}")
+            resolved.update(weights)
+        total = sum(abs(w) for w in resolved.values())
+        if total == 0:
+            raise ValueError("Field weights must not all be zero")
+        return {field: w / total for field, w in resolved.items() if w}
+
+    def score_block(self, queries, weights=None):
+        """
+        Similarity of each query embedding to every restaurant, shape (len(queries), size).
+        `weights` is None, one dict of field weights, or one dict (or None) per query.
+        """
+        queries = np.atleast_2d(queries)
+        if weights is None or isinstance(weights, dict):
+            per_query = [self.resolve_weights(weights)] * len(queries)
+        else:
+            per_query = [self.resolve_weights(w) for w in weights]
+
+        sims = np.zeros((len(queries), self.size), dtype=np.float32)
+        for field in self.schema.field_weights:
+            column = np.array([[w.get(field, 0.0)] for w in per_query], dtype=np.float32)
+            if not column.any():
+                continue
+            vectors = self.fields[field]
+            field_sims = queries @ vectors.vectors.T
+            sims += column * field_sims[:, vectors.codes]
+        return sims
+
+    def scores(self, query, weights=None):
+        return self.score_block(query[None, :], weights)[0]
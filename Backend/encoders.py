@@ -0,0 +1,210 @@
+"""
+Embedding model backends behind one interface: `encode(texts)` returns an
+(n, dim) float32 array of L2-normalized embeddings.
+
+    sentence-transformers   the original PyTorch SentenceTransformer (default)
+    onnx                    the same model exported to ONNX, run with onnxruntime
+    onnx-int8               the ONNX export with dynamically int8-quantized weights
+
+The ONNX backends need only onnxruntime and tokenizers at serve time. Export
+(which needs torch and sentence-transformers once) also checks the exported
+embeddings against the original model:
+
+    python encoders.py --out models/all-MiniLM-L6-v2-onnx --quantize
+"""
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import record_cache, timed_import
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+BACKENDS = ("sentence-transformers", "onnx", "onnx-int8")
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+MIN_COSINE = 0.99
+
+VERIFY_TEXTS = [
+    "cheap north indian food with delivery", "romantic italian dinner", "rooftop bar with live music",
+    "Barbeque Nation India New Delhi Connaught Place North Indian, Chinese",
+    "Le Petit Souffle Philippines Makati City Century City Mall French, Japanese, Desserts",
+    "pizza", "Cafe", "late night burgers and shakes", "authentic japanese sushi", "vegetarian thali",
+    "Café com leite São Paulo Brazilian", "best desserts and coffee near me",
+]
+
+# === BACKENDS ===
+class SentenceTransformerEncoder:
+    def __init__(self, model_name=DEFAULT_MODEL):
+        SentenceTransformer = timed_import("sentence_transformers").SentenceTransformer
+        self.name = "sentence-transformers"
+        self.key = f"{self.name}:{model_name}"
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size=32):
+        return self.model.encode(texts, batch_size=batch_size, normalize_embeddings=True).astype(np.float32, copy=False)
+
+class OnnxEncoder:
+    """Mean-pooled, normalized transformer embeddings from an ONNX export made by `export_onnx`"""
+
+    def __init__(self, model_dir, quantized=False, threads=None):
+        ort = timed_import("onnxruntime")
+        Tokenizer = timed_import("tokenizers").Tokenizer
+
+        with open(os.path.join(model_dir, "encoder.json")) as f:
+            self.config = json.load(f)
+        self.name = "onnx-int8" if quantized else "onnx"
+        self.key = f"{self.name}:{self.config['model_name']}"
+        self.dim = self.config["dim"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_id"], pad_token=self.config["pad_token"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        path = os.path.join(model_dir, ONNX_FILES[self.name])
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(None, feeds)[0]
+
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def encode(self, texts, batch_size=32):
+        if isinstance(texts, str):
+            texts = [texts]
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        # Batch texts of similar length together to keep padding small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            out[batch] = self._encode_batch([texts[i] for i in batch])
+        return out
+
+def load_encoder(backend="sentence-transformers", model_name=DEFAULT_MODEL, onnx_dir=None, threads=None):
+    if backend == "sentence-transformers":
+        return SentenceTransformerEncoder(model_name)
+    if backend in ONNX_FILES:
+        if not onnx_dir:
+            raise ValueError(f"Embedding backend {backend!r} needs an ONNX model directory")
+        return OnnxEncoder(onnx_dir, quantized=backend == "onnx-int8", threads=threads)
+    raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+class CachedEncoder:
+    """LRU cache of text -> embedding in front of an encoder; misses are encoded in one batch"""
+
+    def __init__(self, encoder, size=1024):
+        self.encoder = encoder
+        self.name, self.key, self.dim = encoder.name, encoder.key, encoder.dim
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, texts, batch_size=32):
+        if isinstance(texts, str):
+            texts = [texts]
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        missing = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                vector = self._entries.get(text)
+                if vector is None:
+                    missing.setdefault(text, []).append(i)
+                else:
+                    self._entries.move_to_end(text)
+                    out[i] = vector
+                record_cache("query_embedding", vector is not None)
+        if missing:
+            vectors = self.encoder.encode(list(missing), batch_size=batch_size)
+            with self._lock:
+                for (text, rows), vector in zip(missing.items(), vectors):
+                    out[rows] = vector
+                    self._entries[text] = vector
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return out
+
+# === VERIFICATION ===
+def cosine_agreement(reference, candidate):
+    """Row-wise cosine similarity between two sets of normalized embeddings"""
+    return np.einsum("ij,ij->i", reference, candidate)
+
+def verify_encoder(candidate, reference, texts=VERIFY_TEXTS, min_cosine=MIN_COSINE):
+    cosines = cosine_agreement(reference.encode(texts), candidate.encode(texts))
+    report = {"texts": len(texts), "min_cosine": float(cosines.min()), "mean_cosine": float(cosines.mean())}
+    if report["min_cosine"] < min_cosine:
+        raise ValueError(f"{candidate.name} embeddings diverge from {reference.name}: "
+                         f"min cosine {report['min_cosine']:.4f} < {min_cosine}")
+    return report
+
+# === EXPORT ===
+def export_onnx(out_dir, model_name=DEFAULT_MODEL, quantize=False, opset=14, min_cosine=MIN_COSINE):
+    """Export model_name to ONNX (and optionally int8) under out_dir, verifying each against the original"""
+    import torch
+
+    reference = SentenceTransformerEncoder(model_name)
+    transformer = reference.model[0].auto_model.eval()
+    tokenizer = reference.model.tokenizer
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer.save_pretrained(out_dir)
+    with open(os.path.join(out_dir, "encoder.json"), "w") as f:
+        json.dump({
+            "model_name": model_name,
+            "dim": reference.dim,
+            "max_seq_length": reference.model.max_seq_length,
+            "pad_id": tokenizer.pad_token_id,
+            "pad_token": tokenizer.pad_token,
+        }, f, indent=2)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class LastHiddenState(torch.nn.Module):
+        # Pass inputs by name: positional order of forward() differs between transformers versions
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(input_names, inputs))).last_hidden_state
+
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(), tuple(sample[name] for name in input_names), os.path.join(out_dir, ONNX_FILES["onnx"]),
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in [*input_names, "last_hidden_state"]},
+            opset_version=opset, dynamo=False,
+        )
+    reports = {"onnx": verify_encoder(OnnxEncoder(out_dir), reference, min_cosine=min_cosine)}
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(os.path.join(out_dir, ONNX_FILES["onnx"]), os.path.join(out_dir, ONNX_FILES["onnx-int8"]),
+                         weight_type=QuantType.QInt8)
+        reports["onnx-int8"] = verify_encoder(OnnxEncoder(out_dir, quantized=True), reference, min_cosine=min_cosine)
+    return reports
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="Directory for the ONNX model and tokenizer")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--quantize", action="store_true", help="Also write a dynamically int8-quantized model")
+    parser.add_argument("--min-cosine", type=float, default=MIN_COSINE)
+    args = parser.parse_args()
+    for backend, report in export_onnx(args.out, args.model, args.quantize, min_cosine=args.min_cosine).items():
+        print(f"{backend}: min cosine {report['min_cosine']:.5f}, mean {report['mean_cosine']:.5f} over {report['texts']} texts")
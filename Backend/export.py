@@ -0,0 +1,143 @@
+import csv
+import importlib.util
+import io
+import json
+
+import numpy as np
+
+from store import RESPONSE_FIELDS, RESTAURANT_FIELDS
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+def columns_to_records(columns):
+    fields = list(columns)
+    return [dict(zip(fields, row)) for row in zip(*columns.values())]
+
+# === STREAM ENCODERS ===
+def ndjson_stream(store, positions, chunk_size=500):
+    for columns in store.iter_chunks(positions, chunk_size):
+        lines = [json.dumps(record, ensure_ascii=False) for record in columns_to_records(columns)]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def csv_stream(store, positions, chunk_size=500):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(RESPONSE_FIELDS)
+    for columns in store.iter_chunks(positions, chunk_size):
+        writer.writerows(zip(*columns.values()))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def _arrow_type(pa, dtype):
+    if dtype == "str":
+        return pa.string()
+    if np.issubdtype(dtype, np.integer):
+        return pa.int64()
+    return pa.float64()
+
+def arrow_batch(pa, columns):
+    """
+    RecordBatch of gather_arrays() columns: string fields wrap their offset and
+    byte buffers as they are, numeric ones their arrays. Columns that are not
+    restaurant fields (similarity) keep their numpy dtype.
+    """
+    fields, arrays = [], []
+    for field, values in columns.items():
+        if isinstance(values, tuple):
+            offsets, data = values
+            array = pa.StringArray.from_buffers(len(offsets) - 1, pa.py_buffer(offsets), pa.py_buffer(data))
+        else:
+            dtype = RESTAURANT_FIELDS[field][1] if field in RESTAURANT_FIELDS else None
+            array = pa.array(values, type=_arrow_type(pa, dtype) if dtype is not None else None)
+        fields.append(pa.field(field, array.type))
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, schema=pa.schema(fields))
+
+def arrow_stream(store, positions, chunk_size=500):
+    import pyarrow as pa
+
+    schema = pa.schema([(field, _arrow_type(pa, dtype)) for field, (_, dtype) in RESTAURANT_FIELDS.items()])
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for start in range(0, len(positions), chunk_size):
+            writer.write_batch(arrow_batch(pa, store.gather_arrays(positions[start:start + chunk_size])))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate(0)
+    yield sink.getvalue()
+
+EXPORT_STREAMS = {
+    "ndjson": ndjson_stream,
+    "csv": csv_stream,
+    "arrow": arrow_stream,
+}
+
+def arrow_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+# === RESPONSE FORMATS ===
+# Bodies a route can negotiate through the Accept header: format -> media types it answers to, the first sent
+RESPONSE_FORMATS = {
+    "json": ("application/json",),
+    "msgpack": ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack"),
+    "arrow": ("application/vnd.apache.arrow.stream",),
+}
+FORMAT_MODULES = {"msgpack": "msgpack", "arrow": "pyarrow"}
+
+def available_formats(formats=RESPONSE_FORMATS):
+    """The formats, in order, whose encoder is installed (checked without importing it)"""
+    return tuple(f for f in formats if f not in FORMAT_MODULES or importlib.util.find_spec(FORMAT_MODULES[f]))
+
+def negotiate_format(accept, formats):
+    """
+    The format of `formats` (server preference order) the Accept header ranks
+    highest. An exact media type outranks type/* and */*. Headers naming none of
+    them get JSON rather than a 406, as most clients send */* anyway.
+    """
+    weights = {}
+    for item in (accept or "").split(","):
+        media_type, _, params = item.partition(";")
+        media_type, q = media_type.strip().lower(), 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type:
+            weights[media_type] = q
+    ranked = []
+    for i, name in enumerate(formats):
+        exact = [weights[t] for t in RESPONSE_FORMATS[name] if t in weights]
+        q = max(exact) if exact else weights.get("application/*", weights.get("*/*", 0.0))
+        ranked.append((q, -i, name))
+    best = max(ranked, default=None)
+    return best[2] if best and best[0] > 0 else "json"
+
+def msgpack_body(records):
+    """MessagePack of a list of records: the JSON response's structure, with binary floats and length-prefixed strings"""
+    import msgpack
+
+    return msgpack.packb(records, use_bin_type=True)
+
+def arrow_body(columns):
+    """An Arrow IPC stream holding gather_arrays() columns as one record batch"""
+    import pyarrow as pa
+
+    batch = arrow_batch(pa, columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,157 @@
+"""
+Typo-tolerant restaurant search over name and locality words, for
+`/restaurants/search?fuzzy=true`.
+
+Words are lowercased, stripped of accents and split on anything that is not a
+letter or digit. Each distinct word is indexed SymSpell-style under every string
+obtained by deleting up to MAX_EDITS characters from its first PREFIX_LENGTH
+characters. A query word looks up its own deletes and keeps the candidates whose
+optimal string alignment distance (Levenshtein plus adjacent transpositions) is
+within its limit: words of up to 3 characters must match exactly, up to 7 allow
+one edit and longer words two.
+
+Rows are ranked by how many query words they match, then by total edits (a
+word found only in the locality costs half an edit more than one in the name),
+then by votes. Only rows matching the most query words are returned.
+"""
+import re
+import unicodedata
+
+import numpy as np
+
+from store import Partition
+
+MAX_EDITS = 2
+PREFIX_LENGTH = 7
+# store field -> extra cost of a match there
+FUZZY_FIELDS = {"restaurant_name": 0.0, "locality": 0.5}
+WORD = re.compile(r"[^\W_]+")
+
+def normalize_words(text):
+    """'Café  Näsi-Goreng' -> ['cafe', 'nasi', 'goreng']"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return WORD.findall("".join(c for c in text if not unicodedata.combining(c)))
+
+def edit_limit(word):
+    return 0 if len(word) <= 3 else 1 if len(word) <= 7 else 2
+
+def deletes(word, distance):
+    """word and every string made by deleting up to `distance` of its characters"""
+    found, frontier = {word}, {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 as soon as it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cost = min(cost, before[j - 2] + 1)
+            current[j] = cost
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+def record_match(query, record, max_edits=None):
+    """
+    (query words matched, total cost) of one record's fuzzy fields, as
+    FuzzyNameIndex.search ranks rows; lets a shard router merge fuzzy answers
+    """
+    words = {field: set(normalize_words(record[field])) for field in FUZZY_FIELDS}
+    matched, total = 0, 0.0
+    for word in normalize_words(query):
+        limit = edit_limit(word) if max_edits is None else min(edit_limit(word), max_edits)
+        costs = [edits + penalty for field, penalty in FUZZY_FIELDS.items()
+                 for edits in (edit_distance(word, w, limit) for w in words[field]) if edits <= limit]
+        if costs:
+            matched += 1
+            total += min(costs)
+    return matched, total
+
+class FuzzyNameIndex:
+    __slots__ = ("words", "word_ids", "deletes", "postings", "partitions", "votes")
+
+    def __init__(self, store):
+        self.words, self.word_ids = [], {}
+        pairs = {}
+        for field in FUZZY_FIELDS:
+            column = store.column(field)
+            word_ids, categories = [], []
+            for category, value in enumerate(column.categories):
+                for word in set(normalize_words(value)):
+                    if word not in self.word_ids:
+                        self.word_ids[word] = len(self.words)
+                        self.words.append(word)
+                    word_ids.append(self.word_ids[word])
+                    categories.append(category)
+            pairs[field] = (np.asarray(word_ids, dtype=np.int64), np.asarray(categories, dtype=np.int32))
+        # word id -> the categories containing it, as CSR offsets into one array per field;
+        # category -> its rows through a Partition, so a query only touches matching rows
+        self.postings, self.partitions = {}, {}
+        for field, (word_ids, categories) in pairs.items():
+            offsets = np.zeros(len(self.words) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(word_ids, minlength=len(self.words)), out=offsets[1:])
+            self.postings[field] = (offsets, categories[np.argsort(word_ids, kind="stable")])
+            column = store.column(field)
+            self.partitions[field] = Partition(column.codes, len(column.offsets) - 1)
+        self.deletes = {}
+        for word_id, word in enumerate(self.words):
+            for key in deletes(word[:PREFIX_LENGTH], MAX_EDITS):
+                self.deletes.setdefault(key, []).append(word_id)
+        self.votes = store.column("votes")
+
+    def lookup(self, word, limit):
+        """{word id: edits} for indexed words within `limit` edits of word"""
+        if limit == 0:
+            return {self.word_ids[word]: 0} if word in self.word_ids else {}
+        candidates = {c for key in deletes(word[:PREFIX_LENGTH], limit) for c in self.deletes.get(key, ())}
+        matches = {c: edit_distance(word, self.words[c], limit) for c in candidates}
+        return {c: d for c, d in matches.items() if d <= limit}
+
+    def _word_rows(self, matches):
+        """(rows, edits) of the rows holding any of `matches` in a fuzzy field, each row once at its lowest cost"""
+        rows, costs = [], []
+        for field, penalty in FUZZY_FIELDS.items():
+            offsets, categories = self.postings[field]
+            for word_id, edits in matches.items():
+                hit_rows = self.partitions[field].rows(categories[offsets[word_id]:offsets[word_id + 1]])
+                rows.append(hit_rows)
+                costs.append(np.full(len(hit_rows), edits + penalty, dtype=np.float32))
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rows, costs = np.concatenate(rows), np.concatenate(costs)
+        order = np.lexsort((costs, rows))
+        rows, costs = rows[order], costs[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = rows[1:] != rows[:-1]
+        return rows[first], costs[first]
+
+    def search(self, query, max_edits=None, mask=None):
+        """Positions of the rows best matching query, best first; `mask` restricts the rows considered"""
+        rows, costs = [], []
+        for word in normalize_words(query):
+            limit = edit_limit(word) if max_edits is None else min(edit_limit(word), max_edits)
+            word_rows, word_costs = self._word_rows(self.lookup(word, limit))
+            rows.append(word_rows)
+            costs.append(word_costs)
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        rows, costs = np.concatenate(rows), np.concatenate(costs)
+        if mask is not None:
+            rows, costs = rows[mask[rows]], costs[mask[rows]]
+        if not len(rows):
+            return np.empty(0, dtype=np.int64)
+        positions, inverse = np.unique(rows, return_inverse=True)
+        matched = np.bincount(inverse)
+        total = np.bincount(inverse, weights=costs)
+        best = matched == matched.max()
+        positions, total = positions[best], total[best]
+        return positions[np.lexsort((-self.votes[positions], total))]
@@ -0,0 +1,205 @@
+import numpy as np
+
+# Same mean earth radius as geopy's great_circle
+EARTH_RADIUS_KM = 6371.009
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180.0
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from (lat, lng) to every (lats[i], lngs[i])"""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def bounding_box(lat: float, lng: float, radius_km: float):
+    """(lat_lo, lat_hi, lng_span): a lat range and +/- lng span covering every point within radius_km"""
+    lat_span = radius_km / KM_PER_DEGREE
+    lat_lo, lat_hi = lat - lat_span, lat + lat_span
+    if lat_lo <= -90.0 or lat_hi >= 90.0:
+        return lat_lo, lat_hi, 180.0
+    return lat_lo, lat_hi, lat_span / max(np.cos(np.radians(max(abs(lat_lo), abs(lat_hi)))), 1e-12)
+
+def lng_ranges(lng: float, lng_span: float):
+    """[(west, east)] longitude intervals within [-180, 180] covering lng +/- lng_span, split at the antimeridian"""
+    if lng_span >= 180.0:
+        return [(-180.0, 180.0)]
+    west, east = lng - lng_span, lng + lng_span
+    if west < -180.0:
+        return [(west + 360.0, 180.0), (-180.0, east)]
+    if east > 180.0:
+        return [(west, 180.0), (-180.0, east - 360.0)]
+    return [(west, east)]
+
+def box_may_contain(box, lat: float, lng: float, radius_km: float) -> bool:
+    """Whether points within radius_km of (lat, lng) can fall inside box = (min_lat, min_lng, max_lat, max_lng)"""
+    min_lat, min_lng, max_lat, max_lng = box
+    lat_lo, lat_hi, lng_span = bounding_box(lat, lng, radius_km)
+    if lat_hi < min_lat or lat_lo > max_lat:
+        return False
+    if lng_span >= 180.0:
+        return True
+    return any(lng - lng_span + shift <= max_lng and lng + lng_span + shift >= min_lng for shift in (-360.0, 0.0, 360.0))
+
+# === SPACE-FILLING CURVES ===
+def _curve_coords(lats, lngs, bits):
+    """lat/lng scaled to integer cell coordinates in [0, 2**bits)"""
+    side = (1 << bits) - 1
+    x = np.clip((np.nan_to_num(np.asarray(lngs, dtype=np.float64)) + 180.0) / 360.0, 0.0, 1.0) * side
+    y = np.clip((np.nan_to_num(np.asarray(lats, dtype=np.float64)) + 90.0) / 180.0, 0.0, 1.0) * side
+    return x.astype(np.int64), y.astype(np.int64)
+
+def hilbert_keys(lats, lngs, bits: int = 16) -> np.ndarray:
+    """Position of each point along a Hilbert curve over a 2**bits x 2**bits lat/lng grid"""
+    x, y = _curve_coords(lats, lngs, bits)
+    n = 1 << bits
+    keys = np.zeros(len(x), dtype=np.int64)
+    s = n >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        keys += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # Rotate the quadrant so the curve stays continuous
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+        s >>= 1
+    return keys
+
+def _spread_bits(v):
+    v = v & 0xFFFFFFFF
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    return (v | (v << 1)) & 0x5555555555555555
+
+def zorder_keys(lats, lngs, bits: int = 16) -> np.ndarray:
+    """Morton (Z-order) code of each point: lng and lat cell bits interleaved"""
+    x, y = _curve_coords(lats, lngs, bits)
+    return _spread_bits(x) | (_spread_bits(y) << 1)
+
+CURVES = {"hilbert": hilbert_keys, "zorder": zorder_keys}
+
+# === GRID INDEX ===
+class GridIndex:
+    """
+    Fixed-size lat/lng grid over row positions. Points are sorted by cell key so
+    each grid row's cells in a longitude range form one contiguous slice, and a
+    radius query only computes exact distances for points in its bounding box.
+    """
+
+    def __init__(self, lats, lngs, cell_deg: float = 0.1):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.n_rows = int(np.ceil(180.0 / cell_deg)) + 1
+        self.n_cols = int(np.ceil(360.0 / cell_deg)) + 1
+        valid = np.flatnonzero(np.isfinite(self.lats) & np.isfinite(self.lngs))
+        keys = self._cell_row(self.lats[valid]) * self.n_cols + self._cell_col(self.lngs[valid])
+        order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[order]
+        self.sorted_positions = valid[order]
+
+    def _cell_row(self, lats):
+        return np.clip(((np.asarray(lats) + 90.0) // self.cell_deg).astype(np.int64), 0, self.n_rows - 1)
+
+    def _cell_col(self, lngs):
+        return np.clip(((np.asarray(lngs) + 180.0) // self.cell_deg).astype(np.int64), 0, self.n_cols - 1)
+
+    def _col_ranges(self, lng: float, lng_span: float):
+        if lng_span >= 180.0:
+            return [(0, self.n_cols - 1)]
+        west, east = lng - lng_span, lng + lng_span
+        ranges = []
+        if west < -180.0:
+            ranges.append((int(self._cell_col(west + 360.0)), self.n_cols - 1))
+            west = -180.0
+        if east > 180.0:
+            ranges.append((0, int(self._cell_col(east - 360.0))))
+            east = 180.0
+        ranges.append((int(self._cell_col(west)), int(self._cell_col(east))))
+        return ranges
+
+    def candidates(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        """Row positions inside the grid cells covering the radius' bounding box"""
+        lat_lo, lat_hi, lng_span = bounding_box(lat, lng, radius_km)
+        col_ranges = self._col_ranges(lng, lng_span)
+        slices = []
+        for row in range(int(self._cell_row(lat_lo)), int(self._cell_row(lat_hi)) + 1):
+            for col_lo, col_hi in col_ranges:
+                lo = np.searchsorted(self.sorted_keys, row * self.n_cols + col_lo, side="left")
+                hi = np.searchsorted(self.sorted_keys, row * self.n_cols + col_hi, side="right")
+                if hi > lo:
+                    slices.append(self.sorted_positions[lo:hi])
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+    def rings(self, lat: float, lng: float, radius_km: float):
+        """
+        Yield (positions, min_km) for the grid cells at Chebyshev distance 0, 1, 2, ...
+        from (lat, lng)'s cell, within radius_km's bounding box. min_km is a lower
+        bound on the distance from (lat, lng) to any point of that ring or a later
+        one, so a best-first search can stop early. Boxes crossing the antimeridian
+        or a pole come back as a single ring with bound 0.
+        """
+        lat_lo, lat_hi, lng_span = bounding_box(lat, lng, radius_km)
+        if lat_lo <= -90.0 or lat_hi >= 90.0 or lng - lng_span < -180.0 or lng + lng_span > 180.0:
+            yield self.candidates(lat, lng, radius_km), 0.0
+            return
+        row0, col0 = int(self._cell_row(lat)), int(self._cell_col(lng))
+        row_lo, row_hi = int(self._cell_row(lat_lo)), int(self._cell_row(lat_hi))
+        col_lo, col_hi = int(self._cell_col(lng - lng_span)), int(self._cell_col(lng + lng_span))
+        # Longitude gaps are shortest at the highest latitude in the box
+        cos_max = np.cos(np.radians(max(abs(lat_lo), abs(lat_hi))))
+        for k in range(max(row0 - row_lo, row_hi - row0, col0 - col_lo, col_hi - col0) + 1):
+            if k == 0:
+                min_km = 0.0
+            else:
+                # Distance to the edge of the block of rings 0..k-1
+                lat_gap = min(lat - (-90.0 + (row0 - k + 1) * self.cell_deg), -90.0 + (row0 + k) * self.cell_deg - lat)
+                lng_gap = min(lng - (-180.0 + (col0 - k + 1) * self.cell_deg), -180.0 + (col0 + k) * self.cell_deg - lng)
+                min_km = min(lat_gap * KM_PER_DEGREE,
+                             2 * EARTH_RADIUS_KM * np.arcsin(min(cos_max * np.sin(np.radians(lng_gap) / 2), 1.0)))
+            segments = []
+            for row in ((row0,) if k == 0 else (row0 - k, row0 + k)):
+                if row_lo <= row <= row_hi and max(col0 - k, col_lo) <= min(col0 + k, col_hi):
+                    segments.append((row, max(col0 - k, col_lo), min(col0 + k, col_hi)))
+            for row in range(max(row0 - k + 1, row_lo), min(row0 + k - 1, row_hi) + 1):
+                for col in (col0 - k, col0 + k):
+                    if col_lo <= col <= col_hi:
+                        segments.append((row, col, col))
+            yield self._segments(segments), min_km
+
+    def _segments(self, segments):
+        """Positions in (row, col_lo, col_hi) cell runs"""
+        if not segments:
+            return np.empty(0, dtype=np.int64)
+        rows, cols_lo, cols_hi = (np.array(v, dtype=np.int64) for v in zip(*segments))
+        lo = np.searchsorted(self.sorted_keys, rows * self.n_cols + cols_lo, side="left")
+        hi = np.searchsorted(self.sorted_keys, rows * self.n_cols + cols_hi, side="right")
+        slices = [self.sorted_positions[a:b] for a, b in zip(lo.tolist(), hi.tolist()) if b > a]
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def query(self, lat: float, lng: float, radius_km: float, limit: int, mask=None):
+        """
+        (positions, distances_km) of the nearest `limit` points within radius_km,
+        nearest first. An optional boolean row mask restricts the candidates.
+        """
+        positions = self.candidates(lat, lng, radius_km)
+        if mask is not None:
+            positions = positions[mask[positions]]
+        distances = haversine_km(lat, lng, self.lats[positions], self.lngs[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")[:max(limit, 0)]
+        return positions[order], distances[order]
+
+GEO_INDEXES = {"grid": GridIndex}
+
+def build_geo_index(backend, lats, lngs, cell_deg: float = 0.1):
+    """A spatial index by backend name (the GEO_INDEX setting)"""
+    if backend not in GEO_INDEXES:
+        raise ValueError(f"Unknown geo index {backend!r}; expected one of {', '.join(GEO_INDEXES)}")
+    return GEO_INDEXES[backend](lats, lngs, cell_deg=cell_deg)
@@ -0,0 +1,114 @@
+"""
+Upload pipeline for /image-search-nearby, run before dish recognition.
+
+Phone photos arrive as 3-12 MB JPEGs (or PNG, WebP, ...) of 12+ megapixels,
+while the recognizer needs well under a megapixel. Each upload is:
+
+1. capped while it streams in: UploadLimitMiddleware answers 413 as soon as
+   the body (or its declared Content-Length) exceeds the limit, before the rest
+   is received or spooled;
+2. decoded straight from the spooled upload, without copying it into memory.
+   JPEGs are decoded in draft mode, which lets libjpeg scale by 1/2, 1/4 or
+   1/8 while decoding, so a 12 MP photo is never held at full size;
+3. flattened to RGB and downscaled so its longer side is at most `max_side`
+   (and at least 3/4 of it), mostly by whole-factor box averaging, then
+   rotated upright from its EXIF orientation;
+4. re-encoded as a JPEG at `quality`, without EXIF (no GPS position or camera
+   details are forwarded).
+
+`preprocess_image` is blocking; the endpoint runs it on a worker thread.
+`python -m benchmarks.images` measures it on phone-sized photos.
+"""
+import io
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+
+from metrics import timed_import
+
+# Larger images are rejected before decoding (decompression bombs)
+MAX_PIXELS = 64_000_000
+# JPEG DCT scales (1/8 .. 1/1) libjpeg can decode at
+DRAFT_SCALES = (8, 4, 2, 1)
+# A whole-factor reduction may leave the longer side this much of max_side before a resize is used instead
+MIN_SIDE_FRACTION = 0.75
+
+def reduction(longest, max_side):
+    """The whole factor shrinking a side of `longest` pixels to at most max_side, or less if that undershoots"""
+    factor = -(-longest // max_side)
+    if factor > 1 and longest / factor < MIN_SIDE_FRACTION * max_side:
+        factor -= 1
+    return factor
+
+def preprocess_image(source, max_side=1024, quality=85):
+    """
+    (JPEG bytes, info) for an image file object or path: upright, RGB, at most
+    max_side on its longer side, without metadata. ValueError if it is not a
+    decodable image or has more than MAX_PIXELS pixels.
+    """
+    Image = timed_import("PIL.Image")
+    ImageOps = timed_import("PIL.ImageOps")
+    try:
+        image = Image.open(source)
+        width, height = image.size
+        if width * height > MAX_PIXELS:
+            raise ValueError(f"Image has {width}x{height} pixels; at most {MAX_PIXELS:,} are accepted")
+        source_format = image.format
+        factor = reduction(max(width, height), max_side)
+        scale = next(s for s in DRAFT_SCALES if s <= factor)
+        if scale > 1:
+            image.draft("RGB", (width // scale, height // scale))
+        if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+            image.info = rgba.info
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        # Whatever the draft left (all of it for other formats): box-average, ~10x cheaper than a
+        # bicubic resize, then resample only the last < 1/MIN_SIDE_FRACTION ratio if any
+        factor = reduction(max(image.size), max_side)
+        if factor > 1:
+            image = image.reduce(factor)
+        if max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.Resampling.BICUBIC)
+        # Rotate the small image; the square max_side bound does not depend on orientation
+        image = ImageOps.exif_transpose(image)
+    except Image.UnidentifiedImageError:
+        raise ValueError("Not an image in a supported format")
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Corrupt or unsupported image: {e}")
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=quality)
+    return out.getvalue(), {"format": source_format, "source_size": (width, height), "size": image.size}
+
+# === UPLOAD LIMIT ===
+class UploadLimitMiddleware:
+    """ASGI middleware ending request bodies on `limits` paths with a 413 once they exceed the path's limit"""
+
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        declared = Headers(scope=scope).get("content-length")
+        received = 0
+        detail = f"Upload larger than {limit / 2**20:g} MB"
+
+        async def limited_receive():
+            nonlocal received
+            # Raised while FastAPI reads the body, which passes HTTPExceptions through as responses
+            if declared and declared.isdigit() and int(declared) > limit:
+                raise HTTPException(status_code=413, detail=detail)
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
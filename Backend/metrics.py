@@ -0,0 +1,232 @@
+import importlib
+import sys
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values, extra=""):
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# === METRIC TYPES ===
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}" for k, v in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *label_values, value):
+        with self._lock:
+            self._values[label_values] = value
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, *label_values, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        lines = []
+        for label_values, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _format_value(float(bound))
+                labels = _format_labels(self.labels, label_values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# === STANDARD METRICS ===
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route, including streamed bodies", ("method", "endpoint", "status")))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled"))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "request_stage_duration_seconds", "Time spent in each stage of a request handler", ("endpoint", "stage")))
+ENCODE_BATCH_SIZE = REGISTRY.register(Histogram(
+    "model_encode_batch_size", "Texts per embedding model encode call", ("caller",), buckets=SIZE_BUCKETS))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result")))
+COMPRESSION_BYTES = REGISTRY.register(Counter(
+    "response_compression_bytes_total", "Response body bytes before (identity) and after compression, by encoding",
+    ("encoding", "body")))
+SINGLEFLIGHT_REQUESTS = REGISTRY.register(Counter(
+    "singleflight_requests_total", "Coalescable requests that computed a result (leader) or shared one (coalesced)",
+    ("flight", "role")))
+STARTUP_PHASE_SECONDS = REGISTRY.register(Gauge(
+    "startup_phase_duration_seconds", "Wall time of each startup phase", ("phase",)))
+IMPORT_SECONDS = REGISTRY.register(Gauge(
+    "module_import_duration_seconds", "Wall time of deferred imports of heavy modules, on first use", ("module",)))
+
+# === HELPERS ===
+# Stage timings recorded during a request; flushed with the route label once it is known
+_request_stages = ContextVar("request_stages", default=None)
+
+@contextmanager
+def stage(name):
+    """Time a block of a request handler as stage `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stages = _request_stages.get()
+        if stages is None:
+            STAGE_SECONDS.observe("none", name, value=elapsed)
+        else:
+            stages.append((name, elapsed))
+
+@contextmanager
+def startup_phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_PHASE_SECONDS.set(name, value=time.perf_counter() - start)
+
+def timed_import(name):
+    """Import a heavy module on first use, recording how long the import took"""
+    module = sys.modules.get(name)
+    if module is None:
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        IMPORT_SECONDS.set(name, value=time.perf_counter() - start)
+    return module
+
+def startup_report():
+    """Startup phase and deferred import timings in seconds, slowest first"""
+    return {
+        "phases": dict(sorted(((k[0], v) for k, v in STARTUP_PHASE_SECONDS._values.items()), key=lambda kv: -kv[1])),
+        "imports": dict(sorted(((k[0], v) for k, v in IMPORT_SECONDS._values.items()), key=lambda kv: -kv[1])),
+    }
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+def observe_compression(encoding, identity_bytes, compressed_bytes):
+    COMPRESSION_BYTES.inc(encoding, "identity", amount=identity_bytes)
+    COMPRESSION_BYTES.inc(encoding, "compressed", amount=compressed_bytes)
+
+def observe_singleflight(flight, role):
+    SINGLEFLIGHT_REQUESTS.inc(flight, role)
+
+def observe_encode_batch(caller, size):
+    ENCODE_BATCH_SIZE.observe(caller, value=size)
+
+_DONE = object()
+
+def timed_iter(iterable, name):
+    """Yield from iterable, timing each step (including lazy work) as stage `name`"""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            item = next(iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+        stages = []
+        token = _request_stages.set(stages)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            _request_stages.reset(token)
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(scope["method"], endpoint, status[0], value=time.perf_counter() - start)
+            for name, elapsed in stages:
+                STAGE_SECONDS.observe(endpoint, name, value=elapsed)
@@ -0,0 +1,263 @@
+"""
+Opt-in sampling profiler for single requests.
+
+A client holding PROFILING_TOKEN sends `X-Profile: 1` (or `?profile=1`) together
+with `X-Profile-Token: <token>`. The request then runs normally while a sampler
+thread records the stacks of the threads executing its handler, including worker
+threads it hands work to with `run_in_threadpool(profiled(fn))`. The response
+carries an `X-Profile-Id` header, and the profile can be fetched from
+`/debug/profiles/{id}` as collapsed stacks (flamegraph.pl, speedscope) or as
+speedscope JSON. Without PROFILING_TOKEN set, profiling is disabled.
+
+Environment:
+    PROFILING_TOKEN          shared secret; profiling is off when unset
+    PROFILE_MAX_CONCURRENT   profiled requests allowed at once (default 1)
+    PROFILE_INTERVAL_MS      sampling interval (default 1)
+    PROFILE_KEEP             profiles kept in memory (default 20)
+    PROFILE_DIR              if set, each profile is also written there
+"""
+import functools
+import hmac
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar, copy_context
+from urllib.parse import parse_qs
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.routing import APIRoute
+
+_active_session = ContextVar("active_profile_session", default=None)
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+_slots = None
+_slots_lock = threading.Lock()
+
+def _config(name, default):
+    return int(os.getenv(name, default))
+
+def _acquire_slot():
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(_config("PROFILE_MAX_CONCURRENT", 1))
+    return _slots.acquire(blocking=False)
+
+def is_authorized(token):
+    expected = os.getenv("PROFILING_TOKEN")
+    # As bytes: compare_digest rejects non-ASCII str, and header values arrive latin-1 decoded
+    return bool(expected) and token is not None and hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
+
+# === SAMPLER ===
+class ProfileSession:
+    """Samples the stacks of registered threads until stopped"""
+
+    def __init__(self, name, interval):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.interval = interval
+        self.threads = set()
+        self.stacks = Counter()
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.threads):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[self._stack(frame)] += 1
+
+    @staticmethod
+    def _stack(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed-stack format: one `root;...;leaf count` line per stack"""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            frames = ";".join(f"{name} ({os.path.basename(path)}:{line})" for name, path, line in stack)
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self):
+        frame_index, frames, samples, weights = {}, [], [], []
+        for stack, count in self.stacks.items():
+            sample = []
+            for name, path, line in stack:
+                key = (name, path, line)
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": name, "file": path, "line": line})
+                sample.append(frame_index[key])
+            samples.append(sample)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "tastyfind-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+def _store(session):
+    with _profiles_lock:
+        _profiles[session.id] = session
+        while len(_profiles) > _config("PROFILE_KEEP", 20):
+            _profiles.popitem(last=False)
+    directory = os.getenv("PROFILE_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{session.id}.collapsed"), "w") as f:
+            f.write(session.collapsed())
+        with open(os.path.join(directory, f"{session.id}.speedscope.json"), "w") as f:
+            json.dump(session.speedscope(), f)
+
+# === REQUEST HOOKS ===
+def _track_thread(session):
+    thread_id = threading.get_ident()
+    session.threads.add(thread_id)
+    return thread_id
+
+def profiled(fn):
+    """
+    fn for run_in_threadpool: when the calling request is profiled, the worker
+    thread runs it in a copy of the caller's context and is sampled meanwhile
+    """
+    session = _active_session.get()
+    if session is None:
+        return fn
+    context = copy_context()
+
+    @functools.wraps(fn)
+    def wrapped(*args, **kw):
+        thread_id = _track_thread(session)
+        try:
+            return context.copy().run(fn, *args, **kw)
+        finally:
+            session.threads.discard(thread_id)
+    return wrapped
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose endpoint registers its executing thread with the request's profile session"""
+
+    def __init__(self, path, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapped(*args, **kw):
+                session = _active_session.get()
+                if session is None:
+                    return await endpoint(*args, **kw)
+                thread_id = _track_thread(session)
+                try:
+                    return await endpoint(*args, **kw)
+                finally:
+                    session.threads.discard(thread_id)
+        else:
+            @functools.wraps(endpoint)
+            def wrapped(*args, **kw):
+                session = _active_session.get()
+                if session is None:
+                    return endpoint(*args, **kw)
+                thread_id = _track_thread(session)
+                try:
+                    return endpoint(*args, **kw)
+                finally:
+                    session.threads.discard(thread_id)
+        super().__init__(path, wrapped, **kwargs)
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles authorized requests asking for it"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        requested = headers.get("x-profile") == "1" or query.get("profile") == ["1"]
+        if not requested:
+            await self.app(scope, receive, send)
+            return
+
+        if not is_authorized(headers.get("x-profile-token")):
+            status = "denied"
+        elif not _acquire_slot():
+            status = "busy"
+        else:
+            await self._profile(scope, receive, send)
+            return
+        await self.app(scope, receive, self._with_headers(send, [(b"x-profile-status", status.encode())]))
+
+    async def _profile(self, scope, receive, send):
+        session = ProfileSession(f"{scope['method']} {scope['path']}", _config("PROFILE_INTERVAL_MS", 1) / 1000.0)
+        token = _active_session.set(session)
+        extra = [(b"x-profile-status", b"recorded"), (b"x-profile-id", session.id.encode())]
+        session.start()
+        try:
+            await self.app(scope, receive, self._with_headers(send, extra))
+        finally:
+            session.stop()
+            _active_session.reset(token)
+            _slots.release()
+            _store(session)
+
+    @staticmethod
+    def _with_headers(send, extra):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *extra]}
+            await send(message)
+        return send_wrapper
+
+# === RETRIEVAL ===
+router = APIRouter()
+
+@router.get("/debug/profiles/{profile_id}", include_in_schema=False)
+def get_profile(
+    profile_id: str,
+    fmt: str = Query("collapsed", alias="format", pattern="^(collapsed|speedscope)$"),
+    x_profile_token: str = Header(None)
+):
+    if not is_authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Profiling not authorized")
+    with _profiles_lock:
+        session = _profiles.get(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if fmt == "speedscope":
+        return JSONResponse(session.speedscope())
+    return PlainTextResponse(session.collapsed())
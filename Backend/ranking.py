@@ -0,0 +1,87 @@
+"""
+"Best rated near me": nearby restaurants ranked by a blend of rating, votes and
+distance instead of distance alone.
+
+    score = bayesian_rating * 0.5 ** (distance_km / half_life_km)
+
+The Bayesian rating pulls a restaurant's Aggregate rating toward the mean of
+all rated restaurants in proportion to how few votes it has:
+
+    bayesian_rating = (votes * rating + prior_votes * mean_rating) / (votes + prior_votes)
+
+It depends only on the data, so it is computed once at load. At query time the
+grid index is searched ring by ring outwards; once the k-th best score beats
+the best score any restaurant in the next ring could reach, the search stops,
+so latency depends on the density around the point rather than on the radius.
+prior_votes and half_life_km come from RANKING_PRIOR_VOTES and
+RANKING_HALF_LIFE_KM (see config.py); half_life_km can also be set per query.
+"""
+import numpy as np
+
+from geo import haversine_km
+
+def bayesian_ratings(ratings, votes, prior_votes=50.0):
+    """Ratings shrunk toward the mean rated restaurant; unrated ones (rating 0) get the mean"""
+    ratings = np.asarray(ratings, dtype=np.float64)
+    votes = np.asarray(votes, dtype=np.float64)
+    rated = ratings > 0
+    mean_rating = float(ratings[rated].mean()) if rated.any() else 0.0
+    votes = np.where(rated, votes, 0.0)
+    return (votes * ratings + prior_votes * mean_rating) / np.maximum(votes + prior_votes, 1e-12)
+
+class NearbyRanker:
+    def __init__(self, store, geo_index, prior_votes=50.0, half_life_km=2.0):
+        self.geo_index = geo_index
+        self.lats, self.lngs = store.column("latitude"), store.column("longitude")
+        self.prior_votes = prior_votes
+        self.half_life_km = half_life_km
+        self.static = bayesian_ratings(store.column("aggregate_rating"), store.column("votes"), prior_votes)
+        self.best_static = float(self.static.max()) if len(self.static) else 0.0
+
+    def top_k(self, lat, lng, radius_km, limit, half_life_km=None):
+        """(positions, scores, distances_km) of the `limit` best scores within radius_km, best first"""
+        half_life = half_life_km or self.half_life_km
+        top_positions = np.empty(0, dtype=np.int64)
+        top_scores = np.empty(0, dtype=np.float64)
+        top_distances = np.empty(0, dtype=np.float64)
+        if limit <= 0:
+            return top_positions, top_scores, top_distances
+
+        if hasattr(self.geo_index, "rings"):
+            rings = self.geo_index.rings(lat, lng, radius_km)
+        else:
+            rings = [(self.geo_index.candidates(lat, lng, radius_km), 0.0)]
+        for positions, min_km in rings:
+            if min_km > radius_km:
+                break
+            # No restaurant from here on can beat the current k-th best
+            if len(top_scores) == limit and top_scores.min() >= self.best_static * 0.5 ** (min_km / half_life):
+                break
+            if not len(positions):
+                continue
+            distances = haversine_km(lat, lng, self.lats[positions], self.lngs[positions])
+            inside = distances <= radius_km
+            positions, distances = positions[inside], distances[inside]
+            scores = self.static[positions] * 0.5 ** (distances / half_life)
+
+            top_positions = np.concatenate([top_positions, positions])
+            top_scores = np.concatenate([top_scores, scores])
+            top_distances = np.concatenate([top_distances, distances])
+            if len(top_scores) > limit:
+                keep = np.argpartition(-top_scores, limit - 1)[:limit]
+                top_positions, top_scores, top_distances = top_positions[keep], top_scores[keep], top_distances[keep]
+
+        # Best score first; nearer first on ties
+        order = np.lexsort((top_positions, top_distances, -top_scores))
+        return top_positions[order], top_scores[order], top_distances[order]
+
+    def top_k_exhaustive(self, lat, lng, radius_km, limit, half_life_km=None):
+        """top_k by scoring every candidate in the radius (the reference in tests/test_nearby.py and benchmarks)"""
+        half_life = half_life_km or self.half_life_km
+        positions = self.geo_index.candidates(lat, lng, radius_km)
+        distances = haversine_km(lat, lng, self.lats[positions], self.lngs[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        scores = self.static[positions] * 0.5 ** (distances / half_life)
+        order = np.lexsort((positions, distances, -scores))[:max(limit, 0)]
+        return positions[order], scores[order], distances[order]
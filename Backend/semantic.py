@@ -0,0 +1,33 @@
+import numpy as np
+
+def top_k_positions(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest finite scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    top = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return top[np.isfinite(scores[top])]
+
+def batch_similarity_top_k(query_embeddings, restaurant_embeddings, limits, masks=None, block_size=64, weights=None):
+    """
+    Yield one list of (query_index, positions, similarities) per block of queries.
+    Each block is scored with a single matrix-matrix product; rows excluded by a
+    query's mask are never returned for that query. `restaurant_embeddings` is a
+    matrix or an EmbeddingIndex, which also takes per-query field `weights`.
+    """
+    score_block = getattr(restaurant_embeddings, "score_block", None)
+    for start in range(0, len(query_embeddings), block_size):
+        block_queries = query_embeddings[start:start + block_size]
+        if score_block is None:
+            sims = block_queries @ restaurant_embeddings.T
+        else:
+            sims = score_block(block_queries, None if weights is None else weights[start:start + block_size])
+        block = []
+        for offset, row in enumerate(sims):
+            i = start + offset
+            if masks is not None and masks[i] is not None:
+                row = np.where(masks[i], row, -np.inf)
+            top = top_k_positions(row, limits[i])
+            block.append((i, top, row[top]))
+        yield block
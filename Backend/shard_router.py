@@ -0,0 +1,279 @@
+"""
+Scatter-gather router over API shards. Each shard is the normal app started
+with SHARD_COUNTRIES, so it loads (and embeds) only those countries' restaurants.
+The router sends /semantic-search, /restaurants/search and /restaurants/nearby
+to every shard that can have matches and merges their top-k answers:
+
+    /semantic-search       by similarity
+    /restaurants/search    in the shards' row order, as one instance returns them: by id with the
+                           default ROW_LAYOUT=csv, by country code with a curve layout; with
+                           fuzzy=true by words matched, edits and votes, rescored from each record
+    /restaurants/nearby    by distance; shards whose bounding box is out of range are skipped
+
+fields= is forwarded with the fields the merge reads added, and the merged
+records are projected back. A shard's 4xx answer is passed on as it is; a
+5xx answer or an unreachable shard is a 502 naming the shard.
+
+    SHARD_COUNTRIES=1 uvicorn main_local:app --port 8001
+    SHARD_COUNTRIES=14,30,37,94,148,162,166,184,189,191,208,214,215,216 uvicorn main_local:app --port 8002
+    SHARDS=http://127.0.0.1:8001,http://127.0.0.1:8002 uvicorn shard_router:app --port 8000
+
+or start N local shards (countries balanced by row count) and the router in one go:
+
+    python shard_router.py --local 2
+
+Environment:
+    SHARDS                   comma-separated shard base URLs
+    SHARD_TIMEOUT            per-request timeout in seconds (default 30)
+    SHARD_WAIT               seconds to wait for shards to come up at startup (default 300)
+"""
+import argparse
+import asyncio
+import heapq
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+
+from api import (
+    RestaurantResponse, RestaurantResponseWithSimilarity, SemanticSearchRequest, fields_query, projection, respond,
+)
+from fuzzy import MAX_EDITS, record_match
+from geo import box_may_contain, haversine_km
+from metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY, MetricsMiddleware, stage
+
+class Shard:
+    __slots__ = ("url", "countries", "rows", "bbox", "row_layout")
+
+    def __init__(self, url, info):
+        self.url = url
+        self.countries = {int(code): name for code, name in info["countries"].items()}
+        self.rows = info["rows"]
+        self.bbox = info["bbox"]
+        self.row_layout = info.get("row_layout", "csv")
+
+    def has_country(self, pattern):
+        """Same test as the store's country filter: case-insensitive substring or regex"""
+        try:
+            regex = re.compile(pattern, re.IGNORECASE)
+        except re.error:
+            return True
+        return any(regex.search(name) for name in self.countries.values())
+
+    def describe(self):
+        return {"url": self.url, "countries": sorted(self.countries), "rows": self.rows, "bbox": self.bbox,
+                "row_layout": self.row_layout}
+
+def shard_fields(fields, merge_fields):
+    """The fields= sent to the shards: the requested projection plus the fields the merge reads"""
+    return None if fields is None else list(dict.fromkeys([*fields, *merge_fields]))
+
+def project(records, fields, extra=()):
+    """respond() for merged records, dropping the fields only the merge needed"""
+    if fields is None:
+        return records
+    keep = [*fields, *extra]
+    return respond([{field: record[field] for field in keep} for record in records], fields)
+
+async def discover(client, url, wait):
+    """GET {url}/shard, retrying until the shard has finished loading or `wait` seconds pass"""
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            response = await client.get(f"{url}/shard")
+            response.raise_for_status()
+            return Shard(url, response.json())
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Shard {url} did not come up within {wait}s")
+            await asyncio.sleep(1.0)
+
+def create_router(urls, timeout=30.0, wait=300.0, mounts=None):
+    """The router app; `mounts` ({url: httpx transport}) can serve shards in-process, e.g. httpx.ASGITransport"""
+    if not urls:
+        raise ValueError("No shards configured; set SHARDS to a comma-separated list of shard URLs")
+    app = FastAPI(title="Zomato-like Restaurant API (shard router)")
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(MetricsMiddleware)
+    shards: List[Shard] = []
+    client = httpx.AsyncClient(timeout=timeout, mounts=mounts)
+
+    @app.on_event("startup")
+    async def connect():
+        shards.extend(await asyncio.gather(*(discover(client, url, wait) for url in urls)))
+
+    @app.on_event("shutdown")
+    async def disconnect():
+        await client.aclose()
+
+    async def scatter(targets, method, path, **kwargs):
+        """The JSON bodies of the same request sent to every target shard"""
+        async def call(shard):
+            try:
+                response = await client.request(method, f"{shard.url}{path}", **kwargs)
+            except httpx.HTTPError as e:
+                raise HTTPException(status_code=502, detail=f"Shard {shard.url} failed: {e}")
+            if response.status_code != 200:
+                try:
+                    detail = response.json().get("detail")
+                except (ValueError, AttributeError):
+                    # Plain-text or HTML error pages from the shard or a proxy in front of it
+                    detail = response.text
+                if response.status_code >= 500:
+                    raise HTTPException(status_code=502,
+                                        detail=f"Shard {shard.url} failed: {response.status_code} {detail}")
+                # Client errors (bad weights, unknown fields) are the same on every shard
+                raise HTTPException(status_code=response.status_code, detail=detail)
+            return response.json()
+        with stage("scatter"):
+            return await asyncio.gather(*(call(shard) for shard in targets))
+
+    @app.post("/semantic-search", response_model=List[RestaurantResponseWithSimilarity])
+    async def semantic_search(request: SemanticSearchRequest, fields: Optional[List[str]] = fields_query()):
+        fields = projection(fields)
+        params = {"fields": ",".join(fields)} if fields else None
+        answers = await scatter(shards, "POST", "/semantic-search", json=request.model_dump(), params=params)
+        with stage("merge"):
+            merged = heapq.nlargest(request.limit, (r for answer in answers for r in answer),
+                                    key=lambda r: r["similarity"])
+        return project(merged, fields, ("similarity",))
+
+    @app.get("/restaurants/search", response_model=List[RestaurantResponse])
+    async def search_restaurants(
+        q_name: Optional[str] = Query(None, description="Search by restaurant name"),
+        q_city: Optional[str] = Query(None, description="Search by city"),
+        q_cuisine: Optional[str] = Query(None, description="Search by cuisine"),
+        q_country: Optional[str] = Query(None, description="Search by country"),
+        limit: int = 20,
+        fuzzy: bool = Query(False, description="Match q_name words to name and locality words despite typos, "
+                                               "best match first (see fuzzy.py)"),
+        max_edits: Optional[int] = Query(None, ge=0, le=MAX_EDITS, description="Cap on typos per word in fuzzy mode"),
+        fields: Optional[List[str]] = fields_query()
+    ):
+        fields = projection(fields)
+        fuzzy = fuzzy and bool(q_name)
+        targets = [s for s in shards if not q_country or s.has_country(q_country)]
+        # Shards hold disjoint countries with global ids, so either key reproduces one instance's row order
+        order = "id" if all(s.row_layout == "csv" for s in shards) else "country_code"
+        merge_fields = (order, "restaurant_name", "locality", "votes") if fuzzy else (order,)
+        requested = shard_fields(fields, merge_fields)
+        params = {k: v for k, v in (("q_name", q_name), ("q_city", q_city), ("q_cuisine", q_cuisine),
+                                    ("q_country", q_country), ("limit", limit), ("fuzzy", fuzzy or None),
+                                    ("max_edits", max_edits), ("fields", requested and ",".join(requested)))
+                  if v is not None}
+        answers = await scatter(targets, "GET", "/restaurants/search", params=params)
+        with stage("merge"):
+            if fuzzy:
+                # Shards return only rows matching their most query words, best first; keep the overall
+                # best-matched ones in the single instance's order (ties by row position)
+                records = [r for answer in answers for r in answer]
+                scores = [record_match(q_name, r, max_edits) for r in records]
+                best = max((matched for matched, _ in scores), default=0)
+                ranked = sorted((i for i, (matched, _) in enumerate(scores) if matched == best),
+                                key=lambda i: (scores[i][1], -records[i]["votes"], records[i][order]))
+                merged = [records[i] for i in ranked[:max(limit, 0)]]
+            else:
+                merged = heapq.merge(*answers, key=lambda r: r[order])
+                merged = [r for _, r in zip(range(max(limit, 0)), merged)]
+        return project(merged, fields)
+
+    @app.get("/restaurants/nearby", response_model=List[RestaurantResponse])
+    async def nearby_restaurants(
+        lat: float = Query(...),
+        lng: float = Query(...),
+        radius: float = Query(3.0, description="Radius in kilometers"),
+        limit: int = Query(20),
+        fields: Optional[List[str]] = fields_query()
+    ):
+        fields = projection(fields)
+        targets = [s for s in shards if s.bbox is not None and box_may_contain(s.bbox, lat, lng, radius)]
+        params = {"lat": lat, "lng": lng, "radius": radius, "limit": limit}
+        requested = shard_fields(fields, ("latitude", "longitude"))
+        if requested:
+            params["fields"] = ",".join(requested)
+        answers = await scatter(targets, "GET", "/restaurants/nearby", params=params)
+        with stage("merge"):
+            records = [r for answer in answers for r in answer]
+            if not records:
+                return project([], fields)
+            distances = haversine_km(lat, lng, [r["latitude"] for r in records], [r["longitude"] for r in records])
+            # Each shard returned its nearest `limit`, so the nearest `limit` overall are among them
+            order = sorted(range(len(records)), key=lambda i: distances[i])
+            merged = [records[i] for i in order[:max(limit, 0)]]
+        return project(merged, fields)
+
+    @app.get("/shards")
+    def list_shards():
+        return [shard.describe() for shard in shards]
+
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.get("/")
+    def root():
+        return {"message": f"Shard router over {len(urls)} shards. Try /semantic-search, /restaurants/search, "
+                           "/restaurants/nearby, /shards"}
+
+    return app
+
+# === LOCAL CLUSTER ===
+def balance_countries(csv_path, n_shards):
+    """Country codes split into n_shards groups of similar row count (largest country first)"""
+    import pandas as pd
+
+    counts = pd.read_csv(csv_path, encoding='latin-1', usecols=['Country Code'])['Country Code'].value_counts()
+    groups = [[] for _ in range(n_shards)]
+    sizes = [0] * n_shards
+    for code, count in counts.items():
+        smallest = sizes.index(min(sizes))
+        groups[smallest].append(int(code))
+        sizes[smallest] += int(count)
+    return [sorted(group) for group in groups if group]
+
+def run_local(n_shards, port, csv_path):
+    import uvicorn
+
+    processes, urls = [], []
+    for i, codes in enumerate(balance_countries(csv_path, n_shards)):
+        shard_port = port + 1 + i
+        env = {**os.environ, "SHARD_COUNTRIES": ",".join(map(str, codes))}
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main_local:app", "--port", str(shard_port)], env=env
+        ))
+        urls.append(f"http://127.0.0.1:{shard_port}")
+        print(f"shard {i}: {urls[-1]} countries {codes}")
+    try:
+        uvicorn.run(create_router(urls), port=port)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+def router_from_env():
+    urls = [u.strip().rstrip("/") for u in os.getenv("SHARDS", "").split(",") if u.strip()]
+    return create_router(urls, float(os.getenv("SHARD_TIMEOUT", "30")), float(os.getenv("SHARD_WAIT", "300")))
+
+# `uvicorn shard_router:app` needs SHARDS; `python shard_router.py --local N` sets up its own
+app = router_from_env() if os.getenv("SHARDS") else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--local", type=int, required=True, help="Number of local shard processes to start")
+    parser.add_argument("--port", type=int, default=8000, help="Router port; shards use the following ports")
+    parser.add_argument("--csv", default="zomato.csv", help="Dataset used to balance countries across shards")
+    args = parser.parse_args()
+    run_local(args.local, args.port, args.csv)
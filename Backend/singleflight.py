@@ -0,0 +1,80 @@
+"""
+Request coalescing: concurrent requests asking the same question share one
+computation. During a promotion, bursts of identical /semantic-search and
+/restaurants/nearby requests arrive within milliseconds; without coalescing
+each one encodes, scans and gathers on its own.
+
+    flight = SingleFlight("nearby")
+    records = await flight.do(key, compute)
+
+The first caller for a key (the leader) starts `compute` on the threadpool;
+callers arriving with the same key before it finishes wait for the same result
+instead of starting their own. Nothing is cached: once the computation
+finishes, the next caller starts a new one.
+
+- An exception raised by the computation is raised to every waiter, and the key
+  is released so the next request retries.
+- A cancelled waiter leaves without disturbing the others. When the last waiter
+  is cancelled the computation is abandoned (its thread finishes, its result is
+  dropped) and the key is released at once, so a later caller never joins it.
+- Waiters share one result object and must not mutate it.
+- When the leader's request is profiled, its profile samples the computation;
+  coalesced followers' profiles show them waiting.
+
+`singleflight_requests_total{flight, role}` counts leaders and coalesced
+followers per flight.
+"""
+import asyncio
+
+from fastapi.concurrency import run_in_threadpool
+
+from metrics import observe_singleflight
+from profiling import profiled
+
+class Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """In-flight computations by key; use from the event loop only"""
+
+    def __init__(self, name):
+        self.name = name
+        self.flights = {}
+
+    def __len__(self):
+        return len(self.flights)
+
+    async def do(self, key, fn, *args):
+        """fn(*args) on a worker thread, shared with every concurrent caller passing the same key"""
+        flight = self.flights.get(key)
+        if flight is None:
+            # profiled() runs fn in the leader's context, so a profiled leader samples the worker thread
+            flight = Flight(asyncio.ensure_future(run_in_threadpool(profiled(fn), *args)))
+            self.flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+            observe_singleflight(self.name, "leader")
+        else:
+            observe_singleflight(self.name, "coalesced")
+        flight.waiters += 1
+        try:
+            # shield: cancelling this caller must not cancel the computation the others wait on
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key, flight):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+
+    def _finished(self, key, flight):
+        self._forget(key, flight)
+        # Retrieve the exception of an abandoned computation so asyncio does not log it as unhandled
+        if not flight.task.cancelled():
+            flight.task.exception()
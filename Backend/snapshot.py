@@ -0,0 +1,134 @@
+"""
+Prebuilt startup state: the restaurant store, the spatial, autocomplete and
+fuzzy name indexes and the embedded field vectors, saved once (e.g. while
+building the Modal image) and loaded at startup instead of re-reading the CSV
+and re-encoding every restaurant.
+
+A snapshot is only used when it was built from the same CSV and Excel files
+(by content digest), the same encoder, embedding schema, row layout, geo index
+settings and shard countries; otherwise the app logs why and builds everything
+as usual.
+
+    python snapshot.py --out snapshot          # build with the current env config
+    python snapshot.py --check snapshot        # would the app use it?
+    SNAPSHOT_DIR=snapshot uvicorn main_local:app
+"""
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+
+from dotenv import load_dotenv
+
+SNAPSHOT_VERSION = 5
+SNAPSHOT_FILE = "snapshot.pkl"
+
+logger = logging.getLogger(__name__)
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_fingerprint(csv_path, excel_path):
+    return {"csv": file_digest(csv_path), "excel": file_digest(excel_path)}
+
+def schema_key(schema):
+    return None if schema is None else [list(schema.text_columns), sorted(schema.field_weights.items())]
+
+def index_key(config):
+    return [config.row_layout, config.geo_index, config.geo_cell_deg, sorted(config.shard_countries)]
+
+def save_snapshot(directory, state):
+    """Write a loaded ServiceState's store, search indexes and field vectors"""
+    config, embedding_index = state.config, state.embedding_index
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "sources": source_fingerprint(config.csv_path, config.country_excel_path),
+        "encoder_key": None if state.embedding_model is None else state.embedding_model.key,
+        "schema": schema_key(None if embedding_index is None else embedding_index.schema),
+        "index": index_key(config),
+        "store": state.store,
+        "geo_index": state.geo_index,
+        "autocomplete": state.autocomplete,
+        "fuzzy": state.fuzzy,
+        "fields": None if embedding_index is None else embedding_index.fields,
+    }
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+    return path
+
+def snapshot_mismatch(payload, config, encoder_key=None):
+    """Why a loaded snapshot cannot be used with this config, or None if it can"""
+    if payload.get("version") != SNAPSHOT_VERSION:
+        return f"version {payload.get('version')} != {SNAPSHOT_VERSION}"
+    try:
+        sources = source_fingerprint(config.csv_path, config.country_excel_path)
+    except OSError as e:
+        return f"cannot read its source files to check them: {e}"
+    if payload["sources"] != sources:
+        return "built from a different CSV or Excel file"
+    if payload["index"] != index_key(config):
+        return f"built with layout, geo index and shard {payload['index']}, running {index_key(config)}"
+    # The tabular profile (no encoder) can use any snapshot's store and index
+    if encoder_key is not None:
+        if payload["fields"] is None:
+            return "built without embeddings"
+        if payload["encoder_key"] != encoder_key:
+            return f"built with encoder {payload['encoder_key']}, running {encoder_key}"
+        if payload["schema"] != schema_key(config.embedding_schema):
+            return "built with a different embedding schema"
+    return None
+
+def load_snapshot(config, encoder_key=None):
+    """The payload under config.snapshot_dir, or None when there is none or it does not match"""
+    path = os.path.join(config.snapshot_dir, SNAPSHOT_FILE)
+    if not os.path.exists(path):
+        logger.warning("No snapshot at %s; building startup state from the CSV", path)
+        return None
+    with open(path, "rb") as f:
+        payload = pickle.load(f)
+    reason = snapshot_mismatch(payload, config, encoder_key)
+    if reason:
+        logger.warning("Ignoring snapshot %s: %s", path, reason)
+        return None
+    return payload
+
+def build(out_dir):
+    """Load the app state from the CSV under the current env config and save it"""
+    from api import ServiceState
+    from config import AppConfig
+
+    config = AppConfig.from_env()
+    config.snapshot_dir = None
+    return save_snapshot(out_dir, ServiceState(config).load())
+
+def check(directory):
+    """Load the app state against the snapshot; True if it was used (the reason is logged otherwise)"""
+    from api import ServiceState
+    from config import AppConfig
+
+    config = AppConfig.from_env()
+    config.snapshot_dir = directory
+    return ServiceState(config).load().snapshot is not None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--out", help="Directory to write the snapshot to")
+    group.add_argument("--check", help="Snapshot directory to validate against the current data and config")
+    args = parser.parse_args()
+    load_dotenv()
+    if args.out:
+        path = build(args.out)
+        print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    else:
+        usable = check(args.check)
+        print("Snapshot is usable" if usable else "Snapshot would be ignored")
+        raise SystemExit(0 if usable else 1)
@@ -0,0 +1,468 @@
+"""
+SQLite storage engine (STORAGE=sqlite): the restaurant catalog stays in a local
+database file instead of RAM, so it is not capped by a worker's memory and a
+new catalog is a file swap rather than a reload. SqliteStore answers the calls
+the tabular endpoints make on RestaurantStore, with the same row positions in
+the same ROW_LAYOUT order, and RTreeIndex the nearby queries of GridIndex; the
+endpoints run unchanged on either.
+
+The database holds
+- `restaurants`: one row per restaurant keyed by its position, so the rows of a
+  city sit on neighbouring pages; indexes on restaurant_id, average cost for
+  two and aggregate rating serve lookups and range filters;
+- `restaurants_rtree`: an R*Tree over coordinates for nearby queries, carrying
+  the exact coordinates for the distance check;
+- `restaurants_fts`: an FTS5 trigram index over name, city, cuisines and
+  country, so the case-insensitive substring filters of /restaurants and
+  /restaurants/search are index lookups. Terms under 3 characters and regular
+  expressions fall back to scanning the table, with the same results.
+
+It is built from the CSV a chunk at a time (the rows are sorted by SQLite, not
+in memory) and replaced atomically:
+
+    python sqlite_store.py --out restaurants.sqlite     # with the current env config
+    STORAGE=sqlite API_PROFILE=tabular uvicorn main_local:app
+
+The app builds SQLITE_PATH itself when it is missing or was built with another
+row layout or shard, but not when the CSV changes. Each worker process reads it
+through its own pool of read-only connections. Autocomplete, fuzzy name search
+and ranked nearby need whole-catalog in-memory indexes and answer 503 on this
+engine. `python -m benchmarks.storage` compares it with the in-memory store.
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from geo import CURVES, bounding_box, haversine_km, lng_ranges
+from store import (
+    EXCEL_ENGINE, FACETS, REGEX_META, RESPONSE_FIELDS, RESTAURANT_FIELDS, ROW_LAYOUTS, RestaurantStore, facet_totals,
+    histogram_bins, parse_metric, utf8_buffers,
+)
+
+SQLITE_VERSION = 1
+# Substring filters served by the trigram index
+FTS_FIELDS = ("restaurant_name", "city", "cuisines", "country")
+# Shortest term a trigram index can look up
+TRIGRAM_MIN_CHARS = 3
+BUILD_CHUNK_ROWS = 100_000
+# Selections of at most this many contiguous runs of positions are read as rowid ranges
+SELECTION_MAX_RUNS = 64
+# Radius of the first box a nearby search reads; it doubles until it holds `limit` points
+NEARBY_START_KM = 0.5
+MMAP_BYTES = 256 << 20
+
+logger = logging.getLogger(__name__)
+
+# === BUILD ===
+def _sql_type(dtype):
+    if dtype == "str":
+        return "TEXT"
+    return "INTEGER" if np.issubdtype(dtype, np.integer) else "REAL"
+
+def _column_values(series, dtype):
+    """A DataFrame column as the Python values RestaurantStore.from_dataframe would hold"""
+    if dtype == "str":
+        return pd.Series(series.to_numpy(), dtype=object).fillna("").astype(str).tolist()
+    return series.to_numpy().astype(dtype).tolist()
+
+def build_key(layout, shard_countries):
+    return {"version": SQLITE_VERSION, "layout": layout, "shard_countries": sorted(shard_countries)}
+
+def build_database(path, csv_path, excel_path, layout="hilbert", shard_countries=(), chunk_rows=BUILD_CHUNK_ROWS):
+    """Write the catalog database of the CSV merged with the country sheet to path, replacing it atomically"""
+    if layout not in ROW_LAYOUTS:
+        raise ValueError(f"Unknown row layout {layout!r}; expected one of {', '.join(ROW_LAYOUTS)}")
+    df_country = pd.read_excel(excel_path, engine=EXCEL_ENGINE)
+    # Text columns read as text in every chunk, whatever that chunk's values look like
+    text_columns = {column: str for column, dtype in RESTAURANT_FIELDS.values()
+                    if dtype == "str" and column not in df_country}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        with closing(sqlite3.connect(tmp)) as conn:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            columns = ", ".join(f"{field} {_sql_type(dtype)}" for field, (_, dtype) in RESTAURANT_FIELDS.items())
+            conn.execute(f"CREATE TEMP TABLE staging ({columns}, curve INTEGER)")
+            insert = f"INSERT INTO staging VALUES ({', '.join('?' * (len(RESTAURANT_FIELDS) + 1))})"
+            rows = 0
+            for chunk in pd.read_csv(csv_path, encoding='latin-1', dtype=text_columns, chunksize=chunk_rows):
+                df = pd.merge(chunk, df_country, on='Country Code', how='left')
+                # ids count every CSV row, as in the in-memory store (a shard keeps the full file's ids)
+                df['id'] = np.arange(rows, rows + len(df))
+                rows += len(df)
+                if shard_countries:
+                    df = df[df['Country Code'].isin(shard_countries)]
+                values = [_column_values(df[column], dtype) for column, dtype in RESTAURANT_FIELDS.values()]
+                if layout == "csv":
+                    curve = [0] * len(df)
+                else:
+                    curve = CURVES[layout](df['Latitude'].to_numpy(), df['Longitude'].to_numpy()).tolist()
+                conn.executemany(insert, zip(*values, curve))
+
+            # store.layout_order in SQL: by country, city and curve key, ties in CSV order
+            order = "id" if layout == "csv" else "country_code, city, curve, id"
+            fields = ", ".join(RESPONSE_FIELDS)
+            conn.execute(f"CREATE TABLE restaurants (position INTEGER PRIMARY KEY, {columns})")
+            conn.execute(f"INSERT INTO restaurants SELECT ROW_NUMBER() OVER (ORDER BY {order}) - 1, {fields} "
+                         f"FROM staging ORDER BY {order}")
+            conn.execute("DROP TABLE staging")
+            conn.executescript(f"""
+                CREATE INDEX restaurants_restaurant_id ON restaurants (restaurant_id);
+                CREATE INDEX restaurants_cost ON restaurants (average_cost_for_two);
+                CREATE INDEX restaurants_rating ON restaurants (aggregate_rating);
+                CREATE VIRTUAL TABLE restaurants_rtree USING rtree(
+                    position, min_lat, max_lat, min_lng, max_lng, +latitude, +longitude);
+                INSERT INTO restaurants_rtree
+                    SELECT position, latitude, latitude, longitude, longitude, latitude, longitude FROM restaurants
+                    WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
+                CREATE VIRTUAL TABLE restaurants_fts USING fts5(
+                    {', '.join(FTS_FIELDS)}, content='restaurants', content_rowid='position', tokenize='trigram');
+                INSERT INTO restaurants_fts (restaurants_fts) VALUES ('rebuild');
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                ANALYZE;
+            """)
+            size = conn.execute("SELECT COUNT(*) FROM restaurants").fetchone()[0]
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("build", json.dumps(build_key(layout, shard_countries))), ("rows", str(size)),
+            ])
+            conn.commit()
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path
+
+def read_meta(path):
+    """The database's meta table as a dict"""
+    with closing(sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)) as conn:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+def open_store(config):
+    """The SqliteStore for an AppConfig, building its database from the CSV first when missing or built differently"""
+    path, key = config.sqlite_path, build_key(config.row_layout, config.shard_countries)
+    reason = None
+    if not os.path.exists(path):
+        reason = "no database"
+    else:
+        try:
+            built = json.loads(read_meta(path)["build"])
+        except (sqlite3.DatabaseError, KeyError) as e:
+            reason = f"unreadable ({e})"
+        else:
+            if built != key:
+                reason = f"built with {built}, running {key}"
+    if reason:
+        logger.warning("Building %s from %s: %s", path, config.csv_path, reason)
+        build_database(path, config.csv_path, config.country_excel_path, config.row_layout, config.shard_countries)
+    return SqliteStore(path, config.sqlite_pool_size)
+
+# === CONNECTIONS ===
+def _regexp(pattern, value):
+    """SQL `value REGEXP pattern` with StringColumn.contains' semantics for non-literal patterns"""
+    return value is not None and value != "" and re.search(pattern, value, re.IGNORECASE) is not None
+
+class ConnectionPool:
+    """
+    Read-only connections to one database, opened on demand up to `size` and
+    reused. A forked process starts an empty pool of its own, as SQLite
+    connections must not cross a fork.
+    """
+
+    def __init__(self, path, size=8):
+        self.uri = f"file:{quote(os.path.abspath(path))}?mode=ro"
+        self.size = size
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+        conn.create_function("regexp", 2, _regexp, deterministic=True)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, waiting for one when all `size` are in use"""
+        if self.pid != os.getpid():
+            self._reset()
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                can_open = self.opened < self.size
+                if can_open:
+                    self.opened += 1
+            conn = self._open() if can_open else self.idle.get()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+# === STORE ===
+def _fts_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+class SqliteStore:
+    """RestaurantStore's gather, filter, facet and aggregate calls, answered from the catalog database"""
+
+    def __init__(self, path, pool_size=8):
+        self.path = path
+        self.size = int(read_meta(path)["rows"])
+        self.pool = ConnectionPool(path, pool_size)
+
+    def __len__(self):
+        return self.size
+
+    def query(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def positions(self, sql, params=()):
+        """The first column of a query as an int64 array, sent as one string instead of a tuple per row"""
+        text = self.query(f"SELECT group_concat(position) FROM ({sql})", params)[0][0]
+        return np.array(text.split(","), dtype=np.int64) if text else np.empty(0, dtype=np.int64)
+
+    def _selection(self, positions):
+        """SQL condition and parameters restricting a query to positions (None or every row: no restriction)"""
+        if positions is None or len(positions) == self.size:
+            return "1", []
+        positions = np.asarray(positions, dtype=np.int64)
+        if not len(positions):
+            return "0", []
+        # A city's or country's rows are one run in a curve layout: rowid range scans
+        breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+        if len(breaks) < SELECTION_MAX_RUNS:
+            starts, ends = positions[np.r_[0, breaks]].tolist(), positions[np.r_[breaks - 1, len(positions) - 1]].tolist()
+            return (f"({' OR '.join(['position BETWEEN ? AND ?'] * len(starts))})",
+                    [bound for run in zip(starts, ends) for bound in run])
+        return "position IN (SELECT value FROM json_each(?))", [json.dumps(positions.tolist())]
+
+    # === GATHER ===
+    def gather(self, positions, fields=None):
+        """{field: [python values]} for the rows at positions"""
+        fields = fields or RESPONSE_FIELDS
+        positions = np.asarray(positions, dtype=np.int64)
+        rows = []
+        if len(positions):
+            rows = self.query(
+                f"SELECT {', '.join('r.' + field for field in fields)} FROM json_each(?) AS p "
+                f"JOIN restaurants AS r ON r.position = p.value ORDER BY p.key",
+                (json.dumps(positions.tolist()),),
+            )
+        return {field: list(values) for field, values in zip(fields, zip(*rows) if rows else [()] * len(fields))}
+
+    def take(self, field, positions):
+        return self.gather(positions, [field])[field]
+
+    def gather_arrays(self, positions, fields=None):
+        """RestaurantStore.gather_arrays: numeric fields in their storage dtype, strings as utf8_buffers() pairs"""
+        columns = self.gather(positions, fields)
+        for field, values in columns.items():
+            dtype = RESTAURANT_FIELDS[field][1]
+            columns[field] = utf8_buffers(values) if dtype == "str" else np.asarray(values, dtype=dtype)
+        return columns
+
+    # Built on gather() alone
+    records = RestaurantStore.records
+    grouped_records = RestaurantStore.grouped_records
+    iter_chunks = RestaurantStore.iter_chunks
+
+    def position_of(self, restaurant_id: int):
+        """Row position of the first restaurant with this Restaurant ID, or None"""
+        rows = self.query("SELECT MIN(position) FROM restaurants WHERE restaurant_id = ?", (restaurant_id,))
+        return rows[0][0]
+
+    # === FILTERS ===
+    def _contains(self, field, pattern):
+        """
+        (FTS5 query, None, []) or (None, SQL condition, parameters) selecting the
+        rows whose field matches like StringColumn.contains(pattern)
+        """
+        alternatives = pattern.split("|")
+        if pattern.isascii() and all(alternatives) and not REGEX_META.search(pattern.replace("|", "")):
+            if field in FTS_FIELDS and all(len(a) >= TRIGRAM_MIN_CHARS for a in alternatives):
+                return f"{field} : ({' OR '.join(_fts_phrase(a) for a in alternatives)})", None, []
+            # lower() and instr() fold ASCII only, like the in-memory literal scan
+            condition = " OR ".join(f"instr(lower({field}), ?) > 0" for _ in alternatives)
+            return None, f"({condition})", [a.lower() for a in alternatives]
+        return None, f"{field} REGEXP ?", [pattern]
+
+    def filter_positions(self, city=None, cuisine=None, country=None, min_cost=None, max_cost=None, name=None,
+                         min_rating=None, limit=None):
+        """
+        Ascending positions of the rows matching RestaurantStore.filter_positions'
+        filters, only the first `limit` if given. Substring filters the trigram
+        index serves are answered from it alone when nothing else is filtered.
+        """
+        fts, conditions, params, ranges = [], [], [], []
+        for field, pattern in (("city", city), ("country", country), ("cuisines", cuisine), ("restaurant_name", name)):
+            if pattern:
+                match, condition, values = self._contains(field, pattern)
+                if match is not None:
+                    fts.append(f"({match})")
+                else:
+                    conditions.append(condition)
+                    params += values
+        for condition, value in (("average_cost_for_two >= ?", min_cost), ("average_cost_for_two <= ?", max_cost),
+                                 ("aggregate_rating >= ?", min_rating)):
+            if value is not None:
+                ranges.append(condition)
+                params.append(value)
+        limit_sql = "" if limit is None else f" LIMIT {int(limit)}"
+        if fts and not conditions and not ranges:
+            # The index returns its rowids (positions) in order
+            return self.positions(f"SELECT rowid AS position FROM restaurants_fts WHERE restaurants_fts MATCH ? "
+                                  f"ORDER BY rowid{limit_sql}", [" AND ".join(fts)])
+        if fts:
+            # One index lookup for every indexed filter
+            conditions.insert(0, "position IN (SELECT rowid FROM restaurants_fts WHERE restaurants_fts MATCH ?)")
+            params.insert(0, " AND ".join(fts))
+        if ranges:
+            # Ordering in SQL would make the planner scan in position order instead of using the cost or rating index
+            where = " AND ".join(conditions + ranges)
+            return np.sort(self.positions(f"SELECT position FROM restaurants WHERE {where}", params))[:limit]
+        if not conditions:
+            return np.arange(self.size if limit is None else min(self.size, limit), dtype=np.int64)
+        # In position order, so a page stops reading once it has its rows
+        return self.positions(
+            f"SELECT position FROM restaurants WHERE {' AND '.join(conditions)} ORDER BY position{limit_sql}", params)
+
+    # === FACETS ===
+    def facet_counts(self, facet, positions=None):
+        """[(value, rows)] of a FACETS entry over the rows at positions (default all), most rows first"""
+        field, separator = FACETS[facet]
+        selection, params = self._selection(positions)
+        rows = self.query(f"SELECT {field}, COUNT(*) FROM restaurants WHERE {selection} GROUP BY 1", params)
+        return facet_totals([value for value, _ in rows], [count for _, count in rows], separator)
+
+    # === AGGREGATION ===
+    def aggregate(self, positions, group_by=None, metrics=("count",), bins=10, limit=None):
+        """
+        RestaurantStore.aggregate in SQL: counts, sums, means and extremes in one
+        GROUP BY, and each histogram from the distinct (group, value) pairs, binned
+        with the in-memory store's edges and arithmetic.
+        """
+        parsed = [(metric, *parse_metric(metric)) for metric in metrics]
+        selection, params = self._selection(positions)
+        key = group_by or "NULL"
+        functions = {"sum": "TOTAL", "mean": "AVG", "min": "MIN", "max": "MAX"}
+        scalars = [(metric, f"{functions[op]}({field})") for metric, op, field in parsed if op in functions]
+        # Equal counts keep the in-memory order: string groups by first row, numbers by value
+        tie = "MIN(position)" if group_by and RESTAURANT_FIELDS[group_by][1] == "str" else "1"
+        groups = self.query(
+            f"SELECT {key}, COUNT(*){''.join(', ' + expression for _, expression in scalars)} FROM restaurants "
+            f"WHERE {selection} GROUP BY 1 ORDER BY 2 DESC, {tie} LIMIT ?",
+            params + [-1 if limit is None else limit],
+        )
+        results = [{metric: float(value) for (metric, _), value in zip(scalars, row[2:])} for row in groups]
+
+        edges = {}
+        for metric, op, field in parsed:
+            if op != "histogram":
+                continue
+            pairs = self.query(f"SELECT {key}, {field}, COUNT(*) FROM restaurants WHERE {selection} GROUP BY 1, 2", params)
+            values = np.array([value for _, value, _ in pairs], dtype=np.float64)
+            field_edges = np.histogram_bin_edges(values, bins=bins)
+            histograms = {row[0]: np.zeros(bins, dtype=np.int64) for row in groups}
+            for (group, _, count), bin_index in zip(pairs, histogram_bins(values, field_edges).tolist()):
+                if group in histograms:
+                    histograms[group][bin_index] += count
+            for row, group_results in zip(groups, results):
+                group_results[metric] = histograms[row[0]].tolist()
+            edges[field] = field_edges.tolist()
+        # Metrics in the order they were asked for
+        order = [metric for metric, op, _ in parsed if op != "count"]
+        rows = [(row[0], row[1], {metric: group_results[metric] for metric in order})
+                for row, group_results in zip(groups, results)]
+        return rows, edges
+
+    # === SUMMARY ===
+    def countries(self):
+        """{country code: country name} of the restaurants held"""
+        return {code: country for code, country, _ in self.query(
+            "SELECT country_code, country, MIN(position) FROM restaurants GROUP BY 1")}
+
+    def bbox(self):
+        """[min_lat, min_lng, max_lat, max_lng] of the located restaurants, or None"""
+        # Every located restaurant is in the R*Tree, with its exact coordinates
+        box = self.query("SELECT MIN(latitude), MIN(longitude), MAX(latitude), MAX(longitude) FROM restaurants_rtree")[0]
+        return None if box[0] is None else list(box)
+
+# === SPATIAL INDEX ===
+class RTreeIndex:
+    """GridIndex's nearby queries for a SqliteStore: R*Tree bounding-box candidates, then exact distances"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def candidates(self, lat: float, lng: float, radius_km: float):
+        """(positions, lats, lngs) of the points inside the radius' bounding box"""
+        lat_lo, lat_hi, lng_span = bounding_box(lat, lng, radius_km)
+        rows = []
+        with self.store.pool.connection() as conn:
+            for west, east in lng_ranges(lng, lng_span):
+                rows += conn.execute(
+                    "SELECT position, latitude, longitude FROM restaurants_rtree "
+                    "WHERE max_lat >= ? AND min_lat <= ? AND max_lng >= ? AND min_lng <= ?",
+                    (lat_lo, lat_hi, west, east),
+                ).fetchall()
+        points = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        return points[:, 0].astype(np.int64), points[:, 1], points[:, 2]
+
+    def query(self, lat: float, lng: float, radius_km: float, limit: int, mask=None):
+        """
+        (positions, distances_km) of the nearest `limit` points within radius_km,
+        nearest first. An optional boolean row mask restricts the candidates.
+        The box searched starts at NEARBY_START_KM and doubles until `limit`
+        points lie within its radius (every point that close is in the box, so
+        they are the nearest), reading a few hundred rows of a dense city instead
+        of every row within radius_km.
+        """
+        search_km = min(NEARBY_START_KM, radius_km)
+        while True:
+            positions, lats, lngs = self.candidates(lat, lng, search_km)
+            if mask is not None:
+                keep = mask[positions]
+                positions, lats, lngs = positions[keep], lats[keep], lngs[keep]
+            distances = haversine_km(lat, lng, lats, lngs)
+            inside = distances <= search_km
+            if search_km >= radius_km or inside.sum() >= limit:
+                break
+            search_km = min(2 * search_km, radius_km)
+        positions, distances = positions[inside], distances[inside]
+        # Restaurants sharing coordinates come in position order, as GridIndex returns them
+        order = np.lexsort((positions, distances))[:max(limit, 0)]
+        return positions[order], distances[order]
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    from config import AppConfig
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="Database to write (default SQLITE_PATH)")
+    args = parser.parse_args()
+    load_dotenv()
+    config = AppConfig.from_env()
+    path = build_database(args.out or config.sqlite_path, config.csv_path, config.country_excel_path,
+                          config.row_layout, config.shard_countries)
+    print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
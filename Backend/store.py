@@ -0,0 +1,525 @@
+import importlib.util
+import re
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+from geo import CURVES
+
+# calamine parses the country sheet ~10x faster than openpyxl (and imports far faster); used when installed
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+# === SCHEMA ===
+# RestaurantResponse field -> (DataFrame column, storage dtype); "str" columns are dictionary-encoded
+RESTAURANT_FIELDS = {
+    "id": ("id", np.int64),
+    "restaurant_id": ("Restaurant ID", np.int64),
+    "restaurant_name": ("Restaurant Name", "str"),
+    "country": ("Country", "str"),
+    "country_code": ("Country Code", np.int16),
+    "city": ("City", "str"),
+    "address": ("Address", "str"),
+    "locality": ("Locality", "str"),
+    "locality_verbose": ("Locality Verbose", "str"),
+    "longitude": ("Longitude", np.float64),
+    "latitude": ("Latitude", np.float64),
+    "cuisines": ("Cuisines", "str"),
+    "average_cost_for_two": ("Average Cost for two", np.float64),
+    "currency": ("Currency", "str"),
+    "has_table_booking": ("Has Table booking", "str"),
+    "has_online_delivery": ("Has Online delivery", "str"),
+    "is_delivering_now": ("Is delivering now", "str"),
+    "switch_to_order_menu": ("Switch to order menu", "str"),
+    "price_range": ("Price range", np.int8),
+    "aggregate_rating": ("Aggregate rating", np.float64),
+    "rating_color": ("Rating color", "str"),
+    "rating_text": ("Rating text", "str"),
+    "votes": ("Votes", np.int32),
+}
+RESPONSE_FIELDS = list(RESTAURANT_FIELDS)
+REGEX_META = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+def utf8_buffers(values):
+    """(int32 value offsets, uint8 UTF-8 bytes) of a list of strings: the buffers of an Arrow string array"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+class StringColumn:
+    """
+    Dictionary-encoded strings: one int32 code per row, and each distinct value
+    stored once as UTF-8 in a single NUL-separated buffer with byte offsets.
+    """
+
+    __slots__ = ("codes", "data", "offsets")
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object).fillna("").astype(str))
+        encoded = [str(v).encode("utf-8") for v in uniques]
+        self.codes = codes.astype(np.int32)
+        self.data = b"\0".join(encoded)
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) + 1 for e in encoded], out=self.offsets[1:])
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def categories(self):
+        """Every distinct value, in code order"""
+        return self.data.decode("utf-8").split("\0") if len(self.offsets) > 1 else []
+
+    def take(self, positions):
+        codes = self.codes[positions]
+        starts = self.offsets[codes].tolist()
+        ends = (self.offsets[codes + 1] - 1).tolist()
+        data = self.data
+        return [data[start:end].decode("utf-8") for start, end in zip(starts, ends)]
+
+    def take_utf8(self, positions):
+        """utf8_buffers() of take(positions), sliced out of the buffer without decoding any string"""
+        codes = self.codes[positions]
+        starts = self.offsets[codes]
+        lengths = self.offsets[codes + 1] - 1 - starts
+        offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # Byte i of row r is data[starts[r] + i], at offsets[r] + i in the output
+        index = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return offsets.astype(np.int32), np.frombuffer(self.data, dtype=np.uint8)[index]
+
+    def take_categories(self, codes):
+        """The distinct values with these codes"""
+        data, offsets = self.data, self.offsets
+        return [data[offsets[c]:offsets[c + 1] - 1].decode("utf-8") for c in np.asarray(codes).tolist()]
+
+    def category_hits(self, predicate):
+        """Predicate evaluated once per distinct value, as a bool array indexed by code"""
+        categories = self.categories
+        return np.fromiter((predicate(c) for c in categories), dtype=bool, count=len(categories))
+
+    def category_mask(self, predicate):
+        """Row mask from a predicate evaluated once per distinct value"""
+        return self.category_hits(predicate)[self.codes]
+
+    def contains_hits(self, pattern: str, case: bool = False):
+        """Which distinct values match `pattern`, indexed by code"""
+        alternatives = pattern.split("|")
+        if pattern.isascii() and all(alternatives) and not REGEX_META.search(pattern.replace("|", "")):
+            hits = self._contains_literal(alternatives[0].encode("ascii"), case)
+            for alternative in alternatives[1:]:
+                hits |= self._contains_literal(alternative.encode("ascii"), case)
+            return hits
+        regex = re.compile(pattern, flags=0 if case else re.IGNORECASE)
+        return self.category_hits(lambda c: c != "" and regex.search(c) is not None)
+
+    def contains(self, pattern: str, case: bool = False):
+        """Same semantics as pandas str.contains(pattern, case=case, na=False)"""
+        return self.contains_hits(pattern, case)[self.codes]
+
+    def _contains_literal(self, needle: bytes, case: bool):
+        """Substring scan over the whole value buffer at C speed, then map hits back to categories"""
+        haystack = self.data if case else self.data.lower()
+        needle = needle if case else needle.lower()
+        offsets = self.offsets.tolist()
+        found = []
+        start = haystack.find(needle)
+        while start != -1:
+            category = bisect_right(offsets, start) - 1
+            found.append(category)
+            start = haystack.find(needle, offsets[category + 1])
+        hits = np.zeros(len(offsets) - 1, dtype=bool)
+        hits[found] = True
+        return hits
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + len(self.data) + self.offsets.nbytes
+
+# Facet -> (store field, separator of a multi-valued field or None)
+FACETS = {"country": ("country", None), "city": ("city", None), "cuisine": ("cuisines", ",")}
+
+# Fields a result set can be grouped by, and the operations of an aggregate metric ("mean:votes")
+GROUP_BY_FIELDS = tuple(f for f, (_, dtype) in RESTAURANT_FIELDS.items() if dtype == "str") + ("country_code", "price_range")
+AGGREGATE_OPS = ("count", "sum", "mean", "min", "max", "histogram")
+
+def parse_metric(metric):
+    """'mean:aggregate_rating' -> ('mean', 'aggregate_rating'); 'count' -> ('count', None)"""
+    op, _, field = metric.partition(":")
+    if op not in AGGREGATE_OPS:
+        raise ValueError(f"Unknown metric {op!r}; expected one of {', '.join(AGGREGATE_OPS)}")
+    if op == "count":
+        return op, None
+    if RESTAURANT_FIELDS.get(field, (None, "str"))[1] == "str":
+        numeric = [f for f, (_, dtype) in RESTAURANT_FIELDS.items() if dtype != "str"]
+        raise ValueError(f"{op} needs a numeric field, e.g. {op}:votes; expected one of {', '.join(numeric)}")
+    return op, field
+
+def facet_totals(values, counts, separator=None):
+    """[(value, rows)] from distinct values and their row counts, multi-valued ones split; most rows first"""
+    if separator is None:
+        totals = dict(zip(values, counts))
+    else:
+        # "North Indian, Chinese" counts once for each cuisine
+        totals = {}
+        for value, count in zip(values, counts):
+            for part in value.split(separator):
+                part = part.strip()
+                totals[part] = totals.get(part, 0) + count
+    totals.pop("", None)
+    return sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+
+def histogram_bins(values, edges):
+    """Bin index of each value for equal-width edges, by arithmetic, corrected at the edges like np.histogram"""
+    bins = len(edges) - 1
+    scale = bins / (edges[-1] - edges[0])
+    bin_index = np.clip(((values - edges[0]) * scale).astype(np.int64), 0, bins - 1)
+    bin_index -= values < edges[bin_index]
+    bin_index += (values >= edges[bin_index + 1]) & (bin_index != bins - 1)
+    return bin_index
+
+def parse_fields(specs):
+    """['restaurant_id,restaurant_name', 'latitude'] -> the RESPONSE_FIELDS named, in order; None -> None (all)"""
+    if not specs:
+        return None
+    fields = list(dict.fromkeys(f.strip() for spec in specs for f in spec.split(",") if f.strip()))
+    for field in fields:
+        if field not in RESTAURANT_FIELDS:
+            raise ValueError(f"Unknown field {field!r}; expected one of {', '.join(RESPONSE_FIELDS)}")
+    return fields or None
+
+# === LAYOUT ===
+ROW_LAYOUTS = ("csv", *CURVES)
+# String fields with an offset table; the curve layouts keep each value's rows contiguous
+PARTITION_FIELDS = ("country", "city")
+# Above this share of rows a filter is cheaper as one mask scan than as a partition gather
+PARTITION_MAX_FRACTION = 0.25
+
+def layout_order(df: pd.DataFrame, layout: str = "hilbert") -> np.ndarray:
+    """Row order for a layout: CSV order, or by country, then city, then along a space-filling curve"""
+    if layout not in ROW_LAYOUTS:
+        raise ValueError(f"Unknown row layout {layout!r}; expected one of {', '.join(ROW_LAYOUTS)}")
+    if layout == "csv":
+        return np.arange(len(df))
+    curve = CURVES[layout](df['Latitude'].to_numpy(), df['Longitude'].to_numpy())
+    city = pd.factorize(df['City'].fillna("").astype(str), sort=True)[0]
+    return np.lexsort((curve, city, df['Country Code'].to_numpy()))
+
+class Partition:
+    """
+    Row positions grouped by a string column's codes: the rows holding value c
+    are order[offsets[c]:offsets[c + 1]]. When every value's rows are already
+    contiguous (a curve layout), order is the identity and is not stored.
+    """
+
+    __slots__ = ("order", "offsets")
+
+    def __init__(self, codes, n_values):
+        self.offsets = np.zeros(n_values + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=n_values), out=self.offsets[1:])
+        # factorize numbers values by first appearance, so contiguous values mean non-decreasing codes
+        contiguous = bool(np.all(codes[1:] >= codes[:-1]))
+        self.order = None if contiguous else np.argsort(codes, kind="stable")
+
+    @property
+    def contiguous(self):
+        return self.order is None
+
+    def count(self, hits):
+        """Rows holding any of the values flagged in hits"""
+        return int(np.diff(self.offsets)[hits].sum())
+
+    def positions(self, hits):
+        """Ascending row positions holding any of the values flagged in hits"""
+        values = np.flatnonzero(hits)
+        positions = self.rows(values)
+        return positions if self.order is None or len(values) == 1 else np.sort(positions)
+
+    def rows(self, values):
+        """Row positions holding each of the given values in turn (ascending within a value)"""
+        starts, ends = self.offsets[values], self.offsets[np.asarray(values) + 1]
+        lengths = ends - starts
+        # One arange over all the runs, shifted so each run starts at its value's offset
+        index = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return index if self.order is None else self.order[index]
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + (0 if self.order is None else self.order.nbytes)
+
+class RestaurantStore:
+    """
+    Struct-of-arrays restaurant table: NumPy numeric columns, dictionary-encoded
+    string columns and one contiguous float32 embedding block, all indexed by row
+    position. Endpoints select positions (masks, indexes, top-k) and gather only
+    those rows.
+    """
+
+    __slots__ = ("size", "columns", "embeddings", "partitions", "_ids_order", "_ids_sorted")
+
+    def __init__(self, columns, embeddings=None):
+        self.columns = columns
+        self.size = len(columns["id"])
+        self.embeddings = None if embeddings is None else np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.partitions = {
+            field: Partition(columns[field].codes, len(columns[field].offsets) - 1) for field in PARTITION_FIELDS
+        }
+        self._ids_order = np.argsort(columns["restaurant_id"], kind="stable")
+        self._ids_sorted = columns["restaurant_id"][self._ids_order]
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, embeddings=None):
+        columns = {}
+        for field, (column, dtype) in RESTAURANT_FIELDS.items():
+            if dtype == "str":
+                columns[field] = StringColumn(df[column].to_numpy())
+            else:
+                columns[field] = df[column].to_numpy().astype(dtype)
+        return cls(columns, embeddings)
+
+    def __len__(self):
+        return self.size
+
+    # === GATHER ===
+    def column(self, field):
+        """Full numeric array, or the StringColumn for string fields"""
+        return self.columns[field]
+
+    def take(self, field, positions):
+        column = self.columns[field]
+        if isinstance(column, StringColumn):
+            return column.take(positions)
+        return column[positions].tolist()
+
+    def gather(self, positions, fields=None):
+        """{field: [python values]} for the rows at positions"""
+        positions = np.asarray(positions, dtype=np.int64)
+        return {field: self.take(field, positions) for field in (fields or RESPONSE_FIELDS)}
+
+    def gather_arrays(self, positions, fields=None):
+        """{field: numpy array} for the rows at positions, string fields as utf8_buffers() pairs"""
+        positions = np.asarray(positions, dtype=np.int64)
+        columns = {}
+        for field in fields or RESPONSE_FIELDS:
+            column = self.columns[field]
+            columns[field] = column.take_utf8(positions) if isinstance(column, StringColumn) else column[positions]
+        return columns
+
+    def records(self, positions, fields=None):
+        """Response-shaped dicts for the rows at positions"""
+        columns = self.gather(positions, fields)
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+    def grouped_records(self, groups, fields=None):
+        """records for several position arrays, gathered in one pass and split back per group"""
+        if not groups:
+            return []
+        records = self.records(np.concatenate(groups), fields)
+        bounds = np.cumsum([0] + [len(positions) for positions in groups])
+        return [records[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    def iter_chunks(self, positions, chunk_size=500, fields=None):
+        """Yield gather() results for bounded slices of positions"""
+        for start in range(0, len(positions), chunk_size):
+            yield self.gather(positions[start:start + chunk_size], fields)
+
+    def position_of(self, restaurant_id: int):
+        """Row position of the first restaurant with this Restaurant ID, or None"""
+        i = np.searchsorted(self._ids_sorted, restaurant_id, side="left")
+        if i < self.size and self._ids_sorted[i] == restaurant_id:
+            return int(self._ids_order[i])
+        return None
+
+    # === FILTERS ===
+    def contains(self, field, pattern):
+        return self.columns[field].contains(pattern)
+
+    def contains_any(self, field, substrings):
+        """Rows whose value contains any of the substrings, case-insensitively and without regex"""
+        needles = [s.lower() for s in substrings]
+        return self.columns[field].category_mask(lambda c: any(n in c.lower() for n in needles))
+
+    def filter_mask(self, city=None, cuisine=None, country=None, min_cost=None, max_cost=None, min_rating=None):
+        mask = np.ones(self.size, dtype=bool)
+        if city:
+            mask &= self.contains("city", city)
+        if cuisine:
+            mask &= self.contains("cuisines", cuisine)
+        if country:
+            mask &= self.contains("country", country)
+        if min_cost is not None:
+            mask &= self.columns["average_cost_for_two"] >= min_cost
+        if max_cost is not None:
+            mask &= self.columns["average_cost_for_two"] <= max_cost
+        if min_rating is not None:
+            mask &= self.columns["aggregate_rating"] >= min_rating
+        return mask
+
+    def filter_positions(self, city=None, cuisine=None, country=None, min_cost=None, max_cost=None, name=None,
+                         min_rating=None, limit=None):
+        """
+        Ascending positions of the rows filter_mask selects (plus an optional name
+        filter), only the first `limit` if given. A selective city or country
+        filter reads only its partition's rows, and the other filters are
+        evaluated on those rows alone.
+        """
+        hits = {field: self.columns[field].contains_hits(pattern)
+                for field, pattern in (("city", city), ("country", country), ("cuisines", cuisine),
+                                       ("restaurant_name", name)) if pattern}
+        positions = None
+        partitioned = [field for field in PARTITION_FIELDS if field in hits]
+        if partitioned:
+            field = min(partitioned, key=lambda f: self.partitions[f].count(hits[f]))
+            if self.partitions[field].count(hits[field]) <= PARTITION_MAX_FRACTION * self.size:
+                positions = self.partitions[field].positions(hits.pop(field))
+
+        rows = slice(None) if positions is None else positions
+        keep = np.ones(self.size if positions is None else len(positions), dtype=bool)
+        for field, field_hits in hits.items():
+            keep &= field_hits[self.columns[field].codes[rows]]
+        if min_cost is not None:
+            keep &= self.columns["average_cost_for_two"][rows] >= min_cost
+        if max_cost is not None:
+            keep &= self.columns["average_cost_for_two"][rows] <= max_cost
+        if min_rating is not None:
+            keep &= self.columns["aggregate_rating"][rows] >= min_rating
+        return (np.flatnonzero(keep) if positions is None else positions[keep])[:limit]
+
+    # === FACETS ===
+    def facet_counts(self, facet, positions=None):
+        """[(value, rows)] of a FACETS entry over the rows at positions (default all), most rows first"""
+        field, separator = FACETS[facet]
+        column = self.columns[field]
+        codes = column.codes if positions is None else column.codes[positions]
+        counts = np.bincount(codes, minlength=len(column.offsets) - 1)
+        present = np.flatnonzero(counts)
+        return facet_totals(column.take_categories(present), counts[present].tolist(), separator)
+
+    # === AGGREGATION ===
+    def group_rows(self, field, positions):
+        """
+        (group values, group number per row) for the rows at positions (ascending
+        and distinct); a group value is a code for string fields
+        """
+        column = self.columns[field]
+        selection = slice(None) if len(positions) == self.size else positions
+        if isinstance(column, StringColumn):
+            codes, n_values, low = column.codes[selection], len(column.offsets) - 1, 0
+        else:
+            values = column[selection].astype(np.int64)
+            low = int(values.min()) if len(values) else 0
+            codes, n_values = values - low, (int(values.max()) - low + 1 if len(values) else 0)
+        present = np.flatnonzero(np.bincount(codes, minlength=n_values))
+        groups = np.full(n_values, -1, dtype=np.int32)
+        groups[present] = np.arange(len(present))
+        return present + low, groups[codes]
+
+    def aggregate(self, positions, group_by=None, metrics=("count",), bins=10, limit=None):
+        """
+        Metrics per group over the rows at positions, as
+        ([(key, count, {metric: value})], {histogram field: bin edges}) for the
+        `limit` groups with most rows, largest first. Each metric is one
+        vectorized pass over integer group numbers: bincount for count, sum and
+        mean, ufunc.at for min and max, and bincount over group * bins + bin for
+        histograms, whose edges all groups share. positions must be ascending
+        and distinct, as filter_positions returns them.
+        """
+        parsed = [(metric, *parse_metric(metric)) for metric in metrics]
+        positions = np.asarray(positions, dtype=np.int64)
+        if group_by is None:
+            group_values, groups = np.zeros(1 if len(positions) else 0, dtype=np.int64), np.zeros(len(positions), dtype=np.int64)
+        else:
+            group_values, groups = self.group_rows(group_by, positions)
+        n_groups = len(group_values)
+        counts = np.bincount(groups, minlength=n_groups)
+        # positions are ascending and distinct, so all of them means every row in order
+        selection = slice(None) if len(positions) == self.size else positions
+        results, edges = {}, {}
+        for metric, op, field in parsed:
+            if op == "count":
+                continue
+            values = self.columns[field][selection].astype(np.float64)
+            if op in ("sum", "mean"):
+                sums = np.bincount(groups, weights=values, minlength=n_groups)
+                results[metric] = sums if op == "sum" else sums / np.maximum(counts, 1)
+            elif op in ("min", "max"):
+                extreme = np.full(n_groups, np.inf if op == "min" else -np.inf)
+                (np.minimum if op == "min" else np.maximum).at(extreme, groups, values)
+                results[metric] = extreme
+            else:
+                field_edges = np.histogram_bin_edges(values, bins=bins)
+                bin_index = histogram_bins(values, field_edges)
+                results[metric] = np.bincount(groups * bins + bin_index, minlength=n_groups * bins).reshape(n_groups, bins)
+                edges[field] = field_edges.tolist()
+
+        ranked = np.argsort(-counts, kind="stable")[:limit]
+        if group_by is None:
+            keys = [None] * len(ranked)
+        elif isinstance(self.columns[group_by], StringColumn):
+            keys = self.columns[group_by].take_categories(group_values[ranked])
+        else:
+            keys = group_values[ranked].tolist()
+        rows = [
+            (key, int(counts[g]), {metric: values[g].tolist() for metric, values in results.items()})
+            for key, g in zip(keys, ranked.tolist())
+        ]
+        return rows, edges
+
+    # === SUMMARY ===
+    def countries(self):
+        """{country code: country name} of the restaurants held"""
+        codes, first = np.unique(self.columns["country_code"], return_index=True)
+        return dict(zip(codes.tolist(), self.take("country", first)))
+
+    def bbox(self):
+        """[min_lat, min_lng, max_lat, max_lng] of the located restaurants, or None"""
+        lats, lngs = self.columns["latitude"], self.columns["longitude"]
+        located = np.isfinite(lats) & np.isfinite(lngs)
+        if not located.any():
+            return None
+        return [float(lats[located].min()), float(lngs[located].min()),
+                float(lats[located].max()), float(lngs[located].max())]
+
+    # === MEMORY ===
+    @property
+    def nbytes(self):
+        total = sum(c.nbytes for c in self.columns.values()) + sum(p.nbytes for p in self.partitions.values())
+        if self.embeddings is not None:
+            total += self.embeddings.nbytes
+        return total
+
+    def memory_report(self, df: pd.DataFrame = None):
+        """Bytes per field for the store and, if given, for the matching DataFrame columns"""
+        report = {}
+        for field, (column, _) in RESTAURANT_FIELDS.items():
+            row = {"store": int(self.columns[field].nbytes)}
+            if df is not None and column in df:
+                row["dataframe"] = int(df[column].memory_usage(index=False, deep=True))
+            report[field] = row
+        if self.embeddings is not None:
+            row = {"store": int(self.embeddings.nbytes)}
+            if df is not None and "embedding" in df:
+                row["dataframe"] = int(df["embedding"].memory_usage(index=False, deep=True)
+                                       + sum(e.nbytes for e in df["embedding"]))
+            report["embedding"] = row
+        return report
+
+def format_memory_report(report):
+    lines = [f"{'field':<24}{'store':>14}{'dataframe':>14}"]
+    totals = {"store": 0, "dataframe": 0}
+    for field, row in report.items():
+        for key in totals:
+            totals[key] += row.get(key, 0)
+        lines.append(f"{field:<24}{row['store']:>14,}{row.get('dataframe', 0):>14,}")
+    lines.append(f"{'TOTAL':<24}{totals['store']:>14,}{totals['dataframe']:>14,}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    # Memory footprint of the store versus the merged DataFrame (embeddings excluded)
+    df_main = pd.read_csv("zomato.csv", encoding='latin-1')
+    df_country = pd.read_excel("Country-Code.xlsx", engine=EXCEL_ENGINE)
+    df = pd.merge(df_main, df_country, on='Country Code', how='left')
+    df['id'] = df.index
+    print(format_memory_report(RestaurantStore.from_dataframe(df).memory_report(df)))
@@ -1,14 +1,17 @@
+import os
+
 import streamlit as st
-import requests
-import pandas as pd
-import json
 from PIL import Image
-import io
-import base64
 
+from api_client import ApiError, RestaurantClient
 
 # Configuration
-API_BASE_URL = "http://127.0.0.1:8000"  # Change this to your FastAPI server URL
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")  # Change this to your FastAPI server URL
+# The fields display_restaurant_card shows; list endpoints return only these
+CARD_FIELDS = ",".join([
+    "restaurant_name", "address", "city", "country", "cuisines", "currency", "average_cost_for_two",
+    "aggregate_rating", "price_range", "votes", "rating_text", "has_table_booking", "has_online_delivery",
+])
 
 # Page configuration
 st.set_page_config(
@@ -60,63 +63,47 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Helper functions
-@st.cache_data
-def get_countries():
-    """Get list of countries from the FastAPI /countries endpoint"""
+@st.cache_resource
+def get_client():
+    """One pooled, caching API client per Streamlit server, shared by every session and rerun"""
+    return RestaurantClient(API_BASE_URL)
+
+def call_api(fetch, default, error="API Error"):
+    """fetch() through the client, showing failures in the page instead of raising"""
     try:
-        response = requests.get(f"{API_BASE_URL}/countries")
-        if response.status_code == 200:
-            countries = response.json()
-            return sorted(countries)
-    except Exception as e:
-        st.error(f"Error fetching countries: {str(e)}")
-    return []
+        return fetch()
+    except ApiError as e:
+        if e.status_code is None:
+            st.error(f"Connection Error: {e.detail}")
+        else:
+            st.error(f"{error}: {e.status_code}")
+        return default
+
+def get_filter_options():
+    """Countries from /countries and cities and cuisines from /facets, fetched together"""
+    client = get_client()
+    countries, facets = call_api(
+        lambda: client.gather(client.countries, lambda: client.facets(facet=["city", "cuisine"])), ([], {})
+    )
+    cities = sorted(f["value"] for f in facets.get("city", []))
+    cuisines = sorted(f["value"] for f in facets.get("cuisine", []))
+    return sorted(countries), cities, cuisines
 
-    
+def get_countries():
+    """Get list of countries from the FastAPI /countries endpoint"""
+    return get_filter_options()[0]
 
-@st.cache_data
 def get_cities():
-    """Get list of cities from the API"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/restaurants", params={"limit": 1000})
-        if response.status_code == 200:
-            restaurants = response.json()
-            cities = list(set([r["City"] for r in restaurants if r["City"]]))
-            return sorted(cities)
-    except:
-        pass
-    return []
-
-@st.cache_data
+    """Cities that have restaurants, from the /facets endpoint"""
+    return get_filter_options()[1]
+
 def get_cuisines():
-    """Get list of cuisines from the API"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/restaurants", params={"limit": 1000})
-        if response.status_code == 200:
-            restaurants = response.json()
-            all_cuisines = []
-            for r in restaurants:
-                if r["Cuisines"]:
-                    cuisines = [c.strip() for c in r["Cuisines"].split(",")]
-                    all_cuisines.extend(cuisines)
-            return sorted(list(set(all_cuisines)))
-    except:
-        pass
-    return []
-
-# Add this new API helper function
+    """Individual cuisines served, from the /facets endpoint"""
+    return get_filter_options()[2]
+
 def nearby_restaurants_api(params):
     """Make API call for nearby restaurants"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/restaurants/nearby", params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"API Error: {response.status_code}")
-            return []
-    except Exception as e:
-        st.error(f"Connection Error: {str(e)}")
-        return []
+    return call_api(lambda: get_client().nearby(**params, fields=CARD_FIELDS), [])
 
 def display_restaurant_card(restaurant):
     """Display a restaurant card with styling"""
@@ -138,78 +125,23 @@ def display_restaurant_card(restaurant):
 
 def search_restaurants_api(params):
     """Make API call to search restaurants"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/restaurants/search", params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"API Error: {response.status_code}")
-            return []
-    except Exception as e:
-        st.error(f"Connection Error: {str(e)}")
-        return []
+    return call_api(lambda: get_client().search(**params, fields=CARD_FIELDS), [])
 
 def list_restaurants_api(params):
     """Make API call to list restaurants"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/restaurants", params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"API Error: {response.status_code}")
-            return []
-    except Exception as e:
-        st.error(f"Connection Error: {str(e)}")
-        return []
+    return call_api(lambda: get_client().restaurants(**params, fields=CARD_FIELDS), [])
 
 def get_restaurant_by_id(restaurant_id):
     """Get specific restaurant by ID"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/restaurants/{restaurant_id}")
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Restaurant not found: {response.status_code}")
-            return None
-    except Exception as e:
-        st.error(f"Connection Error: {str(e)}")
-        return None
+    return call_api(lambda: get_client().restaurant(restaurant_id), None, error="Restaurant not found")
 
 def semantic_search_api(query, limit=10):
     """Make API call for semantic search"""
-    try:
-        response = requests.post(
-            f"{API_BASE_URL}/semantic-search",
-            json={"query": query, "limit": limit}
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"API Error: {response.status_code}")
-            return []
-    except Exception as e:
-        st.error(f"Connection Error: {str(e)}")
-        return []
+    return call_api(lambda: get_client().semantic_search(query, limit, CARD_FIELDS), [])
 
 def image_search_api(image_file, lat, lng, radius=3.0, limit=10):
     """Make API call for image search"""
-    try:
-        files = {"file": image_file}
-        data = {
-            "lat": lat,
-            "lng": lng,
-            "radius": radius,
-            "limit": limit
-        }
-        response = requests.post(f"{API_BASE_URL}/image-search-nearby", files=files, data=data)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"API Error: {response.status_code}")
-            return []
-    except Exception as e:
-        st.error(f"Connection Error: {str(e)}")
-        return []
+    return call_api(lambda: get_client().image_search(image_file, lat, lng, radius, limit, CARD_FIELDS), [])
 
 # Main app
 def main():
@@ -292,7 +224,8 @@ def main():
     elif search_type == "🏙️ Search by City":
         st.header("🏙️ Search by City")
         
-        city_input = st.text_input("Enter City Name:")
+        cities = get_cities()
+        city_input = st.selectbox("Select City:", [""] + cities) if cities else st.text_input("Enter City Name:")
         limit = st.selectbox("Number of results:", [10, 20, 50, 100], index=1)
         
         if city_input and st.button("🔍 Search"):
@@ -309,7 +242,11 @@ def main():
     elif search_type == "🍳 Search by Cuisine":
         st.header("🍳 Search by Cuisine")
         
-        cuisine_input = st.text_input("Enter Cuisine Type (e.g., Italian, Chinese, Indian):")
+        cuisines = get_cuisines()
+        if cuisines:
+            cuisine_input = st.selectbox("Select Cuisine:", [""] + cuisines)
+        else:
+            cuisine_input = st.text_input("Enter Cuisine Type (e.g., Italian, Chinese, Indian):")
         limit = st.selectbox("Number of results:", [10, 20, 50, 100], index=1)
         
         if cuisine_input and st.button("🔍 Search"):
@@ -342,9 +279,10 @@ def main():
         
         name_input = st.text_input("Enter Restaurant Name:")
         limit = st.selectbox("Number of results:", [10, 20, 50, 100], index=1)
+        fuzzy = st.checkbox("Tolerate typos", value=True)
         
         if name_input and st.button("🔍 Search"):
-            params = {"q_name": name_input, "limit": limit}
+            params = {"q_name": name_input, "limit": limit, "fuzzy": fuzzy}
             restaurants = search_restaurants_api(params)
             
             if restaurants:
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules are imported top-level, as the app and benchmarks run from Backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
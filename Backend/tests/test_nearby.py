@@ -0,0 +1,89 @@
+import types
+
+import numpy as np
+import pytest
+
+from geo import GridIndex, haversine_km
+from ranking import NearbyRanker
+
+CELL_DEGS = (0.05, 0.1, 0.5, 2.0)
+# Dense city, both sides of the antimeridian, both poles, the equator at lng 0
+CENTERS = [(28.6, 77.2), (10.0, 179.95), (-35.0, -179.9), (89.9, 45.0), (-89.95, -120.0), (0.0, 0.0)]
+RADII = (0.5, 5.0, 50.0, 400.0)
+
+@pytest.fixture(scope="module")
+def points():
+    """Uniform points worldwide plus dense clusters around every center"""
+    rng = np.random.default_rng(7)
+    lats = [np.degrees(np.arcsin(rng.uniform(-1, 1, 3000)))]
+    lngs = [rng.uniform(-180, 180, 3000)]
+    for lat, lng in CENTERS:
+        # Reflected over the poles rather than clipped, so no two points tie on distance
+        cluster = lat + rng.normal(0, 1.0, 1500)
+        lats.append(np.where(cluster > 90, 180 - cluster, np.where(cluster < -90, -180 - cluster, cluster)))
+        lngs.append((lng + rng.normal(0, 2.0, 1500) + 180) % 360 - 180)
+    return np.concatenate(lats), np.concatenate(lngs)
+
+def brute_force(lats, lngs, lat, lng, radius_km):
+    distances = haversine_km(lat, lng, lats, lngs)
+    inside = np.flatnonzero(distances <= radius_km)
+    return inside, distances[inside]
+
+@pytest.mark.parametrize("cell_deg", CELL_DEGS)
+def test_grid_query_matches_brute_force(points, cell_deg):
+    lats, lngs = points
+    index = GridIndex(lats, lngs, cell_deg=cell_deg)
+    for lat, lng in CENTERS:
+        for radius in RADII:
+            positions, distances = brute_force(lats, lngs, lat, lng, radius)
+            order = np.argsort(distances, kind="stable")
+            for limit in (1, 20, len(lats)):
+                got_positions, got_distances = index.query(lat, lng, radius, limit)
+                np.testing.assert_array_equal(got_positions, positions[order][:limit])
+                np.testing.assert_allclose(got_distances, distances[order][:limit])
+
+@pytest.mark.parametrize("cell_deg", CELL_DEGS)
+def test_rings_cover_the_radius_and_bound_distances(points, cell_deg):
+    lats, lngs = points
+    index = GridIndex(lats, lngs, cell_deg=cell_deg)
+    for lat, lng in CENTERS:
+        for radius in RADII:
+            seen = []
+            for positions, min_km in index.rings(lat, lng, radius):
+                if len(positions):
+                    # min_km must never exceed the distance of a point in that ring
+                    assert haversine_km(lat, lng, lats[positions], lngs[positions]).min() >= min_km - 1e-9
+                seen.append(positions)
+            expected, _ = brute_force(lats, lngs, lat, lng, radius)
+            assert set(expected) <= set(np.concatenate(seen).tolist())
+
+@pytest.fixture(scope="module")
+def store(points):
+    lats, lngs = points
+    rng = np.random.default_rng(11)
+    ratings = np.where(rng.random(len(lats)) < 0.2, 0.0, rng.uniform(1.0, 4.9, len(lats)))
+    columns = {
+        "latitude": lats,
+        "longitude": lngs,
+        "aggregate_rating": ratings,
+        "votes": rng.integers(0, 5000, len(lats)),
+    }
+    return types.SimpleNamespace(column=columns.__getitem__)
+
+@pytest.mark.parametrize("cell_deg", CELL_DEGS)
+@pytest.mark.parametrize("half_life_km", (0.5, 2.0, 50.0))
+def test_ranked_top_k_matches_exhaustive(store, cell_deg, half_life_km):
+    lats, lngs = store.column("latitude"), store.column("longitude")
+    ranker = NearbyRanker(store, GridIndex(lats, lngs, cell_deg=cell_deg), half_life_km=half_life_km)
+    for lat, lng in CENTERS:
+        for radius in RADII:
+            for limit in (1, 10, 100):
+                got = ranker.top_k(lat, lng, radius, limit)
+                expected = ranker.top_k_exhaustive(lat, lng, radius, limit)
+                np.testing.assert_array_equal(got[0], expected[0])
+                np.testing.assert_allclose(got[1], expected[1])
+                # The exhaustive reference itself against every point
+                positions, distances = brute_force(lats, lngs, lat, lng, radius)
+                scores = ranker.static[positions] * 0.5 ** (distances / half_life_km)
+                order = np.lexsort((positions, distances, -scores))[:limit]
+                np.testing.assert_array_equal(expected[0], positions[order])
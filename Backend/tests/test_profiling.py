@@ -0,0 +1,44 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import ProfiledRoute, ProfilingMiddleware, is_authorized, router
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("PROFILING_TOKEN", "s3cret")
+    app = FastAPI()
+    app.router.route_class = ProfiledRoute
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(router)
+    return TestClient(app)
+
+@pytest.mark.parametrize("token", [None, "", "wrong", "s3cret ", "sécret", "s3creté", "ÿ" * 6])
+def test_is_authorized_rejects_bad_tokens(monkeypatch, token):
+    monkeypatch.setenv("PROFILING_TOKEN", "s3cret")
+    assert not is_authorized(token)
+
+def test_is_authorized_accepts_the_token(monkeypatch):
+    monkeypatch.setenv("PROFILING_TOKEN", "s3cret")
+    assert is_authorized("s3cret")
+    monkeypatch.delenv("PROFILING_TOKEN")
+    assert not is_authorized("s3cret")
+
+@pytest.mark.parametrize("token", [b"wrong", "sécret".encode("latin-1"), b"\xff\xfe"])
+def test_bad_token_is_denied_not_an_error(client, token):
+    response = client.get("/ping", headers={"X-Profile": "1", "X-Profile-Token": token})
+    assert response.status_code == 200
+    assert response.headers["x-profile-status"] == "denied"
+    assert client.get("/debug/profiles/abc", headers={"X-Profile-Token": token}).status_code == 403
+
+def test_profile_recorded_and_fetched(client):
+    headers = {"X-Profile": "1", "X-Profile-Token": "s3cret"}
+    response = client.get("/ping", headers=headers)
+    assert response.headers["x-profile-status"] == "recorded"
+    profile = client.get(f"/debug/profiles/{response.headers['x-profile-id']}", headers={"X-Profile-Token": "s3cret"})
+    assert profile.status_code == 200
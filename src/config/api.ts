@@ -11,4 +11,5 @@ export const API_ENDPOINTS = {
   SEMANTIC_SEARCH: '/semantic-search',
   IMAGE_SEARCH: '/image-search-nearby',
   RESTAURANT_BY_ID: '/restaurants',
+  AUTOCOMPLETE: '/autocomplete',
 } as const;
@@ -1,5 +1,5 @@
 import { API_CONFIG, API_ENDPOINTS } from '../config/api';
-import { Restaurant, RestaurantWithSimilarity, SearchFilters, GeolocationSearch, SemanticSearchRequest } from '../types/restaurant';
+import { Restaurant, RestaurantWithSimilarity, SearchFilters, GeolocationSearch, SemanticSearchRequest, AutocompleteKind, AutocompleteSuggestion } from '../types/restaurant';
 
 class RestaurantService {
   private baseUrl = API_CONFIG.BASE_URL;
@@ -27,6 +27,7 @@ class RestaurantService {
     cuisine?: string;
     country?: string;
     limit?: number;
+    fuzzy?: boolean;
   }): Promise<Restaurant[]> {
     const params = new URLSearchParams();
     
@@ -35,12 +36,23 @@ class RestaurantService {
     if (filters.cuisine) params.append('q_cuisine', filters.cuisine);
     if (filters.country) params.append('q_country', filters.country);
     if (filters.limit) params.append('limit', filters.limit.toString());
+    if (filters.fuzzy) params.append('fuzzy', 'true');
 
     const response = await fetch(`${this.baseUrl}${API_ENDPOINTS.SEARCH}?${params}`);
     if (!response.ok) throw new Error('Failed to search restaurants');
     return response.json();
   }
 
+  // Cheap enough to call on every keystroke, unlike searchRestaurants
+  async autocomplete(prefix: string, limit: number = 10, kinds?: AutocompleteKind[]): Promise<AutocompleteSuggestion[]> {
+    const params = new URLSearchParams({ q: prefix, limit: limit.toString() });
+    kinds?.forEach((kind) => params.append('kind', kind));
+
+    const response = await fetch(`${this.baseUrl}${API_ENDPOINTS.AUTOCOMPLETE}?${params}`);
+    if (!response.ok) throw new Error('Autocomplete failed');
+    return response.json();
+  }
+
   async getRestaurantById(restaurantId: number): Promise<Restaurant> {
     const response = await fetch(`${this.baseUrl}${API_ENDPOINTS.RESTAURANT_BY_ID}/${restaurantId}`);
     if (!response.ok) throw new Error('Restaurant not found');
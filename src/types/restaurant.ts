@@ -47,6 +47,15 @@ export interface GeolocationSearch {
   limit: number;
 }
 
+export type AutocompleteKind = 'name' | 'city' | 'locality' | 'cuisine';
+
+export interface AutocompleteSuggestion {
+  kind: AutocompleteKind;
+  label: string;
+  restaurant_id: number | null;
+  count: number;
+}
+
 export interface SemanticSearchRequest {
   query: string;
   limit: number;